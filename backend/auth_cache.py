@@ -0,0 +1,61 @@
+# backend/auth_cache.py
+# In-process token -> user cache. Entries are plain snapshots (not ORM
+# objects) so they can be shared across sessions and threads.
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+TOKEN_CACHE_TTL = float(os.environ.get("TOKEN_CACHE_TTL", "60"))
+TOKEN_CACHE_SIZE = int(os.environ.get("TOKEN_CACHE_SIZE", "10000"))
+
+CachedUser = namedtuple("CachedUser", ["id", "first_name", "last_name", "email", "token"])
+
+def snapshot(user):
+    return CachedUser(user.id, user.first_name, user.last_name, user.email, user.token)
+
+
+class TokenCache:
+    """
+    Bounded LRU with a TTL. The TTL bounds how long another worker process
+    can keep honouring a token that was rotated elsewhere.
+    """
+
+    def __init__(self, ttl=TOKEN_CACHE_TTL, max_size=TOKEN_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._data = OrderedDict()  # token -> (expires_at, CachedUser)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token):
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(token)
+            if item is None or item[0] <= now:
+                if item is not None:
+                    del self._data[token]
+                self.misses += 1
+                return None
+            self._data.move_to_end(token)
+            self.hits += 1
+            return item[1]
+
+    def put(self, token, user):
+        with self._lock:
+            self._data[token] = (time.monotonic() + self.ttl, user)
+            self._data.move_to_end(token)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def invalidate(self, token):
+        with self._lock:
+            self._data.pop(token, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+tokens = TokenCache()
@@ -0,0 +1,310 @@
+# backend/bulk_import.py
+# Bulk import of historical activity files (CSV or NDJSON), from the CLI
+# (python -m backend.manage import-file) or POST /imports.
+#
+# The parent process cuts the file into chunks of whole records and a process
+# pool parses, validates and prices them (ingest.prepare_row +
+# ingest.price_row). Chunks come back in file order and each one is
+# inserted with a single executemany, committed together with the job's byte
+# offset, so an interrupted import resumes at the first uncommitted chunk.
+# A job only runs in the process that wins crud.claim_import_job for it; every
+# committed chunk refreshes updated_at, so a job stops being claimable again
+# until IMPORT_STALE_AFTER passes without progress.
+import csv
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from .database import BASE_DIR, SessionLocal
+from . import models, crud, ingest
+
+log = logging.getLogger(__name__)
+
+IMPORT_DIR = os.environ.get("IMPORT_DIR", os.path.join(BASE_DIR, "data", "imports"))
+IMPORT_WORKERS = int(os.environ.get("IMPORT_WORKERS", str(os.cpu_count() or 2)))
+IMPORT_CHUNK_ROWS = int(os.environ.get("IMPORT_CHUNK_ROWS", "5000"))
+IMPORT_STALE_AFTER = float(os.environ.get("IMPORT_STALE_AFTER", "600"))  # seconds without a committed chunk
+IMPORT_MAX_ERRORS = 100  # row errors kept on the job; the counts are always exact
+COPY_CHUNK_SIZE = 1024 * 1024
+
+FORMATS = ("csv", "ndjson")
+# CSV columns with a fixed meaning; every other column becomes a details field
+CSV_FIELDS = ("category", "timestamp", "emissions_kgco2")
+
+
+def guess_format(filename):
+    ext = os.path.splitext(filename or "")[1].lower().lstrip(".")
+    return {"csv": "csv", "ndjson": "ndjson", "jsonl": "ndjson"}.get(ext)
+
+
+def save_upload(src, fmt):
+    """Stream the file-like `src` into IMPORT_DIR; returns the stored path."""
+    os.makedirs(IMPORT_DIR, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=IMPORT_DIR, prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = src.read(COPY_CHUNK_SIZE)
+                if not chunk:
+                    break
+                out.write(chunk)
+        dest = os.path.join(IMPORT_DIR, f"{models.gen_id('import')}.{fmt}")
+        os.replace(tmp, dest)
+        return dest
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _stale_before():
+    return datetime.utcnow() - timedelta(seconds=IMPORT_STALE_AFTER)
+
+
+def job_status(job):
+    out = {
+        "import_id": job.id, "status": job.status, "format": job.format, "dry_run": job.dry_run,
+        "rows_read": job.rows_read, "accepted": job.accepted, "failed": job.failed,
+        "emissions_kgco2": round(job.emissions_total, 4),
+        "progress": round(job.bytes_done / job.bytes_total, 4) if job.bytes_total else 1.0,
+        "errors": json.loads(job.errors or "[]"),
+    }
+    if job.error:
+        out["error"] = job.error
+    return out
+
+
+# -- splitting (parent process) ------------------------------------------------
+def _records(f, fmt):
+    """Raw records from the binary file `f`; a CSV record may span lines inside quotes."""
+    partial = b""
+    for line in f:
+        partial += line
+        if fmt == "csv" and partial.count(b'"') % 2:
+            continue
+        if partial.strip():
+            yield partial
+        partial = b""
+    if partial.strip():
+        yield partial
+
+
+def _chunks(f, fmt, chunk_rows):
+    """Yields (records, offset just past the last one)."""
+    batch = []
+    for rec in _records(f, fmt):
+        batch.append(rec)
+        if len(batch) >= chunk_rows:
+            yield batch, f.tell()
+            batch = []
+    if batch:
+        yield batch, f.tell()
+
+
+def _csv_header(f):
+    first = next(_records(f, "csv"), None)
+    if first is None:
+        raise ValueError("empty CSV file")
+    header = [h.strip().lower() for h in next(csv.reader([first.decode("utf-8-sig")]))]
+    if "category" not in header:
+        raise ValueError("CSV header must include a category column")
+    return header
+
+
+# -- parsing (pool processes) --------------------------------------------------
+def _exit_with_parent(parent_pid):
+    # pool workers otherwise outlive a killed importer, blocked on its queue
+    def watch():
+        while os.getppid() == parent_pid:
+            time.sleep(1)
+        os._exit(1)
+    threading.Thread(target=watch, daemon=True).start()
+
+
+def _scalar(value):
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return value
+
+
+def _csv_item(header, rec):
+    values = next(csv.reader([rec.decode("utf-8")]))
+    if len(values) != len(header):
+        raise ValueError(f"expected {len(header)} columns, got {len(values)}")
+    item, details = {}, {}
+    for name, value in zip(header, values):
+        value = value.strip()
+        if value == "":
+            continue
+        if name in CSV_FIELDS:
+            item[name] = value
+        elif name == "details":
+            extra = json.loads(value)
+            if not isinstance(extra, dict):
+                raise ValueError("details must be an object")
+            details.update(extra)
+        else:
+            details[name] = _scalar(value)
+    item["details"] = details
+    return item
+
+
+def parse_chunk(fmt, header, records):
+    """
+    Validate and price one chunk. Returns (rows, errors): rows are ready for
+    crud.add_entries_bulk, errors are (index in chunk, message) pairs.
+    """
+    rows, errors = [], []
+    for i, rec in enumerate(records):
+        try:
+            item = _csv_item(header, rec) if fmt == "csv" else json.loads(rec)
+            rows.append(ingest.price_row(ingest.prepare_row(item)))
+        except (ValueError, TypeError, UnicodeDecodeError) as e:
+            errors.append((i, str(e)))
+    return rows, errors
+
+
+# -- driver --------------------------------------------------------------------
+def _apply(db, job, records, offset, rows, errors, error_log):
+    first = job.rows_read
+    if rows and not job.dry_run:
+        crud.add_entries_bulk(db, job.user_id, rows)
+    for i, msg in errors:
+        if len(error_log) >= IMPORT_MAX_ERRORS:
+            break
+        error_log.append({"record": first + i + 1, "error": msg})
+    job.rows_read = first + len(records)
+    job.bytes_done = offset
+    job.accepted += len(rows)
+    job.failed += len(errors)
+    job.emissions_total += sum(r["emissions"] or 0.0 for r in rows)
+    job.errors = json.dumps(error_log)
+    job.updated_at = datetime.utcnow()
+    # the rows and the progress that covers them commit together
+    db.commit()
+
+
+def run_import(job_id, workers=None, chunk_rows=None, progress=None, stop=None):
+    """
+    Run (or resume) an import job to completion. `progress(job)` is called after
+    every committed chunk; when `stop()` turns true, or the run is interrupted
+    (KeyboardInterrupt, re-raised), the job is left queued at the last
+    committed chunk. A job another process is running (touched within
+    IMPORT_STALE_AFTER) is left alone. Returns the job's final status dict.
+    """
+    workers = workers or IMPORT_WORKERS
+    chunk_rows = chunk_rows or IMPORT_CHUNK_ROWS
+    db = SessionLocal()
+    try:
+        job = db.get(models.ImportJob, job_id)
+        if job is None:
+            raise ValueError(f"no import job {job_id}")
+        if not crud.claim_import_job(db, job_id, _stale_before()):
+            # finished, or another process is running it
+            db.refresh(job)
+            return job_status(job)
+        db.refresh(job)
+        try:
+            finished = _run(db, job, workers, chunk_rows, progress, stop)
+        except Exception as e:
+            log.exception("import %s failed", job_id)
+            db.rollback()
+            crud.update_import_job(db, job_id, status="failed", error=f"{type(e).__name__}: {e}")
+        except BaseException:
+            # Ctrl-C: hand the job back at its last committed chunk so
+            # resume-import can pick it up straight away
+            db.rollback()
+            crud.update_import_job(db, job_id, status="queued")
+            raise
+        else:
+            crud.update_import_job(db, job_id, status="done" if finished else "queued")
+        db.refresh(job)
+        return job_status(job)
+    finally:
+        db.close()
+
+
+def _run(db, job, workers, chunk_rows, progress, stop):
+    error_log = json.loads(job.errors or "[]")
+    with open(job.path, "rb") as f:
+        header = _csv_header(f) if job.format == "csv" else None
+        if job.bytes_done:
+            f.seek(job.bytes_done)
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(workers, mp_context=ctx, initializer=_exit_with_parent, initargs=(os.getpid(),)) as pool:
+            in_flight = deque()
+            for records, offset in _chunks(f, job.format, chunk_rows):
+                in_flight.append((records, offset, pool.submit(parse_chunk, job.format, header, records)))
+                # bounded read-ahead keeps memory flat on huge files
+                if len(in_flight) >= workers * 2:
+                    records, offset, fut = in_flight.popleft()
+                    _apply(db, job, records, offset, *fut.result(), error_log)
+                    if progress:
+                        progress(job)
+                    if stop and stop():
+                        pool.shutdown(cancel_futures=True)
+                        return False
+            while in_flight:
+                records, offset, fut = in_flight.popleft()
+                _apply(db, job, records, offset, *fut.result(), error_log)
+                if progress:
+                    progress(job)
+    return True
+
+
+class ImportRunner:
+    """Runs API-submitted imports one at a time on a background thread."""
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self._thread = None
+        self._stopping = threading.Event()
+
+    def start(self):
+        self._stopping.clear()
+        db = SessionLocal()
+        try:
+            # pick up anything queued or left over from a dead process;
+            # run_import's claim keeps other workers from running it too
+            for job_id in crud.pending_import_job_ids(db, _stale_before()):
+                self.queue.put(job_id)
+        finally:
+            db.close()
+        self._thread = threading.Thread(target=self._loop, name="bulk-import", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=30):
+        self._stopping.set()
+        self.queue.put(None)
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submit(self, job_id):
+        self.queue.put(job_id)
+
+    def depth(self):
+        return self.queue.qsize()
+
+    def _loop(self):
+        while not self._stopping.is_set():
+            job_id = self.queue.get()
+            if job_id is None:
+                break
+            try:
+                run_import(job_id, stop=self._stopping.is_set)
+            except Exception:
+                log.exception("import %s crashed", job_id)
+
+
+runner = ImportRunner()
@@ -1,11 +1,12 @@
 # backend/crud.py
-from . import models, schemas
+from . import models, schemas, auth_cache
 from .database import SessionLocal
 from sqlalchemy.orm import Session
-from passlib.context import CryptContext
-import uuid, json
-
-pwd_ctx = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from .passwords import pwd_ctx
+from datetime import datetime, timedelta
+import uuid, json, base64, os
 
 def get_db():
     db = SessionLocal()
@@ -15,9 +16,13 @@ def get_db():
         db.close()
 
 # Auth
+# The API hashes/verifies in passwords.pool and calls insert_user/issue_token;
+# create_user/authenticate_user are the synchronous equivalents.
 def create_user(db: Session, first_name, last_name, email, password):
-    hashed = pwd_ctx.hash(password)
-    user = models.User(first_name=first_name, last_name=last_name, email=email, password_hash=hashed)
+    return insert_user(db, first_name, last_name, email, pwd_ctx.hash(password))
+
+def insert_user(db: Session, first_name, last_name, email, password_hash):
+    user = models.User(first_name=first_name, last_name=last_name, email=email, password_hash=password_hash)
     db.add(user); db.commit(); db.refresh(user)
     return user
 
@@ -27,58 +32,503 @@ def authenticate_user(db: Session, email, password):
         return None
     if not pwd_ctx.verify(password, user.password_hash):
         return None
-    # create a token
+    return issue_token(db, user)
+
+def issue_token(db: Session, user):
+    # create a token (the previous one stops working)
+    old_token = user.token
     token = uuid.uuid4().hex
     user.token = token
     db.add(user); db.commit(); db.refresh(user)
+    if old_token:
+        auth_cache.tokens.invalidate(old_token)
     return user
 
 def get_user_by_token(db: Session, token):
-    return db.query(models.User).filter(models.User.token == token).first()
+    """Returns a read-only auth_cache.CachedUser snapshot, or None."""
+    if not token:
+        return None
+    cached = auth_cache.tokens.get(token)
+    if cached is not None:
+        return cached
+    user = db.query(models.User).filter(models.User.token == token).first()
+    if user is None:
+        return None
+    snap = auth_cache.snapshot(user)
+    auth_cache.tokens.put(token, snap)
+    return snap
 
 def get_user_by_email(db: Session, email):
     return db.query(models.User).filter(models.User.email == email).first()
 
 # Entries
-def create_entry(db: Session, user_id, category, details, emissions):
-    ent = models.Entry(user_id=user_id, category=category, details=json.dumps(details), emissions_kgco2=emissions)
-    db.add(ent); db.commit(); db.refresh(ent)
+# add_* stage a row in the caller's transaction (see write_batcher);
+# create_* are the same plus their own commit.
+def add_entry(db: Session, user_id, category, details, emissions, factor_version=None):
+    ent = models.Entry(id=models.gen_id("entry"), user_id=user_id, category=category, details=json.dumps(details), emissions_kgco2=emissions, factor_version=factor_version, timestamp=datetime.utcnow(), **models.detail_columns(details))
+    db.add(ent)
+    # rollup is bumped in the same transaction so it can never drift from entries
+    bump_daily_rollup(db, user_id, ent.timestamp.date(), category, emissions)
+    bump_user_total(db, user_id, category, emissions, ent.timestamp, ent.timestamp)
+    bump_data_version(db, user_scope(user_id), LEADERBOARD_SCOPE)
+    return ent
+
+def create_entry(db: Session, user_id, category, details, emissions, factor_version=None):
+    ent = add_entry(db, user_id, category, details, emissions, factor_version)
+    db.commit(); db.refresh(ent)
     return ent
 
+def add_entries_bulk(db: Session, user_id, rows):
+    """
+    One executemany for `rows` (dicts with category, details (obj), emissions
+    and optional timestamp and factor_version) plus their rollups; no commit.
+    Returns the new ids.
+    """
+    now = datetime.utcnow()
+    mappings = []
+    rollup = {}
+    totals = {}
+    for r in rows:
+        ts = r.get("timestamp") or now
+        m = {
+            "id": models.gen_id("entry"),
+            "user_id": user_id,
+            "timestamp": ts,
+            "category": r["category"],
+            "details": json.dumps(r.get("details") or {}),
+            "emissions_kgco2": r["emissions"],
+            "factor_version": r.get("factor_version"),
+        }
+        m.update(models.detail_columns(r.get("details")))
+        mappings.append(m)
+        acc = rollup.setdefault((ts.date(), r["category"]), [0.0, 0])
+        acc[0] += r["emissions"] or 0.0
+        acc[1] += 1
+        tot = totals.setdefault(r["category"], [0.0, 0, ts, ts])
+        tot[0] += r["emissions"] or 0.0
+        tot[1] += 1
+        tot[2] = min(tot[2], ts)
+        tot[3] = max(tot[3], ts)
+    db.bulk_insert_mappings(models.Entry, mappings)
+    for (day, category), (total, count) in rollup.items():
+        bump_daily_rollup(db, user_id, day, category, total, count)
+    for category, (total, count, first_at, last_at) in totals.items():
+        bump_user_total(db, user_id, category, total, first_at, last_at, count)
+    bump_data_version(db, user_scope(user_id), LEADERBOARD_SCOPE)
+    return [m["id"] for m in mappings]
+
+def bulk_create_entries(db: Session, user_id, rows, chunk_size=500):
+    """
+    Insert many entries with one executemany + one commit per chunk.
+    Returns the new entry ids in input order.
+    """
+    ids = []
+    for start in range(0, len(rows), chunk_size):
+        ids.extend(add_entries_bulk(db, user_id, rows[start:start + chunk_size]))
+        db.commit()
+    return ids
+
 def get_entries_for_user(db: Session, user_id):
     return db.query(models.Entry).filter(models.Entry.user_id == user_id).order_by(models.Entry.timestamp.desc()).all()
 
+ENTRY_FIELDS = ("id", "timestamp", "category", "details", "emissions_kgco2")
+# selectable through `fields`, not part of the default projection
+ENTRY_EXTRA_FIELDS = ("factor_version",) + tuple(models.DETAIL_COLUMNS)
+
+def encode_cursor(ts, entry_id):
+    raw = f"{ts.isoformat()}|{entry_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor. Raises ValueError on a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        ts, entry_id = raw.split("|", 1)
+        return datetime.fromisoformat(ts), entry_id
+    except Exception:
+        raise ValueError("invalid cursor")
+
+def query_entries(db: Session, user_id, since=None, until=None, category=None, cursor=None, limit=None, fields=ENTRY_FIELDS, vehicle_type=None):
+    """
+    Newest-first page of a user's entries, keyset-paginated on (timestamp, id)
+    so it walks ix_entries_user_ts. Returns (rows, next_cursor); rows are
+    tuples in the order of `fields`.
+    """
+    E = models.Entry
+    cols = [getattr(E, f) for f in fields]
+    # always select the keyset columns so the next cursor can be built
+    q = db.query(*cols, E.timestamp, E.id).filter(E.user_id == user_id)
+    if since is not None:
+        q = q.filter(E.timestamp >= since)
+    if until is not None:
+        q = q.filter(E.timestamp < until)
+    if category:
+        q = q.filter(E.category == category)
+    if vehicle_type:
+        q = q.filter(E.vehicle_type == vehicle_type)
+    if cursor:
+        c_ts, c_id = decode_cursor(cursor)
+        q = q.filter((E.timestamp < c_ts) | ((E.timestamp == c_ts) & (E.id < c_id)))
+    q = q.order_by(E.timestamp.desc(), E.id.desc())
+    if limit is None:
+        return [r[:len(fields)] for r in q.all()], None
+    rows = q.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][-2], rows[-1][-1])
+    return [r[:len(fields)] for r in rows], next_cursor
+
+def iter_entries(db: Session, user_id, since=None, until=None, category=None, fields=ENTRY_FIELDS, batch_size=1000):
+    """Oldest-first stream of a user's entries as tuples, fetched `batch_size` rows at a time."""
+    E = models.Entry
+    q = db.query(*[getattr(E, f) for f in fields]).filter(E.user_id == user_id)
+    if since is not None:
+        q = q.filter(E.timestamp >= since)
+    if until is not None:
+        q = q.filter(E.timestamp < until)
+    if category:
+        q = q.filter(E.category == category)
+    return q.order_by(E.timestamp, E.id).yield_per(batch_size)
+
+def factor_version_counts(db: Session):
+    """{factor_version: entries}; None counts rows from before factor versioning."""
+    E = models.Entry
+    return dict(db.query(E.factor_version, func.count()).group_by(E.factor_version).all())
+
+def reprice_entries(db: Session, repriced):
+    """
+    Write re-derived emissions back; no commit. `repriced`: dicts with id,
+    user_id, timestamp, category, old, new, factor_version and optional
+    details (obj). Rollups, user totals and data versions move by the deltas.
+    Returns how many rows changed value.
+    """
+    updates, rollup, totals, users = [], {}, {}, set()
+    changed = 0
+    for r in repriced:
+        u = {"id": r["id"], "factor_version": r["factor_version"]}
+        if r.get("details") is not None:
+            u["details"] = json.dumps(r["details"])
+        delta = (r["new"] or 0.0) - (r["old"] or 0.0)
+        if delta:
+            u["emissions_kgco2"] = r["new"]
+            changed += 1
+            users.add(r["user_id"])
+            ts = r["timestamp"]
+            if ts is not None:
+                key = (r["user_id"], ts.date(), r["category"])
+                rollup[key] = rollup.get(key, 0.0) + delta
+                tot = totals.setdefault((r["user_id"], r["category"]), [0.0, ts, ts])
+                tot[0] += delta
+                tot[1] = min(tot[1], ts)
+                tot[2] = max(tot[2], ts)
+        updates.append(u)
+    db.bulk_update_mappings(models.Entry, updates)
+    for (user_id, day, category), delta in rollup.items():
+        bump_daily_rollup(db, user_id, day, category, delta, count=0)
+    for (user_id, category), (delta, first_at, last_at) in totals.items():
+        bump_user_total(db, user_id, category, delta, first_at, last_at, count=0)
+    if users:
+        bump_data_version(db, LEADERBOARD_SCOPE, *(user_scope(u) for u in users))
+    return changed
+
 # Photos
-def create_photo(db: Session, user_id, filename, detected_json, est):
-    p = models.Photo(user_id=user_id, filename=filename, detected_json=json.dumps(detected_json), estimated_kgco2=est)
-    db.add(p); db.commit(); db.refresh(p)
+def add_photo(db: Session, user_id, filename, detected_json, est, sha256=None):
+    p = models.Photo(id=models.gen_id("photo"), user_id=user_id, filename=filename, sha256=sha256, detected_json=json.dumps(detected_json), estimated_kgco2=est, created_at=datetime.utcnow())
+    db.add(p)
+    bump_data_version(db, user_scope(user_id))
     return p
 
+def create_photo(db: Session, user_id, filename, detected_json, est, sha256=None):
+    p = add_photo(db, user_id, filename, detected_json, est, sha256)
+    db.commit(); db.refresh(p)
+    return p
+
+def get_photo_by_sha256(db: Session, sha256):
+    return db.query(models.Photo).filter(models.Photo.sha256 == sha256, models.Photo.detected_json.isnot(None)).order_by(models.Photo.created_at.desc()).first()
+
 def get_photos_for_user(db: Session, user_id):
     return db.query(models.Photo).filter(models.Photo.user_id == user_id).order_by(models.Photo.created_at.desc()).all()
 
+# Photo jobs
+def create_photo_job(db: Session, user_id, path, sha256, mime_type):
+    job = models.PhotoJob(user_id=user_id, path=path, sha256=sha256, mime_type=mime_type, status="queued")
+    db.add(job); db.commit(); db.refresh(job)
+    return job
+
+def get_photo_jobs(db: Session, user_id, job_ids):
+    return db.query(models.PhotoJob).filter(models.PhotoJob.user_id == user_id, models.PhotoJob.id.in_(job_ids)).all()
+
+def update_photo_job(db: Session, job_id, **fields):
+    fields["updated_at"] = datetime.utcnow()
+    db.query(models.PhotoJob).filter(models.PhotoJob.id == job_id).update(fields, synchronize_session=False)
+    db.commit()
+
+def _claimable(model, stale_before):
+    # queued, or left running by a process that stopped touching it (e.g. the
+    # server restarted) before `stale_before`
+    return (model.status == "queued") | ((model.status == "running") & (model.updated_at < stale_before))
+
+def _claim_job(db: Session, model, job_id, stale_before, **fields):
+    """
+    Move a claimable job to running with one conditional UPDATE, so of several
+    workers racing for it exactly one gets True.
+    """
+    fields.update(status="running", updated_at=datetime.utcnow())
+    n = db.query(model).filter(model.id == job_id, _claimable(model, stale_before)).update(fields, synchronize_session=False)
+    db.commit()
+    return n == 1
+
+def claim_photo_job(db: Session, job_id, stale_before):
+    return _claim_job(db, models.PhotoJob, job_id, stale_before, attempts=models.PhotoJob.attempts + 1)
+
+def pending_photo_job_ids(db: Session, stale_before):
+    rows = db.query(models.PhotoJob.id).filter(_claimable(models.PhotoJob, stale_before)).order_by(models.PhotoJob.created_at).all()
+    return [r[0] for r in rows]
+
+# Import jobs
+def create_import_job(db: Session, user_id, path, format, dry_run=False, source="api"):
+    job = models.ImportJob(user_id=user_id, path=path, format=format, dry_run=dry_run, source=source,
+                           bytes_total=os.path.getsize(path), status="queued")
+    db.add(job); db.commit(); db.refresh(job)
+    return job
+
+def get_import_job(db: Session, user_id, job_id):
+    return db.query(models.ImportJob).filter(models.ImportJob.user_id == user_id, models.ImportJob.id == job_id).first()
+
+def update_import_job(db: Session, job_id, **fields):
+    fields["updated_at"] = datetime.utcnow()
+    db.query(models.ImportJob).filter(models.ImportJob.id == job_id).update(fields, synchronize_session=False)
+    db.commit()
+
+def claim_import_job(db: Session, job_id, stale_before):
+    return _claim_job(db, models.ImportJob, job_id, stale_before)
+
+def pending_import_job_ids(db: Session, stale_before, source="api"):
+    # CLI imports are resumed from the CLI only, so a server restart never
+    # picks up a file a still-running CLI process is working on
+    rows = db.query(models.ImportJob.id).filter(
+        _claimable(models.ImportJob, stale_before), models.ImportJob.source == source
+    ).order_by(models.ImportJob.created_at).all()
+    return [r[0] for r in rows]
+
+# Daily rollups
+def bump_daily_rollup(db: Session, user_id, day, category, emissions, count=1):
+    # upsert: one row per (user, day, category), incremented in place
+    stmt = sqlite_insert(models.DailyRollup).values(
+        user_id=user_id, day=day, category=category, total_kgco2=float(emissions or 0.0), entry_count=count
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "day", "category"],
+        set_={
+            "total_kgco2": models.DailyRollup.total_kgco2 + stmt.excluded.total_kgco2,
+            "entry_count": models.DailyRollup.entry_count + stmt.excluded.entry_count,
+        },
+    )
+    db.execute(stmt)
+
+def rebuild_daily_rollups(db: Session):
+    """Recompute the whole rollup table from entries (backfill / repair)."""
+    db.query(models.DailyRollup).delete(synchronize_session=False)
+    agg = db.query(
+        models.Entry.user_id,
+        func.date(models.Entry.timestamp),
+        models.Entry.category,
+        func.coalesce(func.sum(models.Entry.emissions_kgco2), 0.0),
+        func.count(models.Entry.id),
+    ).group_by(models.Entry.user_id, func.date(models.Entry.timestamp), models.Entry.category)
+    db.execute(
+        models.DailyRollup.__table__.insert().from_select(
+            ["user_id", "day", "category", "total_kgco2", "entry_count"], agg
+        )
+    )
+    bump_data_version(db, LEADERBOARD_SCOPE, ROLLUPS_SCOPE)
+    db.commit()
+    return db.query(models.DailyRollup).count()
+
+# Per-user all-time totals
+def bump_user_total(db: Session, user_id, category, emissions, first_at, last_at, count=1):
+    T = models.UserTotal
+    stmt = sqlite_insert(T).values(
+        user_id=user_id, category=category, total_kgco2=float(emissions or 0.0), entry_count=count,
+        first_at=first_at, last_at=last_at,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "category"],
+        set_={
+            "total_kgco2": T.total_kgco2 + stmt.excluded.total_kgco2,
+            "entry_count": T.entry_count + stmt.excluded.entry_count,
+            # two-argument min()/max() are SQLite's scalar functions
+            "first_at": func.min(func.coalesce(T.first_at, stmt.excluded.first_at), stmt.excluded.first_at),
+            "last_at": func.max(func.coalesce(T.last_at, stmt.excluded.last_at), stmt.excluded.last_at),
+        },
+    )
+    db.execute(stmt)
+
+def rebuild_user_totals(db: Session):
+    """Recompute user_totals from entries (backfill / repair)."""
+    E = models.Entry
+    db.query(models.UserTotal).delete(synchronize_session=False)
+    agg = db.query(
+        E.user_id, E.category, func.coalesce(func.sum(E.emissions_kgco2), 0.0), func.count(E.id),
+        func.min(E.timestamp), func.max(E.timestamp),
+    ).group_by(E.user_id, E.category)
+    db.execute(
+        models.UserTotal.__table__.insert().from_select(
+            ["user_id", "category", "total_kgco2", "entry_count", "first_at", "last_at"], agg
+        )
+    )
+    db.commit()
+    return db.query(models.UserTotal).count()
+
+def user_summary(db: Session, user_id, today=None):
+    """
+    Totals by category plus 7/30-day sums and the week-over-week trend. Reads
+    the user's user_totals rows and at most 30 days of rollups, so the cost
+    does not grow with history.
+    """
+    today = today or datetime.utcnow().date()
+    T = models.UserTotal
+    rows = db.query(T.category, T.total_kgco2, T.entry_count, T.first_at, T.last_at).filter(T.user_id == user_id).all()
+    by_category = {cat: round(total or 0.0, 4) for cat, total, _, _, _ in rows}
+    firsts = [r[3] for r in rows if r[3]]
+    lasts = [r[4] for r in rows if r[4]]
+    first_at, last_at = min(firsts, default=None), max(lasts, default=None)
+    R = models.DailyRollup
+    days = db.query(R.day, func.sum(R.total_kgco2)).filter(
+        R.user_id == user_id, R.day > today - timedelta(days=30)
+    ).group_by(R.day).all()
+
+    def window(start, end):
+        # days ago in [start, end)
+        lo, hi = today - timedelta(days=end), today - timedelta(days=start)
+        return round(sum(t or 0.0 for d, t in days if lo < d <= hi), 4)
+
+    last7, prev7 = window(0, 7), window(7, 14)
+    return {
+        "entries": sum(r[2] for r in rows),
+        "total_kgco2": round(sum(by_category.values()), 4),
+        "by_category": by_category,
+        "last_7d_kgco2": last7,
+        "prev_7d_kgco2": prev7,
+        "last_30d_kgco2": window(0, 30),
+        "trend_pct": round((last7 - prev7) / prev7 * 100, 1) if prev7 else None,
+        "first_entry_at": first_at.isoformat() if first_at else None,
+        "last_entry_at": last_at.isoformat() if last_at else None,
+    }
+
+# Data versions (conditional GET)
+LEADERBOARD_SCOPE = "leaderboard"
+ROLLUPS_SCOPE = "rollups"  # bumped only by whole-table rollup rebuilds
+
+def user_scope(user_id):
+    return f"user:{user_id}"
+
+def bump_data_version(db: Session, *scopes):
+    now = datetime.utcnow()
+    stmt = sqlite_insert(models.DataVersion).values([{"scope": s, "version": 1, "updated_at": now} for s in scopes])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["scope"],
+        set_={"version": models.DataVersion.version + 1, "updated_at": stmt.excluded.updated_at},
+    )
+    db.execute(stmt)
+
+def get_data_version(db: Session, scope):
+    """(version, updated_at) for a scope; (0, None) if it was never written."""
+    row = db.query(models.DataVersion.version, models.DataVersion.updated_at).filter(models.DataVersion.scope == scope).first()
+    return (row[0], row[1]) if row else (0, None)
+
+# Per-user stats (served from daily_rollups)
+def stats_daily(db: Session, user_id, days=30):
+    R = models.DailyRollup
+    cutoff = (datetime.utcnow() - timedelta(days=days - 1)).date()
+    rows = db.query(R.day, func.sum(R.total_kgco2), func.sum(R.entry_count)) \
+        .filter(R.user_id == user_id, R.day >= cutoff).group_by(R.day).order_by(R.day).all()
+    return [{"date": d.isoformat(), "emissions_kgco2": round(t or 0.0, 4), "entries": n} for d, t, n in rows]
+
+def stats_by_category(db: Session, user_id, since=None):
+    R = models.DailyRollup
+    q = db.query(R.category, func.sum(R.total_kgco2), func.sum(R.entry_count)).filter(R.user_id == user_id)
+    if since is not None:
+        q = q.filter(R.day >= since)
+    rows = q.group_by(R.category).order_by(R.category).all()
+    return [{"category": c, "emissions_kgco2": round(t or 0.0, 4), "entries": n} for c, t, n in rows]
+
+def stats_by_vehicle(db: Session, user_id, since=None):
+    """Distance and emissions per vehicle type, summed in SQL over the typed entry columns."""
+    E = models.Entry
+    q = db.query(E.vehicle_type, func.sum(E.km), func.sum(E.emissions_kgco2), func.count(E.id)) \
+        .filter(E.user_id == user_id, E.category == "transport")
+    if since is not None:
+        q = q.filter(E.timestamp >= since)
+    rows = q.group_by(E.vehicle_type).order_by(E.vehicle_type).all()
+    return [{"vehicle_type": v, "km": round(km or 0.0, 3), "emissions_kgco2": round(t or 0.0, 4), "trips": n} for v, km, t, n in rows]
+
+def stats_summary(db: Session, user_id):
+    R = models.DailyRollup
+    total, count, n_days = db.query(func.sum(R.total_kgco2), func.sum(R.entry_count), func.count(func.distinct(R.day))) \
+        .filter(R.user_id == user_id).one()
+    # the 7 most recent days that have any activity
+    recent = db.query(func.sum(R.total_kgco2)).filter(R.user_id == user_id) \
+        .group_by(R.day).order_by(R.day.desc()).limit(7).all()
+    return {
+        "total_kgco2": round(total or 0.0, 4),
+        "entries": count or 0,
+        "days_with_data": n_days or 0,
+        "avg_daily_recent_kgco2": round(sum(r[0] or 0.0 for r in recent) / len(recent), 4) if recent else None,
+        "recent_days": len(recent),
+    }
+
 # Leaderboard
+def leaderboard_cutoff(now=None):
+    """First rollup day of the 7-day window: today (UTC) and the 6 days before it."""
+    return (now or datetime.utcnow()).date() - timedelta(days=6)
+
+def leaderboard_totals(db: Session, cutoff, user_ids=None):
+    """(user_id, first_name, last_name, total since cutoff) for users who ever logged an entry."""
+    recent = db.query(
+        models.DailyRollup.user_id.label("user_id"),
+        func.sum(models.DailyRollup.total_kgco2).label("total"),
+    ).filter(models.DailyRollup.day >= cutoff)
+    if user_ids is not None:
+        recent = recent.filter(models.DailyRollup.user_id.in_(user_ids))
+    recent = recent.group_by(models.DailyRollup.user_id).subquery()
+    # users who have ever logged an entry still appear (with 0) - probed via the rollup PK
+    has_entries = db.query(models.DailyRollup.user_id).filter(models.DailyRollup.user_id == models.User.id).exists()
+    q = db.query(models.User.id, models.User.first_name, models.User.last_name, func.coalesce(recent.c.total, 0.0)) \
+        .outerjoin(recent, recent.c.user_id == models.User.id) \
+        .filter(has_entries)
+    if user_ids is not None:
+        q = q.filter(models.User.id.in_(user_ids))
+    return q.all()
+
+def users_changed_since(db: Session, since):
+    """(ids of users whose data version moved at or after `since`, newest such change)."""
+    prefix = user_scope("")
+    rows = db.query(models.DataVersion.scope, models.DataVersion.updated_at) \
+        .filter(models.DataVersion.updated_at >= since, models.DataVersion.scope.like(prefix + "%")).all()
+    return [scope[len(prefix):] for scope, _ in rows], max((u for _, u in rows), default=None)
+
+def latest_user_change(db: Session):
+    return db.query(func.max(models.DataVersion.updated_at)).filter(models.DataVersion.scope.like(user_scope("") + "%")).scalar()
+
 def leaderboard_last_7_days(db: Session):
-    from datetime import datetime, timedelta
-    cutoff = datetime.utcnow() - timedelta(days=7)
-    rows = db.query(models.Entry.user_id, models.User.first_name, models.User.last_name, models.User.email).join(models.User).distinct().all()
-    # compute totals per user
-    from collections import defaultdict
-    totals = defaultdict(float)
-    entries = db.query(models.Entry).filter(models.Entry.timestamp >= cutoff).all()
-    for e in entries:
-        totals[e.user_id] += (e.emissions_kgco2 or 0.0)
     result = []
-    for uid, name, lname, email in rows:
-        result.append({"user_id": uid, "name": f"{name} {lname}", "last7_kgco2": round(totals.get(uid, 0.0),4)})
-    result.sort(key=lambda x: x["last7_kgco2"])
+    for uid, name, lname, total in leaderboard_totals(db, leaderboard_cutoff()):
+        result.append({"user_id": uid, "name": f"{name} {lname}", "last7_kgco2": round(total or 0.0,4)})
+    result.sort(key=lambda x: (x["last7_kgco2"], x["user_id"]))
     return result
 
 # Goals
+def add_goal(db: Session, user_id, type_, params):
+    g = models.Goal(id=models.gen_id("goal"), user_id=user_id, type=type_, params=json.dumps(params), created_at=datetime.utcnow())
+    db.add(g)
+    bump_data_version(db, user_scope(user_id))
+    return g
+
 def create_goal(db: Session, user_id, type_, params):
-    import json
-    g = models.Goal(user_id=user_id, type=type_, params=json.dumps(params))
-    db.add(g); db.commit(); db.refresh(g)
+    g = add_goal(db, user_id, type_, params)
+    db.commit(); db.refresh(g)
     return g
 
 def get_goals_for_user(db: Session, user_id):
@@ -1,16 +1,55 @@
 # backend/database.py
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
 import os
 
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
-DB_PATH = os.path.join(BASE_DIR, "data", "carbon.db")
+DB_PATH = os.environ.get("CARBON_DB_PATH", os.path.join(BASE_DIR, "data", "carbon.db"))
 os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
 
 SQLALCHEMY_DATABASE_URL = f"sqlite:///{DB_PATH}"
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+# Engine profile. "production" applies the pragmas below on every new
+# connection; "default" leaves SQLite's stock settings (rollback journal,
+# synchronous=FULL).
+DB_PROFILE = os.environ.get("DB_PROFILE", "production")
+SQLITE_PRAGMAS = {
+    "journal_mode": os.environ.get("SQLITE_JOURNAL_MODE", "WAL"),
+    # NORMAL is durable in WAL mode except for the last commits on power loss
+    "synchronous": os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "mmap_size": int(os.environ.get("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "cache_size": int(os.environ.get("SQLITE_CACHE_SIZE", "-65536")),  # negative = KiB
+    "temp_store": os.environ.get("SQLITE_TEMP_STORE", "MEMORY"),
+}
+READ_POOL_SIZE = int(os.environ.get("DB_READ_POOL_SIZE", "8"))
+
+def _apply_pragmas(dbapi_conn, read_only):
+    cur = dbapi_conn.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            cur.execute(f"PRAGMA {name}={value}")
+        if read_only:
+            cur.execute("PRAGMA query_only=ON")
+    finally:
+        cur.close()
+
+def make_engine(read_only=False, **kwargs):
+    eng = create_engine(
+        SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, **kwargs
+    )
+    if DB_PROFILE == "production":
+        @event.listens_for(eng, "connect")
+        def _on_connect(dbapi_conn, _record):
+            _apply_pragmas(dbapi_conn, read_only)
+    return eng
+
+engine = make_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Separate pool for GET endpoints. Under WAL readers don't block the writer
+# (or each other), and query_only keeps these connections honest.
+read_engine = make_engine(read_only=True, pool_size=READ_POOL_SIZE, max_overflow=READ_POOL_SIZE)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
 Base = declarative_base()
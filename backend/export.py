@@ -0,0 +1,52 @@
+# backend/export.py
+# Serializers for GET /entries/export. They take an iterator of entry tuples
+# (crud.ENTRY_FIELDS order) and yield text chunks of roughly `rows_per_chunk`
+# rows, so memory stays flat however long the history is.
+import csv
+import io
+import json
+
+COLUMNS = ("id", "timestamp", "category", "emissions_kgco2", "details")
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _decode(details):
+    try:
+        return json.loads(details or "{}")
+    except ValueError:
+        return {}
+
+
+def ndjson_chunks(rows, rows_per_chunk=500):
+    buf = []
+    for entry_id, ts, category, details, emissions in rows:
+        buf.append(json.dumps({
+            "id": entry_id,
+            "timestamp": ts.isoformat() if ts else None,
+            "category": category,
+            "emissions_kgco2": emissions,
+            "details": _decode(details),
+        }))
+        if len(buf) >= rows_per_chunk:
+            yield "\n".join(buf) + "\n"
+            buf.clear()
+    if buf:
+        yield "\n".join(buf) + "\n"
+
+
+def csv_chunks(rows, rows_per_chunk=500):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(COLUMNS)
+    n = 0
+    for entry_id, ts, category, details, emissions in rows:
+        # details stay a JSON string in CSV, so no decode is needed
+        writer.writerow((entry_id, ts.isoformat() if ts else "", category, emissions, details or "{}"))
+        n += 1
+        if n >= rows_per_chunk:
+            yield out.getvalue()
+            out.seek(0)
+            out.truncate()
+            n = 0
+    if out.tell():
+        yield out.getvalue()
@@ -1,29 +1,184 @@
 # backend/factors.py
-# Starter emission factors. Tune these later per region/authority.
-FACTORS = {
-    # transport
-    "car_petrol_kgco2_per_km": 0.192,
-    "car_petrol_kgco2_per_liter": 2.31,
-    "bus_kgco2_per_km": 0.105,
-    "train_kgco2_per_km": 0.041,
-    "flight_short_kgco2_per_km": 0.255,
-    # electricity
-    "electricity_kgco2_per_kwh": 0.475,
-    # food (per kg)
-    "beef_kgco2_per_kg": 27.0,
-    "chicken_kgco2_per_kg": 6.9,
-    "avg_meal_kgco2": 2.5,
-    # waste
-    "waste_kgco2_per_kg": 1.0
-}
-
-# Photo label -> mapping for quick estimation (label normalised to lowercase)
-PHOTO_LABEL_MAP = {
-    "beef burger": {"category": "food", "kg": 0.2, "factor_key": "beef_kgco2_per_kg"},
-    "burger": {"category": "food", "kg": 0.2, "factor_key": "beef_kgco2_per_kg"},
-    "beef": {"category": "food", "kg": 0.2, "factor_key": "beef_kgco2_per_kg"},
-    "chicken": {"category": "food", "kg": 0.2, "factor_key": "chicken_kgco2_per_kg"},
-    "chicken sandwich": {"category": "food", "kg": 0.2, "factor_key": "chicken_kgco2_per_kg"},
-    "soda can": {"category": "drink", "kg": 0.02, "factor_key": "avg_meal_kgco2"},
-    # Add more mappings as you discover labels
-}
+# Emission factor tables, loaded from versioned files instead of code.
+#
+# Every JSON file in FACTOR_SETS_DIR is one factor set:
+#   {"region": "uk", "effective_from": "2024-01-01", "source": "...",
+#    "factors": {"car_petrol_kgco2_per_km": 0.17, ...},
+#    "photo_labels": {"beef burger": {"category", "kg", "factor_key"}, ...}}
+# An activity is priced with the set for FACTOR_REGION that was in effect on
+# its timestamp's date. Dates the region does not cover fall back to the
+# "global" sets. A set's version is its region, date and a digest of its
+# content, so editing a file in place also yields a new version.
+#
+# The directory is polled (at most every FACTOR_RELOAD_INTERVAL seconds, on
+# use) and reloaded when a file changes, is added or is removed, so a factor
+# update needs no restart. A directory that fails to load leaves the previous
+# tables in place.
+import bisect
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime
+
+from . import labels
+
+log = logging.getLogger(__name__)
+
+FACTOR_SETS_DIR = os.environ.get("FACTOR_SETS_DIR", os.path.join(os.path.dirname(__file__), "factor_sets"))
+FACTOR_REGION = os.environ.get("FACTOR_REGION", "global").strip().lower()
+FACTOR_RELOAD_INTERVAL = float(os.environ.get("FACTOR_RELOAD_INTERVAL", "5"))  # seconds
+
+GLOBAL_REGION = "global"
+# Entry.factor_version for emissions given by the client rather than derived
+MANUAL_VERSION = "manual"
+# keys the calculators read directly; every set must define them
+REQUIRED_FACTORS = (
+    "car_petrol_kgco2_per_km", "car_petrol_kgco2_per_liter", "bus_kgco2_per_km", "train_kgco2_per_km",
+    "flight_short_kgco2_per_km", "electricity_kgco2_per_kwh", "avg_meal_kgco2", "waste_kgco2_per_kg",
+)
+
+
+class FactorTable:
+    """One immutable factor set."""
+
+    def __init__(self, region, effective_from, factors, photo_labels, source="", path=None):
+        self.region = region
+        self.effective_from = effective_from
+        self.factors = factors
+        self.photo_labels = photo_labels
+        self.source = source
+        self.path = path
+        digest = hashlib.sha256(json.dumps([factors, photo_labels], sort_keys=True).encode()).hexdigest()
+        self.version = f"{region}-{effective_from.isoformat()}-{digest[:8]}"
+        self._matcher = None
+        self._lock = threading.Lock()
+
+    def matcher(self):
+        """labels.LabelMatcher over photo_labels plus the label vocabulary file, built on first use."""
+        with self._lock:
+            if self._matcher is None:
+                self._matcher = labels.build_matcher(self.photo_labels)
+            return self._matcher
+
+    def describe(self):
+        return {"version": self.version, "region": self.region, "effective_from": self.effective_from.isoformat(),
+                "source": self.source, "factors": self.factors}
+
+
+def load_table(path):
+    with open(path, encoding="utf-8") as f:
+        raw = json.load(f)
+    factors = {k: float(v) for k, v in (raw.get("factors") or {}).items()}
+    missing = [k for k in REQUIRED_FACTORS if k not in factors]
+    if missing:
+        raise ValueError(f"{path}: missing factors {', '.join(missing)}")
+    photo_labels = {}
+    for label, m in (raw.get("photo_labels") or {}).items():
+        photo_labels[label.strip().lower()] = {"category": m["category"], "kg": float(m["kg"]), "factor_key": m["factor_key"]}
+    return FactorTable(
+        (raw.get("region") or GLOBAL_REGION).strip().lower(), date.fromisoformat(raw["effective_from"]),
+        factors, photo_labels, raw.get("source", ""), path,
+    )
+
+
+def _signature(directory):
+    return tuple(sorted(
+        (e.name, e.stat().st_mtime_ns, e.stat().st_size) for e in os.scandir(directory) if e.name.endswith(".json")
+    ))
+
+
+def _timeline(tables, region):
+    """Sorted [(effective_from, table)]: the region's sets, preceded by the global sets it does not cover."""
+    by_region = {}
+    for t in tables:
+        by_region.setdefault(t.region, {})[t.effective_from] = t  # same region and date: last file wins
+    own = sorted(by_region.get(region, {}).items(), key=lambda kv: kv[0])
+    first = own[0][0] if own else None
+    fallback = [] if region == GLOBAL_REGION else sorted(by_region.get(GLOBAL_REGION, {}).items(), key=lambda kv: kv[0])
+    timeline = [(d, t) for d, t in fallback if first is None or d < first] + own
+    if not timeline:
+        raise ValueError(f"no factor sets for region {region!r} or {GLOBAL_REGION!r}")
+    return timeline
+
+
+class FactorRegistry:
+    def __init__(self, directory=FACTOR_SETS_DIR, region=FACTOR_REGION, reload_interval=FACTOR_RELOAD_INTERVAL):
+        self.directory = directory
+        self.region = region
+        self.reload_interval = reload_interval
+        self.generation = 0  # bumped whenever the effective timeline changes
+        self.reloads = 0
+        self.reload_errors = 0
+        self._lock = threading.Lock()
+        self._signature = None
+        self._checked_at = 0.0
+        self._state = ([], [])  # (effective_from dates, tables), replaced as a whole
+        self.reload()
+
+    def reload(self):
+        """Re-read the directory now. Returns True if the timeline changed."""
+        with self._lock:
+            self._checked_at = time.monotonic()
+            try:
+                sig = _signature(self.directory)
+                if sig == self._signature:
+                    return False
+                tables = [load_table(os.path.join(self.directory, name)) for name, _, _ in sig]
+                timeline = _timeline(tables, self.region)
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                self.reload_errors += 1
+                if not self._state[1]:
+                    raise
+                log.error("factor sets not reloaded, keeping %s: %s", self.versions(), e)
+                return False
+            self._signature = sig
+            state = ([d for d, _ in timeline], [t for _, t in timeline])
+            changed = state[0] != self._state[0] or [t.version for t in state[1]] != self.versions()
+            self.reloads += 1
+            if changed:
+                # an unchanged timeline keeps its tables, and their warm label matchers
+                self._state = state
+                self.generation += 1
+                log.info("factor sets loaded: %s", ", ".join(self.versions()))
+            return changed
+
+    def maybe_reload(self):
+        if time.monotonic() - self._checked_at >= self.reload_interval:
+            self.reload()
+
+    def versions(self):
+        return [t.version for t in self._state[1]]
+
+    def table_for(self, when=None):
+        """The set in effect on `when` (date or datetime, default now); dates before the first set use it."""
+        self.maybe_reload()
+        starts, tables = self._state
+        if when is None:
+            when = datetime.utcnow()
+        if isinstance(when, datetime):
+            when = when.date()
+        return tables[max(bisect.bisect_right(starts, when) - 1, 0)]
+
+    def current(self):
+        return self.table_for()
+
+    def windows(self):
+        """[(table, start, end)] with start/end as datetimes; None means unbounded."""
+        self.maybe_reload()
+        starts, tables = self._state
+        bounds = [None] + [datetime.combine(d, datetime.min.time()) for d in starts[1:]] + [None]
+        return [(t, bounds[i], bounds[i + 1]) for i, t in enumerate(tables)]
+
+
+registry = FactorRegistry()
+
+
+def current():
+    return registry.current()
+
+
+def table_for(when=None):
+    return registry.table_for(when)
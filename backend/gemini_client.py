@@ -1,44 +1,204 @@
-import requests
+import asyncio
+import base64
+import json
+import os
+import random
+import time
 
-# Hard-code your API key here
-GEMINI_API_KEY = "YOUR_REAL_GEMINI_KEY"
+import httpx
 
-GEMINI_URL = (
-    "https://generativelanguage.googleapis.com/v1beta/models/"
-    "gemini-1.5-flash:generateContent"
+from .prompt_cache import PromptCache, make_key
+from . import metrics
+
+# Hard-code your API key here (or set GEMINI_API_KEY)
+GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY", "YOUR_REAL_GEMINI_KEY")
+
+# Point GEMINI_BASE_URL at a local stub server for tests / benchmarks
+GEMINI_BASE_URL = os.environ.get("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com/v1beta")
+GEMINI_MODEL = os.environ.get("GEMINI_MODEL", "gemini-1.5-flash")
+
+GEMINI_MAX_IN_FLIGHT = int(os.environ.get("GEMINI_MAX_IN_FLIGHT", "16"))
+GEMINI_DEADLINE = float(os.environ.get("GEMINI_DEADLINE", "30"))
+GEMINI_RETRIES = int(os.environ.get("GEMINI_RETRIES", "2"))
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+VISION_PROMPT = (
+    "List the objects in this photo that matter for a carbon footprint estimate "
+    "(food, drinks, packaging, appliances, receipts). Reply with only a JSON array "
+    'of objects like {"label": "beef burger", "confidence": 0.9}, labels in lowercase.'
 )
 
-# Main function used by FastAPI
-def call_gemini_text(prompt: str):
-    payload = {
-        "contents": [
-            {
-                "parts": [{"text": prompt}]
-            }
+
+class GeminiError(Exception):
+    pass
+
+
+class GeminiClient:
+    """
+    Async Gemini client sharing one keep-alive connection pool.
+
+    At most `max_in_flight` requests are outstanding at once; callers beyond
+    that wait for a slot, and that wait counts against their deadline. Each call
+    has an overall deadline covering queueing, retries and backoff.
+    """
+
+    def __init__(self, api_key=GEMINI_API_KEY, base_url=GEMINI_BASE_URL, model=GEMINI_MODEL,
+                 max_in_flight=GEMINI_MAX_IN_FLIGHT, deadline=GEMINI_DEADLINE, retries=GEMINI_RETRIES,
+                 backoff=0.5, transport=None):
+        self.api_key = api_key
+        self.url = f"{base_url.rstrip('/')}/models/{model}:generateContent"
+        self.max_in_flight = max_in_flight
+        self.deadline = deadline
+        self.retries = retries
+        self.backoff = backoff
+        self._transport = transport
+        self._loop = None
+        self._http = None
+        self._sem = None
+
+    async def _ensure(self):
+        # the pool and semaphore belong to the running event loop; a pool left
+        # over from an earlier loop is closed rather than just dropped
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            stale, stale_loop = self._http, self._loop
+            self._loop = loop
+            self._http = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=self.max_in_flight, max_keepalive_connections=self.max_in_flight),
+                timeout=httpx.Timeout(self.deadline),
+                transport=self._transport,
+            )
+            self._sem = asyncio.Semaphore(self.max_in_flight)
+            if stale is not None:
+                await _close_stale(stale, stale_loop)
+        return self._http, self._sem
+
+    async def aclose(self):
+        if self._http is not None:
+            await self._http.aclose()
+        self._loop = self._http = self._sem = None
+
+    async def _post(self, payload):
+        http, sem = await self._ensure()
+        attempt = 0
+        async with sem:
+            while True:
+                try:
+                    r = await http.post(self.url, params={"key": self.api_key}, json=payload)
+                    if r.status_code not in RETRY_STATUS or attempt >= self.retries:
+                        if not r.is_success:
+                            raise GeminiError(f"Gemini error: {r.text}")
+                        return r.json()
+                except httpx.TransportError:
+                    if attempt >= self.retries:
+                        raise
+                # full-jitter exponential backoff
+                await asyncio.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+                attempt += 1
+
+    async def generate(self, payload, deadline=None, kind="text"):
+        t = time.perf_counter()
+        outcome = "error"
+        try:
+            data = await asyncio.wait_for(self._post(payload), timeout=deadline or self.deadline)
+            outcome = "ok"
+            return data
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            raise
+        finally:
+            metrics.gemini_latency.observe(kind, outcome, value=time.perf_counter() - t)
+
+    async def generate_text(self, prompt: str, deadline=None):
+        data = await self.generate({"contents": [{"parts": [{"text": prompt}]}]}, deadline)
+        return _first_text(data), data
+
+    async def detect_objects(self, image: bytes, mime_type="image/jpeg", deadline=None):
+        payload = {
+            "contents": [{
+                "parts": [
+                    {"text": VISION_PROMPT},
+                    {"inline_data": {"mime_type": mime_type, "data": base64.b64encode(image).decode()}},
+                ]
+            }],
+            "generationConfig": {"response_mime_type": "application/json"},
+        }
+        data = await self.generate(payload, deadline, kind="vision")
+        try:
+            items = json.loads(_first_text(data))
+        except ValueError:
+            raise GeminiError("Vision response was not JSON")
+        return [
+            {"label": str(i.get("label", "")).lower(), "confidence": float(i.get("confidence") or 0.0)}
+            for i in items if isinstance(i, dict)
         ]
-    }
 
+
+async def _close_stale(http, loop):
+    if loop.is_running():
+        # still running on another thread: close it there
+        asyncio.run_coroutine_threadsafe(http.aclose(), loop)
+        return
     try:
-        r = requests.post(
-            GEMINI_URL,
-            params={"key": GEMINI_API_KEY},
-            json=payload,
-            timeout=30,
-        )
+        await http.aclose()
+    except RuntimeError:
+        # its connections were bound to a loop that is already closed; their
+        # sockets go when the transports are collected
+        pass
+
+
+def _first_text(data):
+    return (
+        data.get("candidates", [{}])[0]
+        .get("content", {})
+        .get("parts", [{}])[0]
+        .get("text", "")
+    )
+
+
+client = GeminiClient()
+cache = PromptCache()
 
-        if not r.ok:
-            return f"Gemini error: {r.text}"
 
-        data = r.json()
+def _error_response(e):
+    if isinstance(e, GeminiError):
+        return {"content": str(e), "raw": {}}
+    if isinstance(e, asyncio.TimeoutError):
+        return {"content": "Assistant timed out", "raw": {}}
+    return {"content": f"Assistant crashed: {str(e)}", "raw": {}}
 
-        output = (
-            data.get("candidates", [{}])[0]
-            .get("content", {})
-            .get("parts", [{}])[0]
-            .get("text", "")
-        )
 
-        return output or "No response"
+# Main function used by FastAPI
+async def call_gemini_text(prompt: str, deadline=None):
+    try:
+        output, data = await client.generate_text(prompt, deadline)
+        return {"content": output or "No response", "raw": data}
+    except Exception as e:
+        return _error_response(e)
+
 
+async def call_gemini_text_cached(prompt: str, context: str = "", deadline=None):
+    """
+    call_gemini_text behind the prompt cache. The key is the normalised prompt
+    plus a fingerprint of `context`, which is prepended to the prompt sent to
+    the model. Only successful responses are cached.
+    """
+    key = make_key(prompt, context)
+    hit = await asyncio.to_thread(cache.get, key)
+    if hit is not None:
+        return hit
+    full_prompt = (context + "\n\nUser prompt:\n" + prompt) if context else prompt
+    try:
+        output, data = await client.generate_text(full_prompt, deadline)
     except Exception as e:
-        return f"Assistant crashed: {str(e)}"
+        return _error_response(e)
+    res = {"content": output or "No response", "raw": data}
+    if output:
+        await asyncio.to_thread(cache.set, key, res)
+    return res
+
+
+async def call_gemini_vision(image: bytes, mime_type="image/jpeg", deadline=None):
+    """Returns [{"label", "confidence"}, ...]; raises on failure."""
+    return await client.detect_objects(image, mime_type, deadline)
@@ -0,0 +1,97 @@
+# backend/ingest.py
+# Parsing + validation of activity batches (POST /entries/bulk).
+import json
+from datetime import datetime, timezone
+from . import factors, utils
+
+MAX_BULK_ROWS = 50000
+
+def parse_records(body: bytes):
+    """
+    Accept a JSON array or NDJSON (one object per line).
+    Returns a list of (item, error) pairs, one per record, so a bad line
+    only fails that row.
+    """
+    text = body.decode("utf-8-sig").strip()
+    if not text:
+        return []
+    if text.startswith("["):
+        try:
+            items = json.loads(text)
+        except ValueError as e:
+            raise ValueError(f"Invalid JSON array: {e}")
+        return [(item, None) for item in items]
+    out = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            out.append((json.loads(line), None))
+        except ValueError as e:
+            out.append((None, f"invalid JSON: {e}"))
+    return out
+
+def _parse_ts(value):
+    ts = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+def prepare_row(item):
+    """Validate one activity and return the row dict crud.bulk_create_entries expects (emissions unset)."""
+    if not isinstance(item, dict):
+        raise ValueError("activity must be an object")
+    category = item.get("category")
+    if not category or not isinstance(category, str):
+        raise ValueError("category is required")
+    details = item.get("details") or {}
+    if not isinstance(details, dict):
+        raise ValueError("details must be an object")
+    row = {"category": category, "details": details, "timestamp": None, "emissions": None}
+    if item.get("timestamp"):
+        try:
+            row["timestamp"] = _parse_ts(item["timestamp"])
+        except ValueError:
+            raise ValueError("invalid timestamp")
+    if item.get("emissions_kgco2") is not None:
+        row["emissions"] = float(item["emissions_kgco2"])
+    return row
+
+def price_row(r):
+    """
+    Fill in emissions for one prepared row that has no explicit override,
+    priced with the factor set in effect on the row's timestamp.
+    Raises ValueError/TypeError on details the calculators can't read.
+    """
+    if r["emissions"] is None:
+        table = factors.table_for(r["timestamp"])
+        r["emissions"] = utils.calc_entry_emissions(r["category"], r["details"], table)
+        r["factor_version"] = table.version
+    else:
+        r["factor_version"] = factors.MANUAL_VERSION
+    return r
+
+def compute_emissions(rows):
+    """price_row over every prepared row."""
+    for r in rows:
+        price_row(r)
+    return rows
+
+def prepare_batch(records):
+    """
+    records: output of parse_records. Returns (rows, positions, results) where
+    rows are ready to insert, positions maps each row back to its input index
+    and results holds the per-index error entries.
+    """
+    rows, positions, results = [], [], {}
+    for i, (item, err) in enumerate(records):
+        if err is None:
+            try:
+                rows.append(price_row(prepare_row(item)))
+                positions.append(i)
+                continue
+            except (ValueError, TypeError) as e:
+                err = str(e)
+        results[i] = {"index": i, "error": err}
+    return rows, positions, results
@@ -0,0 +1,148 @@
+# backend/jobs.py
+# Background photo analysis. Jobs are persisted in photo_jobs and run by a
+# fixed number of asyncio workers on the app's event loop, so model latency
+# never holds a request open and a burst of uploads just lengthens the queue.
+# Every uvicorn worker runs its own runner; a job is only analysed by the one
+# that wins crud.claim_photo_job for it.
+import asyncio
+import json
+import logging
+import os
+import random
+from datetime import datetime, timedelta
+
+from .database import SessionLocal
+from . import models, crud, gemini_client, utils, photo_store, factors
+
+log = logging.getLogger(__name__)
+
+PHOTO_JOB_WORKERS = int(os.environ.get("PHOTO_JOB_WORKERS", "4"))
+PHOTO_JOB_MAX_ATTEMPTS = int(os.environ.get("PHOTO_JOB_MAX_ATTEMPTS", "3"))
+PHOTO_JOB_RETRY_DELAY = float(os.environ.get("PHOTO_JOB_RETRY_DELAY", "2"))
+# a job still "running" after this long belongs to a process that died; keep
+# it well above one attempt's worst case (gemini deadline x retries)
+PHOTO_JOB_STALE_AFTER = float(os.environ.get("PHOTO_JOB_STALE_AFTER", "600"))  # seconds
+
+UNKNOWN_DETECTION = [{"label":"unknown","confidence":0.0}]
+
+
+def _with_db(fn, *args, **kwargs):
+    db = SessionLocal()
+    try:
+        return fn(db, *args, **kwargs)
+    finally:
+        db.close()
+
+
+def job_status(job):
+    out = {"job_id": job.id, "status": job.status, "attempts": job.attempts, "sha256": job.sha256}
+    if job.error:
+        out["error"] = job.error
+    if job.result:
+        out.update(json.loads(job.result))
+    return out
+
+
+def _stale_before():
+    return datetime.utcnow() - timedelta(seconds=PHOTO_JOB_STALE_AFTER)
+
+
+def _claim_job(db, job_id):
+    if not crud.claim_photo_job(db, job_id, _stale_before()):
+        return None  # finished, or another worker has it
+    return db.get(models.PhotoJob, job_id)
+
+
+def _known_detections(db, sha256):
+    prev = crud.get_photo_by_sha256(db, sha256)
+    if prev is None:
+        return None
+    try:
+        detections = json.loads(prev.detected_json)
+    except ValueError:
+        return None
+    return None if detections == UNKNOWN_DETECTION else detections
+
+
+def _persist(db, job, detections, reused):
+    table = factors.current()
+    est_total, details = utils.estimate_from_photo_labels(detections, table)
+    # photo, entry and the job's "done" commit together, so a crash can't
+    # leave a photo behind for the retry to insert again
+    photo = crud.add_photo(db, job.user_id, job.path, detections, est_total, sha256=job.sha256)
+    crud.add_entry(db, job.user_id, "photo-analysis", {"file": os.path.relpath(job.path, photo_store.UPLOAD_DIR), "detection_details": details}, est_total, table.version)
+    result = {"photo_id": photo.id, "estimated_kgco2": est_total, "detection_details": details, "reused": reused}
+    crud.update_photo_job(db, job.id, status="done", error=None, photo_id=photo.id, result=json.dumps(result))
+
+
+async def analyze(job_id):
+    """Run one job. Returns the delay before a retry, or None when finished."""
+    job = await asyncio.to_thread(_with_db, _claim_job, job_id)
+    if job is None:
+        return None
+    detections = await asyncio.to_thread(_with_db, _known_detections, job.sha256)
+    reused = detections is not None
+    try:
+        if not reused:
+            contents = await asyncio.to_thread(photo_store.read, job.path)
+            detections = await gemini_client.call_gemini_vision(contents, job.mime_type or "image/jpeg")
+        await asyncio.to_thread(_with_db, _persist, job, detections, reused)
+        return None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        if job.attempts >= PHOTO_JOB_MAX_ATTEMPTS:
+            await asyncio.to_thread(_with_db, crud.update_photo_job, job.id, status="failed", error=error)
+            return None
+        await asyncio.to_thread(_with_db, crud.update_photo_job, job.id, status="queued", error=error)
+        return PHOTO_JOB_RETRY_DELAY * (2 ** (job.attempts - 1)) * random.uniform(0.5, 1.5)
+
+
+class PhotoJobRunner:
+    def __init__(self, workers=PHOTO_JOB_WORKERS):
+        self.workers = workers
+        self.queue = None
+        self._tasks = []
+        self._pending_retries = set()
+
+    async def start(self):
+        self.queue = asyncio.Queue()
+        # pick up anything queued or left over from a dead process; the claim
+        # in analyze() keeps other workers doing the same from double-running it
+        for job_id in await asyncio.to_thread(_with_db, crud.pending_photo_job_ids, _stale_before()):
+            self.queue.put_nowait(job_id)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        tasks = self._tasks + list(self._pending_retries)
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, job_id):
+        self.queue.put_nowait(job_id)
+
+    def depth(self):
+        return self.queue.qsize() if self.queue is not None else 0
+
+    async def _retry_later(self, job_id, delay):
+        await asyncio.sleep(delay)
+        self.queue.put_nowait(job_id)
+
+    async def _worker(self):
+        while True:
+            job_id = await self.queue.get()
+            try:
+                delay = await analyze(job_id)
+                if delay is not None:
+                    t = asyncio.create_task(self._retry_later(job_id, delay))
+                    self._pending_retries.add(t)
+                    t.add_done_callback(self._pending_retries.discard)
+            except Exception:
+                # a broken job must not take the worker down with it
+                log.exception("photo job %s crashed", job_id)
+            finally:
+                self.queue.task_done()
+
+
+runner = PhotoJobRunner()
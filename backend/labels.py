@@ -0,0 +1,227 @@
+# backend/labels.py
+# Resolves free-text photo detections ("double beef burger", "Cheeseburgers")
+# to entries of a label vocabulary (label -> category, kg, factor_key).
+#
+# Labels are normalised (case, accents, punctuation, plurals, filler words),
+# then scored against the vocabulary through an inverted token index. A query
+# token the vocabulary doesn't know is mapped to known tokens through a
+# character-trigram index, which catches typos and compounds ("cheeseburger"
+# -> "cheese", "burger"). Lookups touch only the postings of the query's
+# tokens, never the whole vocabulary, and resolved labels are memoised.
+import csv
+import math
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict, defaultdict, namedtuple
+
+VOCAB_PATH = os.environ.get("LABEL_VOCAB_PATH", os.path.join(os.path.dirname(__file__), "label_vocab.csv"))
+LABEL_CACHE_SIZE = int(os.environ.get("LABEL_CACHE_SIZE", "50000"))
+MIN_SCORE = float(os.environ.get("LABEL_MIN_SCORE", "0.5"))
+FUZZY_MIN_SIM = 0.5  # trigram Dice similarity for an unknown token to count
+FUZZY_MAX_TOKENS = 3  # known tokens an unknown query token may expand to
+SYNONYM_WEIGHT = 0.98  # a canonical label beats a synonym on an otherwise equal score
+
+STOPWORDS = frozenset("a an the of with and in on some piece pieces slice slices plate bowl cup glass serving".split())
+# irregular plurals; regular ones are handled by _singular
+IRREGULAR = {"children": "child", "knives": "knife", "loaves": "loaf", "leaves": "leaf", "potatoes": "potato",
+             "tomatoes": "tomato", "mice": "mouse", "geese": "goose", "teeth": "tooth", "fries": "fries"}
+
+Match = namedtuple("Match", ["label", "score", "mapping"])
+
+_non_alnum = re.compile(r"[^a-z0-9]+")
+
+
+def _singular(tok, known=frozenset()):
+    if tok in IRREGULAR:
+        return IRREGULAR[tok]
+    if len(tok) <= 3 or tok.endswith(("ss", "us", "is")):
+        return tok
+    if tok.endswith("ies"):
+        # "berries" -> "berry" but "cookies" -> "cookie": take -y only when
+        # the vocabulary knows that form and not the -ie one
+        ie, y = tok[:-1], tok[:-3] + "y"
+        return y if y in known and ie not in known else ie
+    if tok.endswith(("ches", "shes", "xes", "zes", "sses")):
+        return tok[:-2]
+    if tok.endswith("s"):
+        return tok[:-1]
+    return tok
+
+
+def _words(text):
+    text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode().lower()
+    return [t for t in _non_alnum.split(text) if t and t not in STOPWORDS]
+
+
+def tokens(text, known=frozenset()):
+    """Normalised tokens; `known` (vocabulary tokens) settles -ies plurals."""
+    return [_singular(t, known) for t in _words(text)]
+
+
+def normalize(text, known=frozenset()):
+    return " ".join(tokens(text, known))
+
+
+def _trigrams(tok):
+    padded = f"#{tok}#"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class LabelMatcher:
+    def __init__(self, vocabulary, cache_size=LABEL_CACHE_SIZE):
+        """vocabulary: {label: {"category", "kg", "factor_key", "synonyms"?: [...]}}"""
+        self.vocabulary = {}
+        self._phrases = {}  # normalised surface form -> label
+        self._surface = []  # (label, token tuple, weight) per surface form
+        forms_by_label = {
+            label: [(label, 1.0)] + [(syn, SYNONYM_WEIGHT) for syn in mapping.get("synonyms") or ()]
+            for label, mapping in vocabulary.items()
+        }
+        # words the vocabulary spells out, for telling "cookies" from "berries"
+        self._known = frozenset(
+            _singular(w) for forms in forms_by_label.values() for form, _ in forms
+            for w in _words(form) if not w.endswith("ies")
+        )
+        postings = defaultdict(set)
+        for label, mapping in vocabulary.items():
+            mapping = {k: v for k, v in mapping.items() if k != "synonyms"}
+            self.vocabulary[label] = mapping
+            for form, weight in forms_by_label[label]:
+                toks = tuple(tokens(form, self._known))
+                if not toks:
+                    continue
+                key = " ".join(toks)
+                # the first label to claim a surface form keeps it
+                if key in self._phrases:
+                    continue
+                self._phrases[key] = label
+                postings_id = len(self._surface)
+                self._surface.append((label, toks, weight))
+                for t in set(toks):
+                    postings[t].add(postings_id)
+        self._postings = {t: tuple(ids) for t, ids in postings.items()}
+        n = max(len(self._surface), 1)
+        self._idf = {t: math.log(1 + n / len(ids)) for t, ids in self._postings.items()}
+        self._surface_weight = [sum(self._idf[t] for t in set(toks)) for _, toks, _ in self._surface]
+        self._grams = defaultdict(list)
+        for t in self._postings:
+            for g in _trigrams(t):
+                self._grams[g].append(t)
+        self._cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.vocabulary)
+
+    # -- query token -> known tokens ---------------------------------------------
+    def _expand(self, tok):
+        """[(known token, weight)] for one query token."""
+        if tok in self._postings:
+            return [(tok, 1.0)]
+        grams = _trigrams(tok)
+        overlap = defaultdict(int)
+        for g in grams:
+            for known in self._grams.get(g, ()):
+                overlap[known] += 1
+        scored = []
+        for known, common in overlap.items():
+            kg = len(known) + 2  # trigram count of the padded token
+            sim = 2.0 * common / (len(grams) + kg)
+            # a whole known word inside a compound ("cheese|burger")
+            if len(known) >= 4 and known in tok:
+                sim = max(sim, 0.9)
+            if sim >= FUZZY_MIN_SIM:
+                scored.append((sim, known))
+        scored.sort(reverse=True)
+        return [(known, sim) for sim, known in scored[:FUZZY_MAX_TOKENS]]
+
+    # -- ranking -------------------------------------------------------------------
+    def _rank(self, toks, k):
+        matched = {}  # known token -> weight
+        for tok in toks:
+            for known, w in self._expand(tok):
+                if w > matched.get(known, 0.0):
+                    matched[known] = w
+        if not matched:
+            return []
+        query_weight = sum(self._idf[t] for t in matched)
+        overlap = defaultdict(float)
+        for t, w in matched.items():
+            for sid in self._postings[t]:
+                overlap[sid] += self._idf[t] * w
+        best = {}
+        for sid, hit in overlap.items():
+            label, _, weight = self._surface[sid]
+            # F1 of how much of the surface form and of the query is covered
+            p, r = hit / self._surface_weight[sid], hit / query_weight
+            score = weight * 2 * p * r / (p + r)
+            if score > best.get(label, 0.0):
+                best[label] = score
+        ranked = sorted(best.items(), key=lambda kv: (-kv[1], kv[0]))[:k]
+        return [Match(label, round(score, 4), self.vocabulary[label]) for label, score in ranked]
+
+    def matches(self, text, k=5):
+        """Up to k Matches, best first; an exact (normalised) phrase scores 1.0."""
+        return self._matches(tokens(text, self._known), k)
+
+    def _matches(self, toks, k):
+        exact = self._phrases.get(" ".join(toks))
+        ranked = self._rank(toks, k)
+        if exact is not None:
+            ranked = [Match(exact, 1.0, self.vocabulary[exact])] + [m for m in ranked if m.label != exact][:k - 1]
+        return ranked
+
+    def resolve(self, text):
+        """Best Match scoring at least MIN_SCORE, or None. Memoised per normalised label."""
+        toks = tokens(text, self._known)
+        key = " ".join(toks)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key]
+            self.misses += 1
+        found = self._matches(toks, 1)
+        best = found[0] if found and found[0].score >= MIN_SCORE else None
+        with self._lock:
+            self._cache[key] = best
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return best
+
+    def label_map(self):
+        return dict(self.vocabulary)
+
+
+def load_vocabulary(path=VOCAB_PATH):
+    """label,category,kg,factor_key,synonyms (synonyms separated by |)."""
+    vocab = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            label = normalize(row["label"])
+            if not label:
+                continue
+            vocab[label] = {
+                "category": row["category"].strip(),
+                "kg": float(row["kg"]),
+                "factor_key": row["factor_key"].strip(),
+                "synonyms": [s.strip() for s in (row.get("synonyms") or "").split("|") if s.strip()],
+            }
+    return vocab
+
+
+def build_matcher(builtin_map, path=VOCAB_PATH):
+    """Matcher over builtin_map (which wins on conflicts) plus the vocabulary file."""
+    vocab = {normalize(k): dict(v) for k, v in builtin_map.items()}
+    if path and os.path.exists(path):
+        for label, mapping in load_vocabulary(path).items():
+            if label in vocab:
+                vocab[label].setdefault("synonyms", mapping["synonyms"])
+            else:
+                vocab[label] = mapping
+    return LabelMatcher(vocab)
@@ -0,0 +1,81 @@
+# backend/legacy_import.py
+# One-shot import of the legacy file store (users/entries) into SQLite.
+# Idempotent: records whose ids already exist are skipped.
+import json
+from datetime import datetime, timezone
+from . import models, crud, storage
+
+# legacy accounts have no password; this hash never verifies
+UNUSABLE_PASSWORD = "!"
+
+def _parse_ts(value):
+    if not value:
+        return datetime.utcnow()
+    try:
+        ts = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return datetime.utcnow()
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+def import_legacy(db, chunk_size=1000):
+    users_added = entries_added = skipped = 0
+    # legacy entries reference users either by user_id or as "user_<username>"
+    user_map = {}
+    for rec in storage.read_users():
+        email = (rec.get("username") or "").strip().lower()
+        existing = db.query(models.User).filter(
+            (models.User.id == rec["user_id"]) | (models.User.email == email)
+        ).first()
+        if existing is None:
+            display = (rec.get("display_name") or email or rec["user_id"]).strip()
+            first, _, last = display.partition(" ")
+            existing = models.User(
+                id=rec["user_id"], first_name=first, last_name=last, email=email or f"{rec['user_id']}@legacy.invalid",
+                password_hash=UNUSABLE_PASSWORD, created_at=_parse_ts(rec.get("created_at")),
+            )
+            db.add(existing)
+            users_added += 1
+        user_map[rec["user_id"]] = existing.id
+        if email:
+            user_map[f"user_{email}"] = existing.id
+    db.commit()
+
+    batch = []
+    def flush():
+        ids = [m["id"] for m in batch]
+        known = {r[0] for r in db.query(models.Entry.id).filter(models.Entry.id.in_(ids))}
+        fresh = [m for m in batch if m["id"] not in known]
+        db.bulk_insert_mappings(models.Entry, fresh)
+        if fresh:
+            crud.bump_data_version(db, *{crud.user_scope(m["user_id"]) for m in fresh})
+        db.commit()
+        batch.clear()
+        return len(fresh), len(ids) - len(fresh)
+
+    for rec in storage.read_entries():
+        uid = user_map.get(rec.get("user_id"))
+        if uid is None:
+            skipped += 1
+            continue
+        details = rec.get("details") or {}
+        batch.append({
+            "id": rec["entry_id"],
+            "user_id": uid,
+            "timestamp": _parse_ts(rec.get("timestamp")),
+            "category": rec.get("type") or rec.get("category") or "unknown",
+            "details": json.dumps(details),
+            "emissions_kgco2": float(rec.get("emissions_kgco2") or 0.0),
+            **models.detail_columns(details),
+        })
+        if len(batch) >= chunk_size:
+            added, dup = flush()
+            entries_added += added; skipped += dup
+    if batch:
+        added, dup = flush()
+        entries_added += added; skipped += dup
+    if entries_added:
+        crud.rebuild_daily_rollups(db)
+        crud.rebuild_user_totals(db)
+    return {"users_added": users_added, "entries_added": entries_added, "skipped": skipped}
@@ -1,19 +1,40 @@
 # backend/main.py
-from fastapi import FastAPI, Depends, UploadFile, File, HTTPException, Form
+from fastapi import FastAPI, Depends, UploadFile, File, HTTPException, Form, Query, Response, Request
+from starlette.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from .database import engine, Base
-from . import models, crud, schemas, gemini_client, utils
-import os, io, json
-from .database import SessionLocal
-from typing import List
-import shutil, uuid
+from .database import engine, read_engine
+from . import models, crud, schemas, gemini_client, utils, migrations, ingest, photo_store, jobs, passwords, write_batcher, metrics, auth_cache, export, bulk_import, ranking, summaries, factors, recompute
+import io, json
+from .database import SessionLocal, ReadSessionLocal
+from typing import List, Optional
+from datetime import datetime, timezone
+from contextlib import asynccontextmanager
+import shutil, hashlib
+from email.utils import format_datetime, parsedate_to_datetime
 
-# Create DB tables
-Base.metadata.create_all(bind=engine)
+# Create DB tables (and any indexes added since the file was created)
+migrations.upgrade(engine)
 
-app = FastAPI(title="Carbon Detection & Emission API")
+@asynccontextmanager
+async def lifespan(app):
+    await jobs.runner.start()
+    bulk_import.runner.start()
+    recompute.runner.start()
+    yield
+    await jobs.runner.stop()
+    await run_in_threadpool(bulk_import.runner.stop)
+    await run_in_threadpool(recompute.runner.stop)
+    await gemini_client.client.aclose()
+    passwords.pool.shutdown()
+    write_batcher.batcher.stop()
+
+app = FastAPI(title="Carbon Detection & Emission API", lifespan=lifespan)
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+app.add_middleware(metrics.MetricsMiddleware)
+metrics.instrument_engine(engine, "write")
+metrics.instrument_engine(read_engine, "read")
 
 # Dependency to get DB session
 def get_db():
@@ -23,24 +44,39 @@ def get_db():
     finally:
         db.close()
 
+# Read-only session from the separate reader pool, for GET endpoints
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
 # -----------------
 # Auth endpoints
 # -----------------
+# bcrypt runs in passwords.pool (a process pool); DB work stays on the threadpool
 @app.post("/signup", response_model=schemas.TokenOut)
-def signup(payload: schemas.SignupIn, db: Session = Depends(get_db)):
-    existing = crud.get_user_by_email(db, payload.email)
+async def signup(payload: schemas.SignupIn, db: Session = Depends(get_db)):
+    existing = await run_in_threadpool(crud.get_user_by_email, db, payload.email)
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
-    user = crud.create_user(db, payload.first_name, payload.last_name, payload.email, payload.password)
+    hashed = await passwords.pool.hash(payload.password)
+    user = await run_in_threadpool(crud.insert_user, db, payload.first_name, payload.last_name, payload.email, hashed)
     return {"token": user.token or "", "user_id": user.id, "first_name": user.first_name, "last_name": user.last_name, "email": user.email}
 
 @app.post("/login", response_model=schemas.TokenOut)
-def login(payload: schemas.LoginIn, db: Session = Depends(get_db)):
-    user = crud.authenticate_user(db, payload.email, payload.password)
-    if not user:
+async def login(payload: schemas.LoginIn, db: Session = Depends(get_db)):
+    user = await run_in_threadpool(crud.get_user_by_email, db, payload.email)
+    if not user or not await passwords.pool.verify(payload.password, user.password_hash):
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    user = await run_in_threadpool(crud.issue_token, db, user)
     return {"token": user.token, "user_id": user.id, "first_name": user.first_name, "last_name": user.last_name, "email": user.email}
 
+@app.get("/auth/pool")
+def password_pool_stats():
+    return passwords.pool.stats()
+
 def require_user(token: str = Form(...), db: Session = Depends(get_db)):
     user = crud.get_user_by_token(db, token)
     if not user:
@@ -62,84 +98,338 @@ def add_entry(token: str = Form(...), category: str = Form(...), details: str =
         details_obj = json.loads(details)
     except:
         details_obj = {}
-    emissions = float(details_obj.get("estimated_kgco2", 0.0) or 0.0)
-    # compute if zero
-    if emissions == 0.0:
-        if category == "transport":
-            emissions = utils.calc_transport_km(
-                details_obj.get("vehicle_type"),
-                float(details_obj.get("km", 0)),
-                int(details_obj.get("passengers", 1)),
-                details_obj.get("fuel_liters")
-            )
-        elif category == "electricity":
-            emissions = utils.calc_electricity_kwh(details_obj.get("kwh", 0))
-        elif category == "waste":
-            emissions = utils.calc_waste(details_obj.get("kg", 0))
-        else:
-            emissions = float(details_obj.get("estimated_kgco2", 0) or 0.0)
-    ent = crud.create_entry(db, user.id, category, details_obj, emissions)
+    table = factors.current()
+    emissions = utils.calc_entry_emissions(category, details_obj, table)
+    ent = write_batcher.run(db, lambda s: crud.add_entry(s, user.id, category, details_obj, emissions, table.version))
     return {"entry_id": ent.id, "emissions_kgco2": round(emissions,4)}
 
+@app.post("/entries/bulk")
+async def add_entries_bulk(request: Request, token: str, db: Session = Depends(get_db)):
+    """
+    Body: JSON array or NDJSON of {"category", "details", "timestamp"?, "emissions_kgco2"?}.
+    Valid rows are inserted in chunked transactions; returns one result per input row.
+    """
+    body = await request.body()
+    def work():
+        user = crud.get_user_by_token(db, token)
+        if not user:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        try:
+            records = ingest.parse_records(body)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if len(records) > ingest.MAX_BULK_ROWS:
+            raise HTTPException(status_code=413, detail=f"At most {ingest.MAX_BULK_ROWS} activities per request")
+        rows, positions, results = ingest.prepare_batch(records)
+        ids = crud.bulk_create_entries(db, user.id, rows)
+        for pos, row, entry_id in zip(positions, rows, ids):
+            results[pos] = {"index": pos, "entry_id": entry_id, "emissions_kgco2": round(row["emissions"],4)}
+        return {
+            "inserted": len(ids),
+            "failed": len(records) - len(ids),
+            "results": [results[i] for i in range(len(records))],
+        }
+    return await run_in_threadpool(work)
+
+@app.post("/imports")
+async def create_import(
+    token: str = Form(...),
+    file: UploadFile = File(...),
+    format: Optional[str] = Form(None),
+    dry_run: bool = Form(False),
+    db: Session = Depends(get_db),
+):
+    """
+    Queue a CSV/NDJSON activity file for background import; poll
+    GET /imports/{import_id}. CSV needs a category column, plus optional
+    timestamp, emissions_kgco2 and details (JSON); any other column becomes a
+    details field (vehicle_type, km, kwh, ...).
+    """
+    def enqueue():
+        user = crud.get_user_by_token(db, token)
+        if not user:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        fmt = format or bulk_import.guess_format(file.filename)
+        if fmt not in bulk_import.FORMATS:
+            raise HTTPException(status_code=400, detail="format must be csv or ndjson")
+        path = bulk_import.save_upload(file.file, fmt)
+        return crud.create_import_job(db, user.id, path, fmt, dry_run=dry_run)
+    job = await run_in_threadpool(enqueue)
+    bulk_import.runner.submit(job.id)
+    return bulk_import.job_status(job)
+
+@app.get("/imports/{import_id}")
+def import_status(import_id: str, token: str, db: Session = Depends(get_read_db)):
+    user = crud.get_user_by_token(db, token)
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    job = crud.get_import_job(db, user.id, import_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Import not found")
+    return bulk_import.job_status(job)
+
+MAX_PAGE_SIZE = 1000
+
+def _utc_naive(dt):
+    # timestamps are stored as naive UTC
+    if dt is not None and dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+def _validators(db, scope, key="", floor=None):
+    """
+    ETag / Last-Modified headers for a resource whose content only changes when
+    `scope`'s data version is bumped. `key` distinguishes representations of the
+    same scope (query parameters, the day for time-windowed results); `floor` is
+    the earliest Last-Modified to report for such results.
+    """
+    version, updated_at = crud.get_data_version(db, scope)
+    if floor is not None and (updated_at is None or updated_at < floor):
+        updated_at = floor
+    tag = hashlib.blake2b(f"{scope}|{version}|{key}".encode(), digest_size=8).hexdigest()
+    headers = {"ETag": f'W/"{tag}"', "Cache-Control": "no-cache"}
+    if updated_at is not None:
+        headers["Last-Modified"] = format_datetime(updated_at.replace(tzinfo=timezone.utc), usegmt=True)
+    return headers, updated_at
+
+def _is_fresh(request, headers, updated_at):
+    inm = request.headers.get("if-none-match")
+    if inm is not None:
+        # weak comparison, as RFC 9110 requires for If-None-Match
+        tags = {t.strip().removeprefix("W/") for t in inm.split(",")}
+        return "*" in tags or headers["ETag"].removeprefix("W/") in tags
+    ims = request.headers.get("if-modified-since")
+    if ims and updated_at is not None:
+        try:
+            since = parsedate_to_datetime(ims)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is not None:
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)
+        return updated_at.replace(microsecond=0) <= since
+    return False
+
+def _conditional(request, response, db, scope, key="", floor=None):
+    """Sets validators on `response`; returns a 304 response if the client's copy is current."""
+    headers, updated_at = _validators(db, scope, key, floor)
+    if _is_fresh(request, headers, updated_at):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
 @app.get("/entries")
-def list_entries(token: str, db: Session = Depends(get_db)):
+def list_entries(
+    request: Request,
+    response: Response,
+    token: str,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    category: Optional[str] = None,
+    vehicle_type: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+):
+    """
+    Newest-first list of the user's entries. With `limit`, the body is one page
+    and the opaque cursor for the next page is returned in the X-Next-Cursor
+    header (absent on the last page). `fields` is a comma-separated projection,
+    e.g. fields=timestamp,emissions_kgco2 - details are only decoded if asked for.
+    The hot details fields (vehicle_type, km, kwh, kg, passengers) can be
+    selected as typed columns instead, e.g. fields=timestamp,vehicle_type,km.
+    """
     user = crud.get_user_by_token(db, token)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid token")
-    rows = crud.get_entries_for_user(db, user.id)
+    not_modified = _conditional(request, response, db, crud.user_scope(user.id), request.url.query)
+    if not_modified:
+        return not_modified
+    if fields:
+        wanted = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in wanted if f not in crud.ENTRY_FIELDS + crud.ENTRY_EXTRA_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    else:
+        wanted = list(crud.ENTRY_FIELDS)
+    try:
+        rows, next_cursor = crud.query_entries(
+            db, user.id, since=_utc_naive(since), until=_utc_naive(until), category=category,
+            cursor=cursor, limit=limit, fields=wanted, vehicle_type=vehicle_type,
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     # convert details JSON string back
     out = []
     for r in rows:
-        try:
-            det = json.loads(r.details or "{}")
-        except:
-            det = {}
-        out.append({
-            "id": r.id,
-            "timestamp": r.timestamp.isoformat(),
-            "category": r.category,
-            "details": det,
-            "emissions_kgco2": r.emissions_kgco2
-        })
+        item = dict(zip(wanted, r))
+        if "timestamp" in item:
+            item["timestamp"] = item["timestamp"].isoformat()
+        if "details" in item:
+            try:
+                item["details"] = json.loads(item["details"] or "{}")
+            except:
+                item["details"] = {}
+        out.append(item)
     return out
 
+EXPORT_BATCH_SIZE = 1000
+
+@app.get("/entries/export")
+def export_entries(
+    token: str,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    category: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+):
+    """Full history, oldest first, streamed as NDJSON or CSV."""
+    user = crud.get_user_by_token(db, token)
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    user_id, since, until = user.id, _utc_naive(since), _utc_naive(until)
+
+    def rows():
+        # own session: the request's one is closed before the body is sent
+        s = ReadSessionLocal()
+        try:
+            yield from crud.iter_entries(s, user_id, since, until, category, batch_size=EXPORT_BATCH_SIZE)
+        finally:
+            s.close()
+
+    chunks = export.ndjson_chunks(rows()) if format == "ndjson" else export.csv_chunks(rows())
+    return StreamingResponse(
+        chunks, media_type=export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="entries.{format}"'},
+    )
+
 # -----------------
 # Photo upload & analysis
 # -----------------
-UPLOAD_DIR = os.path.join(os.path.dirname(__file__), "uploads")
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+MAX_JOB_IDS = 100
 
 @app.post("/photos/upload")
-def photos_upload(token: str = Form(...), file: UploadFile = File(...), db: Session = Depends(get_db)):
+async def photos_upload(token: str = Form(...), file: UploadFile = File(...), db: Session = Depends(get_db)):
+    """Stores the photo and queues its analysis; poll GET /photos/jobs/{job_id} for the result."""
+    def enqueue():
+        user = crud.get_user_by_token(db, token)
+        if not user:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        # stream to the content-addressed store
+        digest, dest, _ = photo_store.save_stream(file.file)
+        return crud.create_photo_job(db, user.id, dest, digest, file.content_type)
+    job = await run_in_threadpool(enqueue)
+    jobs.runner.submit(job.id)
+    return {"job_id": job.id, "status": job.status, "sha256": job.sha256}
+
+@app.get("/photos/jobs/{job_id}")
+def photo_job_status(job_id: str, token: str, db: Session = Depends(get_read_db)):
     user = crud.get_user_by_token(db, token)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid token")
-    contents = file.file.read()
-    # save file
-    fname = f"{uuid.uuid4().hex}_{file.filename}"
-    dest = os.path.join(UPLOAD_DIR, fname)
-    with open(dest, "wb") as f:
-        f.write(contents)
-
-    # call Gemini / Vision
-    try:
-        detections = gemini_client.call_gemini_vision(contents)
-    except Exception as e:
-        detections = [{"label":"unknown","confidence":0.0}]
+    found = crud.get_photo_jobs(db, user.id, [job_id])
+    if not found:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return jobs.job_status(found[0])
 
-    est_total, details = utils.estimate_from_photo_labels(detections)
-
-    photo = crud.create_photo(db, user.id, dest, detections, est_total)
-    # also create entry
-    ent = crud.create_entry(db, user.id, "photo-analysis", {"file": fname, "detection_details": details}, est_total)
-    return {"photo_id": photo.id, "estimated_kgco2": est_total, "detection_details": details}
+@app.get("/photos/jobs")
+def photo_jobs_status(token: str, ids: str, db: Session = Depends(get_read_db)):
+    """Batch status: ids is a comma-separated list of job ids."""
+    user = crud.get_user_by_token(db, token)
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    job_ids = [i.strip() for i in ids.split(",") if i.strip()]
+    if len(job_ids) > MAX_JOB_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_JOB_IDS} job ids per request")
+    found = {j.id: j for j in crud.get_photo_jobs(db, user.id, job_ids)}
+    return [jobs.job_status(found[i]) if i in found else {"job_id": i, "status": "not_found"} for i in job_ids]
 
 # -----------------
 # Leaderboard
 # -----------------
+MAX_NEIGHBOURS = 50
+
 @app.get("/leaderboard")
-def leaderboard(db: Session = Depends(get_db)):
-    return crud.leaderboard_last_7_days(db)
+def leaderboard(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Lowest 7-day emissions first. `limit` alone gives the top K; with `offset`
+    it pages. X-Total-Count carries the number of ranked users.
+    """
+    # the 7-day window moves at midnight UTC even without writes
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    not_modified = _conditional(request, response, db, crud.LEADERBOARD_SCOPE, f"{today.date()}|{limit}|{offset}", floor=today)
+    if not_modified:
+        return not_modified
+    ranking.board.sync(db)
+    response.headers["X-Total-Count"] = str(ranking.board.size())
+    return ranking.board.page(offset, limit)
+
+@app.get("/leaderboard/me")
+def leaderboard_me(token: str, neighbours: int = Query(2, ge=0, le=MAX_NEIGHBOURS), db: Session = Depends(get_read_db)):
+    user = crud.get_user_by_token(db, token)
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    ranking.board.sync(db)
+    found = ranking.board.around(user.id, neighbours)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Not on the leaderboard yet")
+    return found
+
+# -----------------
+# Dashboard stats
+# -----------------
+@app.get("/stats/daily")
+def stats_daily(token: str, days: int = Query(30, ge=1, le=3660), db: Session = Depends(get_read_db)):
+    user = crud.get_user_by_token(db, token)
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return crud.stats_daily(db, user.id, days)
+
+@app.get("/stats/by_category")
+def stats_by_category(token: str, since: Optional[datetime] = None, db: Session = Depends(get_read_db)):
+    user = crud.get_user_by_token(db, token)
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    since = _utc_naive(since)
+    return crud.stats_by_category(db, user.id, since.date() if since else None)
+
+@app.get("/stats/by_vehicle")
+def stats_by_vehicle(token: str, since: Optional[datetime] = None, db: Session = Depends(get_read_db)):
+    user = crud.get_user_by_token(db, token)
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return crud.stats_by_vehicle(db, user.id, _utc_naive(since))
+
+@app.get("/stats/summary")
+def stats_summary(token: str, db: Session = Depends(get_read_db)):
+    user = crud.get_user_by_token(db, token)
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return crud.stats_summary(db, user.id)
+
+# -----------------
+# Emission factors
+# -----------------
+@app.get("/factors")
+def factor_sets():
+    """The factor set in effect now, and the effective window of every loaded set."""
+    return {
+        "region": factors.registry.region,
+        "current": factors.current().describe(),
+        "sets": [
+            {"version": t.version, "from": start.isoformat() if start else None, "until": end.isoformat() if end else None}
+            for t, start, end in factors.registry.windows()
+        ],
+    }
 
 # -----------------
 # Goals
@@ -153,14 +443,17 @@ def create_goal(token: str = Form(...), type: str = Form(...), params: str = For
         params_obj = json.loads(params)
     except:
         params_obj = {}
-    g = crud.create_goal(db, user.id, type, params_obj)
+    g = write_batcher.run(db, lambda s: crud.add_goal(s, user.id, type, params_obj))
     return {"goal_id": g.id}
 
 @app.get("/goals")
-def list_goals(token: str, db: Session = Depends(get_db)):
+def list_goals(request: Request, response: Response, token: str, db: Session = Depends(get_read_db)):
     user = crud.get_user_by_token(db, token)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid token")
+    not_modified = _conditional(request, response, db, crud.user_scope(user.id), "goals")
+    if not_modified:
+        return not_modified
     rows = crud.get_goals_for_user(db, user.id)
     out = []
     for r in rows:
@@ -175,15 +468,46 @@ def list_goals(token: str, db: Session = Depends(get_db)):
 # Assistant endpoint (AI suggestions & prediction)
 # -----------------
 @app.post("/gemini_client")
-def assistant_query(token: str = Form(...), prompt: str = Form(...), db: Session = Depends(get_db)):
-    user = crud.get_user_by_token(db, token)
-    if not user:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    # we can seed assistant with user's recent data summary
-    entries = crud.get_entries_for_user(db, user.id)
-    # build small context
-    total_recent = sum((e.emissions_kgco2 or 0.0) for e in entries[:50])
-    context = f"User {user.first_name} {user.last_name} has recent total emissions ~{round(total_recent,4)} kgCO2 across {len(entries)} entries."
-    full_prompt = context + "\n\nUser prompt:\n" + prompt
-    res = gemini_client.call_gemini_text(full_prompt)
+async def assistant_query(token: str = Form(...), prompt: str = Form(...), db: Session = Depends(get_db)):
+    # DB work stays on the threadpool; the model round-trip only holds the event loop
+    def build_context():
+        user = crud.get_user_by_token(db, token)
+        if not user:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        # seed the assistant with the user's maintained activity summary
+        return summaries.context_line(user, summaries.cache.get(db, user.id))
+    context = await run_in_threadpool(build_context)
+    res = await gemini_client.call_gemini_text_cached(prompt, context)
     return {"response": res.get("content"), "raw": res.get("raw", {})}
+
+@app.get("/gemini_client/cache")
+def assistant_cache_stats():
+    return gemini_client.cache.stats()
+
+# -----------------
+# Metrics (Prometheus text format)
+# -----------------
+_component_gauge = metrics.registry.add(metrics.Gauge("component_stat", "Internal cache/queue/pool counters", ("component", "stat")))
+
+def _collect_components():
+    stats = {
+        "prompt_cache": gemini_client.cache.stats(),
+        "token_cache": {"hits": auth_cache.tokens.hits, "misses": auth_cache.tokens.misses},
+        "password_pool": passwords.pool.stats(),
+        "write_batcher": write_batcher.batcher.stats(),
+        "photo_jobs": {"queue_depth": jobs.runner.depth()},
+        "summary_cache": {"hits": summaries.cache.hits, "misses": summaries.cache.misses},
+        "label_cache": {"hits": utils.label_matcher().hits, "misses": utils.label_matcher().misses},
+        "imports": {"queue_depth": bulk_import.runner.depth()},
+        "factor_recompute": recompute.runner.stats(),
+    }
+    for component, values in stats.items():
+        for k, v in values.items():
+            if isinstance(v, (int, float)):
+                _component_gauge.set(component, k, value=v)
+
+metrics.registry.collectors.append(_collect_components)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
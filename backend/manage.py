@@ -0,0 +1,93 @@
+# backend/manage.py
+# Maintenance commands: python -m backend.manage <command>
+import argparse
+import os
+import sys
+from .database import engine, SessionLocal
+from . import models, crud, migrations, legacy_import, bulk_import, factors, recompute
+
+def cmd_rebuild_rollups(args):
+    db = SessionLocal()
+    try:
+        n = crud.rebuild_daily_rollups(db)
+        print(f"rebuilt daily_rollups: {n} rows")
+        n = crud.rebuild_user_totals(db)
+        print(f"rebuilt user_totals: {n} rows")
+    finally:
+        db.close()
+
+def cmd_import_legacy(args):
+    db = SessionLocal()
+    try:
+        print(legacy_import.import_legacy(db))
+    finally:
+        db.close()
+
+def _print_progress(job):
+    pct = 100.0 * job.bytes_done / job.bytes_total if job.bytes_total else 100.0
+    print(f"\r{pct:5.1f}%  {job.rows_read} rows  {job.accepted} ok  {job.failed} failed", end="", file=sys.stderr, flush=True)
+
+def _run_import(job_id, args):
+    print(f"import {job_id}", file=sys.stderr)
+    status = bulk_import.run_import(job_id, workers=args.workers, chunk_rows=args.chunk_rows, progress=_print_progress)
+    print(file=sys.stderr)
+    print(status)
+
+def cmd_import_file(args):
+    fmt = args.format or bulk_import.guess_format(args.path)
+    if fmt not in bulk_import.FORMATS:
+        sys.exit("cannot tell the file format, pass --format csv|ndjson")
+    db = SessionLocal()
+    try:
+        q = db.query(models.User)
+        user = q.filter(models.User.email == args.email).first() if args.email else db.get(models.User, args.user_id)
+        if user is None:
+            sys.exit("no such user")
+        job = crud.create_import_job(db, user.id, os.path.abspath(args.path), fmt, dry_run=args.dry_run, source="cli")
+        job_id = job.id
+    finally:
+        db.close()
+    _run_import(job_id, args)
+
+def cmd_resume_import(args):
+    _run_import(args.job_id, args)
+
+def cmd_recompute_emissions(args):
+    print(f"factor sets ({factors.registry.region}): {', '.join(factors.registry.versions())}", file=sys.stderr)
+    progress = lambda rows, changed: print(f"\r{rows} re-priced  {changed} changed", end="", file=sys.stderr, flush=True)
+    result = recompute.run(include_legacy=args.legacy, batch_size=args.batch_size, progress=progress)
+    print(file=sys.stderr)
+    print(result)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m backend.manage")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("rebuild-rollups", help="recompute daily_rollups and user_totals from entries (backfill)")
+    p.set_defaults(func=cmd_rebuild_rollups)
+    p = sub.add_parser("import-legacy", help="import data/users.json + entries.json into the database")
+    p.set_defaults(func=cmd_import_legacy)
+    p = sub.add_parser("import-file", help="bulk import a CSV/NDJSON activity file for one user")
+    p.add_argument("path")
+    who = p.add_mutually_exclusive_group(required=True)
+    who.add_argument("--email")
+    who.add_argument("--user-id")
+    p.add_argument("--format", choices=bulk_import.FORMATS, help="default: from the file extension")
+    p.add_argument("--dry-run", action="store_true", help="validate and price rows without inserting them")
+    p.set_defaults(func=cmd_import_file)
+    p = sub.add_parser("resume-import", help="continue an interrupted import-file run")
+    p.add_argument("job_id")
+    p.set_defaults(func=cmd_resume_import)
+    p = sub.add_parser("recompute-emissions", help="re-price entries whose factor set changed")
+    p.add_argument("--legacy", action="store_true", help="also re-price entries from before factor versioning")
+    p.add_argument("--batch-size", type=int, default=None, help=f"rows per transaction (default {recompute.RECOMPUTE_BATCH_SIZE})")
+    p.set_defaults(func=cmd_recompute_emissions)
+    for name in ("import-file", "resume-import"):
+        sp = sub.choices[name]
+        sp.add_argument("--workers", type=int, default=None, help=f"parser processes (default {bulk_import.IMPORT_WORKERS})")
+        sp.add_argument("--chunk-rows", type=int, default=None, help=f"rows per chunk/transaction (default {bulk_import.IMPORT_CHUNK_ROWS})")
+    args = parser.parse_args(argv)
+    migrations.upgrade(engine)
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
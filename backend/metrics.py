@@ -0,0 +1,198 @@
+# backend/metrics.py
+# In-process metrics in Prometheus text format, served on GET /metrics.
+# Counts are per process; with several uvicorn workers each one reports its
+# own numbers.
+import contextvars
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy import event
+
+SLOW_REQUEST_MS = float(os.environ.get("SLOW_REQUEST_MS", "0"))  # 0 = off
+SLOW_LOG_QUERIES = 10
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+log = logging.getLogger("backend.slow")
+
+
+def _fmt_labels(names, values):
+    if not names:
+        return ""
+    inner = ",".join(f'{n}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for n, v in zip(names, values))
+    return "{" + inner + "}"
+
+
+class _Metric:
+    def __init__(self, name, help_, labels=()):
+        self.name = name
+        self.help = help_
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *a, **kw):
+        super().__init__(*a, **kw)
+        self._values = {}
+
+    def inc(self, *labels, amount=1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, self.labels, k, v) for k, v in self._values.items()]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, *labels, value):
+        with self._lock:
+            self._values[labels] = value
+
+    def dec(self, *labels, amount=1.0):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, *a, buckets=LATENCY_BUCKETS, **kw):
+        super().__init__(*a, **kw)
+        self.buckets = tuple(buckets)
+        self._values = {}  # labels -> [bucket counts..., sum, count]
+
+    def observe(self, *labels, value):
+        with self._lock:
+            row = self._values.get(labels)
+            if row is None:
+                row = self._values[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, b in enumerate(self.buckets):
+                if value <= b:
+                    row[i] += 1
+            row[-2] += value
+            row[-1] += 1
+
+    def samples(self):
+        out = []
+        names = self.labels + ("le",)
+        with self._lock:
+            for k, row in self._values.items():
+                for i, b in enumerate(self.buckets):
+                    out.append((self.name + "_bucket", names, k + (repr(b),), row[i]))
+                out.append((self.name + "_bucket", names, k + ("+Inf",), row[-1]))
+                out.append((self.name + "_sum", self.labels, k, row[-2]))
+                out.append((self.name + "_count", self.labels, k, row[-1]))
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []  # callables run before rendering (refresh gauges)
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        for fn in self.collectors:
+            try:
+                fn()
+            except Exception:
+                pass
+        lines = []
+        for m in self.metrics:
+            lines.append(f"# HELP {m.name} {m.help}")
+            lines.append(f"# TYPE {m.name} {m.kind}")
+            for name, label_names, label_values, value in m.samples():
+                lines.append(f"{name}{_fmt_labels(label_names, label_values)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.add(Counter("http_requests_total", "HTTP requests", ("method", "route", "status")))
+http_latency = registry.add(Histogram("http_request_duration_seconds", "HTTP request latency", ("method", "route")))
+http_in_flight = registry.add(Gauge("http_requests_in_flight", "HTTP requests being served"))
+sql_queries = registry.add(Counter("sql_queries_total", "SQL statements executed", ("engine",)))
+sql_latency = registry.add(Histogram("sql_query_duration_seconds", "SQL statement latency", ("engine",)))
+sql_per_request = registry.add(Histogram("sql_queries_per_request", "SQL statements per HTTP request", ("route",),
+                                         buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100, 1000)))
+gemini_latency = registry.add(Histogram("gemini_request_duration_seconds", "Outbound model call latency", ("kind", "outcome")))
+bcrypt_latency = registry.add(Histogram("bcrypt_duration_seconds", "Password hash/verify latency incl. queueing", ("op",)))
+
+
+# -- per-request SQL accounting ---------------------------------------------
+class RequestStats:
+    __slots__ = ("queries", "sql_seconds", "top")
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.top = []  # (seconds, statement) - only kept when the slow log is on
+
+current_request = contextvars.ContextVar("current_request", default=None)
+
+
+def instrument_engine(engine, label):
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        dt = time.perf_counter() - conn.info["_query_start"].pop()
+        sql_queries.inc(label)
+        sql_latency.observe(label, value=dt)
+        stats = current_request.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.sql_seconds += dt
+            if SLOW_REQUEST_MS:
+                stats.top.append((dt, " ".join(statement.split())[:200]))
+
+
+# -- ASGI middleware -----------------------------------------------------------
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status = {"code": 500}
+
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        http_in_flight.inc()
+        t = time.perf_counter()
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            dt = time.perf_counter() - t
+            http_in_flight.dec()
+            current_request.reset(token)
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            method = scope["method"]
+            http_requests.inc(method, route, status["code"])
+            http_latency.observe(method, route, value=dt)
+            sql_per_request.observe(route, value=stats.queries)
+            if SLOW_REQUEST_MS and dt * 1000 >= SLOW_REQUEST_MS:
+                top = sorted(stats.top, reverse=True)[:SLOW_LOG_QUERIES]
+                log.warning(
+                    "slow request %s %s status=%s %.1fms sql=%d (%.1fms) top=%s",
+                    method, route, status["code"], dt * 1000, stats.queries, stats.sql_seconds * 1000,
+                    [f"{q_dt * 1000:.1f}ms {q}" for q_dt, q in top],
+                )
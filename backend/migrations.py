@@ -0,0 +1,101 @@
+# backend/migrations.py
+# Lightweight schema upgrades for existing SQLite files. create_all() only
+# creates missing tables, so columns and indexes added to models.py on
+# tables that already exist are applied here.
+#
+# Every worker process runs upgrade() on startup, so each step tolerates
+# another process having just done the same thing.
+import json
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from .database import Base
+from . import models, crud
+
+BACKFILL_BATCH_SIZE = 5000
+
+def _add_missing_columns(engine, table):
+    existing = {c["name"] for c in inspect(engine).get_columns(table.name)}
+    for col in table.columns:
+        if col.name in existing:
+            continue
+        # only nullable / defaulted columns can be added in place
+        ddl = f'ALTER TABLE {table.name} ADD COLUMN {col.name} {col.type.compile(engine.dialect)}'
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(ddl))
+        except OperationalError as e:
+            # a concurrent upgrade() added it between the inspect and the ALTER
+            if "duplicate column name" not in str(e.orig):
+                raise
+
+def _done(conn, name):
+    # one-off data migrations are recorded as data_versions rows
+    return conn.execute(text("SELECT 1 FROM data_versions WHERE scope = :s"), {"s": f"migration:{name}"}).first() is not None
+
+def _mark_done(conn, name):
+    conn.execute(
+        text("INSERT INTO data_versions (scope, version, updated_at) VALUES (:s, 1, :now) ON CONFLICT(scope) DO NOTHING"),
+        {"s": f"migration:{name}", "now": datetime.utcnow()},
+    )
+
+def backfill_entry_detail_columns(engine, batch_size=BACKFILL_BATCH_SIZE):
+    """
+    Copy the hot details fields into the typed entry columns for rows written
+    before those columns existed; a transaction per batch, walking rowid.
+    An interrupted run starts over (it only rewrites the same values).
+    """
+    name = "entry_detail_columns"
+    with engine.connect() as conn:
+        if _done(conn, name):
+            return 0
+    cols = list(models.DETAIL_COLUMNS)
+    update = text(f"UPDATE entries SET {', '.join(f'{c} = :{c}' for c in cols)} WHERE rowid = :rid")
+    last, n = 0, 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                text("SELECT rowid, details FROM entries WHERE rowid > :last ORDER BY rowid LIMIT :n"),
+                {"last": last, "n": batch_size},
+            ).all()
+            if not rows:
+                _mark_done(conn, name)
+                return n
+            params = []
+            for rid, details in rows:
+                try:
+                    values = models.detail_columns(json.loads(details or "{}"))
+                except ValueError:
+                    continue
+                if any(v is not None for v in values.values()):
+                    params.append(dict(values, rid=rid))
+            if params:
+                conn.execute(update, params)
+            n += len(params)
+            last = rows[-1][0]
+
+def backfill_aggregates(engine, created):
+    """
+    Fill daily_rollups / user_totals from entries when upgrade() just created
+    them; afterwards they are maintained by every entry write. A rebuild is a
+    single delete + insert-select transaction, so two workers racing here end
+    with the same rows.
+    """
+    with Session(bind=engine) as db:
+        if models.DailyRollup.__tablename__ in created:
+            crud.rebuild_daily_rollups(db)
+        if models.UserTotal.__tablename__ in created:
+            crud.rebuild_user_totals(db)
+
+def upgrade(engine):
+    before = set(inspect(engine).get_table_names())
+    Base.metadata.create_all(bind=engine)
+    for table in Base.metadata.sorted_tables:
+        _add_missing_columns(engine, table)
+        for idx in table.indexes:
+            idx.create(bind=engine, checkfirst=True)
+    backfill_entry_detail_columns(engine)
+    if models.Entry.__tablename__ in before:
+        backfill_aggregates(engine, set(Base.metadata.tables) - before)
@@ -1,12 +1,14 @@
 # backend/models.py
-from sqlalchemy import Column, String, Integer, Float, DateTime, Text, ForeignKey
+from sqlalchemy import Column, String, Integer, Float, Boolean, Date, DateTime, Text, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .database import Base
 import uuid
 
 def gen_id(prefix):
-    return f"{prefix}_{uuid.uuid4().hex[:8]}"
+    # 64 random bits: 8 hex digits start colliding after ~65k rows, which
+    # bulk imports reach within a single user
+    return f"{prefix}_{uuid.uuid4().hex[:16]}"
 
 class User(Base):
     __tablename__ = "users"
@@ -15,13 +17,31 @@ class User(Base):
     last_name = Column(String, nullable=False)
     email = Column(String, unique=True, nullable=False)
     password_hash = Column(String, nullable=False)
-    token = Column(String, nullable=True)  # simple token
+    token = Column(String, nullable=True, index=True)  # simple token
     created_at = Column(DateTime, default=datetime.utcnow)
 
     entries = relationship("Entry", back_populates="user")
     photos = relationship("Photo", back_populates="user")
     goals = relationship("Goal", back_populates="user")
 
+# details fields copied into typed Entry columns on write, so they can be
+# filtered and aggregated in SQL and read without decoding the JSON
+DETAIL_COLUMNS = {"vehicle_type": str, "km": float, "kwh": float, "kg": float, "passengers": int}
+
+def detail_columns(details):
+    """{column: value} for an entry's details object; None where absent or not of the column's type."""
+    out = {}
+    for name, cast in DETAIL_COLUMNS.items():
+        value = details.get(name) if isinstance(details, dict) else None
+        if cast is str:
+            out[name] = value if isinstance(value, str) and value else None
+            continue
+        try:
+            out[name] = None if value is None or value == "" else cast(value)
+        except (TypeError, ValueError):
+            out[name] = None
+    return out
+
 class Entry(Base):
     __tablename__ = "entries"
     id = Column(String, primary_key=True, default=lambda: gen_id("entry"))
@@ -30,20 +50,38 @@ class Entry(Base):
     category = Column(String, nullable=False)  # transport, electricity, food, waste, purchase, photo-analysis
     details = Column(Text)  # JSON string
     emissions_kgco2 = Column(Float, default=0.0)
+    # factors.FactorTable.version that priced emissions_kgco2; "manual" when the
+    # client supplied the number, NULL for rows from before factor versioning
+    factor_version = Column(String, nullable=True)
+    vehicle_type = Column(String, nullable=True)
+    km = Column(Float, nullable=True)
+    kwh = Column(Float, nullable=True)
+    kg = Column(Float, nullable=True)
+    passengers = Column(Integer, nullable=True)
 
     user = relationship("User", back_populates="entries")
 
+    __table_args__ = (
+        Index("ix_entries_user_ts", "user_id", "timestamp", "id"),
+        # finds the rows a factor set change makes stale (see recompute.py)
+        Index("ix_entries_factor_version", "factor_version", "timestamp"),
+        Index("ix_entries_user_vehicle", "user_id", "vehicle_type", "timestamp"),
+    )
+
 class Photo(Base):
     __tablename__ = "photos"
     id = Column(String, primary_key=True, default=lambda: gen_id("photo"))
     user_id = Column(String, ForeignKey("users.id"), nullable=False)
     filename = Column(String, nullable=False)
+    sha256 = Column(String, nullable=True, index=True)  # content hash, for dedup
     detected_json = Column(Text)  # JSON string of detections
     estimated_kgco2 = Column(Float, default=0.0)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     user = relationship("User", back_populates="photos")
 
+    __table_args__ = (Index("ix_photos_user_created", "user_id", "created_at"),)
+
 class Goal(Base):
     __tablename__ = "goals"
     id = Column(String, primary_key=True, default=lambda: gen_id("goal"))
@@ -53,3 +91,78 @@ class Goal(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
     user = relationship("User", back_populates="goals")
+
+    __table_args__ = (Index("ix_goals_user_created", "user_id", "created_at"),)
+
+class PhotoJob(Base):
+    """Queued photo analysis; the upload returns its id and clients poll it."""
+    __tablename__ = "photo_jobs"
+    id = Column(String, primary_key=True, default=lambda: gen_id("job"))
+    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    path = Column(String, nullable=False)
+    sha256 = Column(String, nullable=False)
+    mime_type = Column(String, nullable=True)
+    status = Column(String, nullable=False, default="queued")  # queued | running | done | failed
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    photo_id = Column(String, nullable=True)
+    result = Column(Text, nullable=True)  # JSON string
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (Index("ix_photo_jobs_status", "status", "created_at"),)
+
+class ImportJob(Base):
+    # bulk activity file import; bytes_done/rows_read advance in the same
+    # transaction as the inserted rows, so an interrupted import resumes there
+    __tablename__ = "import_jobs"
+    id = Column(String, primary_key=True, default=lambda: gen_id("import"))
+    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    path = Column(String, nullable=False)
+    format = Column(String, nullable=False)  # csv | ndjson
+    source = Column(String, nullable=False, default="api")  # api | cli
+    dry_run = Column(Boolean, nullable=False, default=False)
+    status = Column(String, nullable=False, default="queued")  # queued | running | done | failed
+    bytes_total = Column(Integer, nullable=False, default=0)
+    bytes_done = Column(Integer, nullable=False, default=0)
+    rows_read = Column(Integer, nullable=False, default=0)
+    accepted = Column(Integer, nullable=False, default=0)  # inserted, or would be on a dry run
+    failed = Column(Integer, nullable=False, default=0)
+    emissions_total = Column(Float, nullable=False, default=0.0)
+    errors = Column(Text, nullable=True)  # JSON list of the first row errors
+    error = Column(Text, nullable=True)  # why the job itself failed
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (Index("ix_import_jobs_status", "status", "created_at"),)
+
+class UserTotal(Base):
+    """All-time per-user, per-category totals, kept in step with entries."""
+    __tablename__ = "user_totals"
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True)
+    category = Column(String, primary_key=True)
+    total_kgco2 = Column(Float, nullable=False, default=0.0)
+    entry_count = Column(Integer, nullable=False, default=0)
+    first_at = Column(DateTime, nullable=True)
+    last_at = Column(DateTime, nullable=True)
+
+class DailyRollup(Base):
+    """Per-user, per-day, per-category emission totals, kept in step with entries."""
+    __tablename__ = "daily_rollups"
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    category = Column(String, primary_key=True)
+    total_kgco2 = Column(Float, nullable=False, default=0.0)
+    entry_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (Index("ix_daily_rollups_day_user", "day", "user_id"),)
+
+class DataVersion(Base):
+    # change counter per cache scope ("user:<id>", "leaderboard"), bumped in the
+    # same transaction as the write; drives ETag / Last-Modified on reads
+    __tablename__ = "data_versions"
+    scope = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (Index("ix_data_versions_updated", "updated_at"),)
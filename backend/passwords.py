@@ -0,0 +1,104 @@
+# backend/passwords.py
+# bcrypt work runs in a dedicated process pool so it uses every core and
+# never holds the GIL or a request thread. A semaphore caps how many hashes
+# can be outstanding; callers beyond that wait (and show up as queue depth).
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from passlib.context import CryptContext
+
+from . import metrics
+
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+PASSWORD_WORKERS = int(os.environ.get("PASSWORD_WORKERS", str(os.cpu_count() or 2)))
+PASSWORD_MAX_PENDING = int(os.environ.get("PASSWORD_MAX_PENDING", str(PASSWORD_WORKERS * 2)))
+
+pwd_ctx = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+# these run inside the pool processes
+def _hash(password):
+    return pwd_ctx.hash(password)
+
+def _verify(password, password_hash):
+    try:
+        return pwd_ctx.verify(password, password_hash)
+    except ValueError:
+        # malformed stored hash
+        return False
+
+
+class PasswordPool:
+    def __init__(self, workers=PASSWORD_WORKERS, max_pending=PASSWORD_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._loop = None
+        self._sem = None
+        self.waiting = 0
+        self.in_flight = 0
+        self.completed = 0
+
+    def _executor(self):
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def _semaphore(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._sem = asyncio.Semaphore(self.max_pending)
+        return self._sem
+
+    async def _run(self, op, fn, *args):
+        t = time.perf_counter()
+        try:
+            return await self._run_limited(fn, *args)
+        finally:
+            metrics.bcrypt_latency.observe(op, value=time.perf_counter() - t)
+
+    async def _run_limited(self, fn, *args):
+        sem = self._semaphore()
+        self.waiting += 1
+        try:
+            await sem.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor(), fn, *args)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            sem.release()
+
+    async def hash(self, password):
+        return await self._run("hash", _hash, password)
+
+    async def verify(self, password, password_hash):
+        return await self._run("verify", _verify, password, password_hash)
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "bcrypt_rounds": BCRYPT_ROUNDS,
+        }
+
+
+pool = PasswordPool()
@@ -0,0 +1,49 @@
+# backend/photo_store.py
+# Content-addressed photo storage: uploads are streamed to disk in fixed-size
+# chunks while hashed, then moved to UPLOAD_DIR/<aa>/<bb>/<sha256>.
+import hashlib
+import os
+import tempfile
+
+UPLOAD_DIR = os.environ.get("UPLOAD_DIR", os.path.join(os.path.dirname(__file__), "uploads"))
+CHUNK_SIZE = 1024 * 1024
+
+os.makedirs(UPLOAD_DIR, exist_ok=True)
+
+def path_for(digest):
+    return os.path.join(UPLOAD_DIR, digest[:2], digest[2:4], digest)
+
+def save_stream(src):
+    """
+    Copy the file-like `src` into the store without holding it in memory.
+    Returns (sha256 hex, stored path, size in bytes). Re-uploads of the same
+    bytes resolve to the already stored file.
+    """
+    h = hashlib.sha256()
+    size = 0
+    fd, tmp = tempfile.mkstemp(dir=UPLOAD_DIR, prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = src.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                h.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+        digest = h.hexdigest()
+        dest = path_for(digest)
+        if os.path.exists(dest):
+            os.unlink(tmp)
+        else:
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            os.replace(tmp, dest)
+        return digest, dest, size
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
@@ -0,0 +1,127 @@
+# backend/prompt_cache.py
+# Two-tier cache for assistant responses: an in-memory LRU in front of a
+# SQLite file, both with TTL expiry and a size cap.
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+
+PROMPT_CACHE_PATH = os.environ.get("PROMPT_CACHE_PATH", os.path.join(BASE_DIR, "data", "prompt_cache.db"))
+PROMPT_CACHE_TTL = float(os.environ.get("PROMPT_CACHE_TTL", str(24 * 3600)))
+PROMPT_CACHE_SIZE = int(os.environ.get("PROMPT_CACHE_SIZE", "1024"))
+PROMPT_CACHE_DISK_SIZE = int(os.environ.get("PROMPT_CACHE_DISK_SIZE", "100000"))
+
+_ws = re.compile(r"\s+")
+
+def normalize_prompt(prompt: str) -> str:
+    return _ws.sub(" ", prompt or "").strip().lower()
+
+def make_key(prompt: str, context: str = "") -> str:
+    fingerprint = hashlib.sha256((context or "").encode()).hexdigest()
+    return hashlib.sha256(f"{normalize_prompt(prompt)}\0{fingerprint}".encode()).hexdigest()
+
+
+class PromptCache:
+    def __init__(self, path=PROMPT_CACHE_PATH, ttl=PROMPT_CACHE_TTL, max_entries=PROMPT_CACHE_SIZE,
+                 disk_max_entries=PROMPT_CACHE_DISK_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.disk_max_entries = disk_max_entries
+        self.path = path or None  # empty path = memory only
+        self._mem = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._conn = None
+        self.counters = {"hits_memory": 0, "hits_disk": 0, "misses": 0, "evictions": 0, "sets": 0}
+
+    def _db(self):
+        if self._conn is None and self.path:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS prompt_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_prompt_cache_access ON prompt_cache(last_access)")
+        return self._conn
+
+    def _remember(self, key, expires_at, value):
+        # caller holds the lock
+        self._mem[key] = (expires_at, value)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            hit = self._mem.get(key)
+            if hit is not None:
+                if hit[0] > now:
+                    self._mem.move_to_end(key)
+                    self.counters["hits_memory"] += 1
+                    return hit[1]
+                del self._mem[key]
+            conn = self._db()
+            if conn is not None:
+                row = conn.execute("SELECT value, expires_at FROM prompt_cache WHERE key = ?", (key,)).fetchone()
+                if row and row[1] > now:
+                    conn.execute("UPDATE prompt_cache SET last_access = ? WHERE key = ?", (now, key))
+                    value = json.loads(row[0])
+                    self._remember(key, row[1], value)
+                    self.counters["hits_disk"] += 1
+                    return value
+                if row:
+                    conn.execute("DELETE FROM prompt_cache WHERE key = ?", (key,))
+            self.counters["misses"] += 1
+            return None
+
+    def set(self, key, value):
+        now = time.time()
+        expires_at = now + self.ttl
+        with self._lock:
+            self._remember(key, expires_at, value)
+            self.counters["sets"] += 1
+            conn = self._db()
+            if conn is not None:
+                conn.execute(
+                    "INSERT OR REPLACE INTO prompt_cache(key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), expires_at, now),
+                )
+                # amortise the size check over every 100 writes
+                if self.counters["sets"] % 100 == 0:
+                    self._trim_disk(now)
+
+    def _trim_disk(self, now):
+        conn = self._conn
+        conn.execute("DELETE FROM prompt_cache WHERE expires_at <= ?", (now,))
+        (count,) = conn.execute("SELECT COUNT(*) FROM prompt_cache").fetchone()
+        over = count - self.disk_max_entries
+        if over > 0:
+            conn.execute(
+                "DELETE FROM prompt_cache WHERE key IN (SELECT key FROM prompt_cache ORDER BY last_access LIMIT ?)",
+                (over,),
+            )
+            self.counters["evictions"] += over
+
+    def clear(self):
+        with self._lock:
+            self._mem.clear()
+            conn = self._db()
+            if conn is not None:
+                conn.execute("DELETE FROM prompt_cache")
+
+    def stats(self):
+        with self._lock:
+            out = dict(self.counters)
+            out["memory_entries"] = len(self._mem)
+            lookups = out["hits_memory"] + out["hits_disk"] + out["misses"]
+            out["hit_ratio"] = round((out["hits_memory"] + out["hits_disk"]) / lookups, 4) if lookups else 0.0
+            return out
@@ -0,0 +1,103 @@
+# backend/ranking.py
+# Ranked 7-day leaderboard kept in memory: a sorted list of (total, user_id)
+# that answers page and rank queries with a bisect. Each read first syncs it
+# with the database through data_versions. Nothing happens if the leaderboard
+# version is unchanged. Otherwise only users whose own data version moved
+# since the last sync are recomputed. The list is rebuilt when the 7-day
+# window moves or the rollup table was rebuilt.
+# Every process keeps its own copy, so this stays correct with several workers.
+import bisect
+import threading
+from datetime import datetime, timedelta
+
+from . import crud
+
+# data_versions timestamps are taken inside the writing transaction; look a
+# little further back than the last one seen so a commit racing a sync is
+# never skipped (recomputing a user twice is harmless)
+SYNC_SLACK = timedelta(seconds=1)
+
+
+class RankedBoard:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows = []  # sorted (total, user_id)
+        self._totals = {}  # user_id -> total
+        self._names = {}  # user_id -> display name
+        self._cutoff = None
+        self._version = None
+        self._rollups_version = None
+        self._synced_to = None  # newest user-scope updated_at applied
+
+    # -- sync -----------------------------------------------------------------
+    def sync(self, db):
+        cutoff = crud.leaderboard_cutoff()
+        version, _ = crud.get_data_version(db, crud.LEADERBOARD_SCOPE)
+        with self._lock:
+            if cutoff == self._cutoff and version == self._version:
+                return
+            rollups_version, _ = crud.get_data_version(db, crud.ROLLUPS_SCOPE)
+            changed = None
+            if cutoff == self._cutoff and rollups_version == self._rollups_version:
+                changed, newest = crud.users_changed_since(db, self._synced_to - SYNC_SLACK)
+            if changed:
+                self._apply(crud.leaderboard_totals(db, cutoff, changed))
+                self._synced_to = max(self._synced_to, newest)
+            else:
+                self._rebuild(db, cutoff)
+            self._cutoff = cutoff
+            self._version = version
+            self._rollups_version = rollups_version
+
+    def _rebuild(self, db, cutoff):
+        newest = crud.latest_user_change(db)
+        rows = crud.leaderboard_totals(db, cutoff)
+        self._totals = {uid: round(total or 0.0, 4) for uid, _, _, total in rows}
+        self._names = {uid: f"{first} {last}" for uid, first, last, _ in rows}
+        self._rows = sorted((t, uid) for uid, t in self._totals.items())
+        self._synced_to = newest or datetime.utcnow()
+
+    def _apply(self, rows):
+        for uid, first, last, total in rows:
+            total = round(total or 0.0, 4)
+            old = self._totals.get(uid)
+            if old == total:
+                continue
+            if old is not None:
+                del self._rows[bisect.bisect_left(self._rows, (old, uid))]
+            bisect.insort(self._rows, (total, uid))
+            self._totals[uid] = total
+            self._names[uid] = f"{first} {last}"
+
+    # -- queries (call sync first) --------------------------------------------
+    def _row(self, i):
+        total, uid = self._rows[i]
+        # ties share a rank: 1 + number of users with a strictly lower total
+        rank = bisect.bisect_left(self._rows, (total,)) + 1
+        return {"rank": rank, "user_id": uid, "name": self._names[uid], "last7_kgco2": total}
+
+    def size(self):
+        return len(self._rows)
+
+    def page(self, offset=0, limit=None):
+        with self._lock:
+            end = len(self._rows) if limit is None else min(len(self._rows), offset + limit)
+            return [self._row(i) for i in range(offset, end)]
+
+    def around(self, user_id, neighbours=2):
+        """The user's row plus up to `neighbours` rows either side, or None if not ranked."""
+        with self._lock:
+            total = self._totals.get(user_id)
+            if total is None:
+                return None
+            i = bisect.bisect_left(self._rows, (total, user_id))
+            lo, hi = max(0, i - neighbours), min(len(self._rows), i + neighbours + 1)
+            return {
+                "total_users": len(self._rows),
+                "me": self._row(i),
+                "above": [self._row(j) for j in range(lo, i)],
+                "below": [self._row(j) for j in range(i + 1, hi)],
+            }
+
+
+board = RankedBoard()
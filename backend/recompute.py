@@ -0,0 +1,171 @@
+# backend/recompute.py
+# Re-derives emissions_kgco2 for stored entries when the factor sets change.
+#
+# Every entry records the factor version that priced it. It is stale when
+# that version is no longer loaded, or when the set no longer covers the
+# entry's date because a newer set was added in between. Stale rows are
+# found through ix_entries_factor_version and re-priced with the set now in
+# effect for their date, RECOMPUTE_BATCH_SIZE rows per transaction. Each
+# batch moves daily_rollups, user_totals and the users' data versions by
+# the same deltas, so stats, caches and the leaderboard follow. Re-priced
+# rows drop out of the stale set, so an interrupted run simply continues.
+#
+# Rows with factor_version "manual" (the client gave the number) are never
+# touched. Rows from before versioning (NULL) are only re-priced when asked:
+# python -m backend.manage recompute-emissions --legacy
+import json
+import logging
+import os
+import threading
+
+from sqlalchemy import and_, or_
+
+from .database import SessionLocal
+from . import models, crud, factors, utils
+
+log = logging.getLogger(__name__)
+
+RECOMPUTE_BATCH_SIZE = int(os.environ.get("RECOMPUTE_BATCH_SIZE", "5000"))
+# bumped first in every batch: the write lock it takes keeps concurrent runs
+# (one per worker process) from re-pricing the same rows twice
+RECOMPUTE_SCOPE = "factors"
+
+
+def stale_filter(windows, present, include_legacy=False):
+    """
+    SQL condition for stale entries. `present` holds the factor versions found
+    on entries; spelling each one out (rather than NOT IN) keeps every term
+    an index range.
+    """
+    E = models.Entry
+    known = {t.version for t, _, _ in windows}
+    terms = []
+    for table, start, end in windows:
+        if table.version not in present:
+            continue
+        if start is not None:
+            terms.append(and_(E.factor_version == table.version, E.timestamp < start))
+        if end is not None:
+            terms.append(and_(E.factor_version == table.version, E.timestamp >= end))
+    gone = [v for v in present if v is not None and v not in known and v != factors.MANUAL_VERSION]
+    if gone:
+        terms.append(E.factor_version.in_(gone))
+    if include_legacy and None in present:
+        terms.append(E.factor_version.is_(None))
+    return or_(*terms) if terms else None
+
+
+def _table_at(windows, ts):
+    if ts is None:
+        return windows[-1][0]
+    for table, start, end in windows:
+        if (start is None or ts >= start) and (end is None or ts < end):
+            return table
+    return windows[-1][0]
+
+
+def reprice(category, details, table):
+    """(emissions, new details or None) for one stored entry under `table`."""
+    if category == "photo-analysis" and isinstance(details.get("detection_details"), list):
+        total, dets = utils.estimate_from_photo_labels(details["detection_details"], table)
+        return total, (dict(details, detection_details=dets) if dets != details["detection_details"] else None)
+    return utils.calc_entry_emissions(category, details, table), None
+
+
+def _batch(db, windows, stale, batch_size):
+    E = models.Entry
+    crud.bump_data_version(db, RECOMPUTE_SCOPE)
+    rows = db.query(E.id, E.user_id, E.timestamp, E.category, E.details, E.emissions_kgco2) \
+        .filter(stale).limit(batch_size).all()
+    repriced = []
+    for entry_id, user_id, ts, category, details, old in rows:
+        table = _table_at(windows, ts)
+        try:
+            new, new_details = reprice(category, json.loads(details or "{}"), table)
+            version = table.version
+        except (ValueError, TypeError, AttributeError):
+            # can't be re-derived from what was stored: keep the number as given
+            new, new_details, version = old, None, factors.MANUAL_VERSION
+        repriced.append({"id": entry_id, "user_id": user_id, "timestamp": ts, "category": category,
+                         "old": old, "new": new, "factor_version": version, "details": new_details})
+    changed = crud.reprice_entries(db, repriced) if repriced else 0
+    db.commit()
+    return len(rows), changed
+
+
+def run(include_legacy=False, batch_size=None, stop=None, progress=None):
+    """
+    Re-price every stale entry. `progress(rows, changed)` is called after each
+    committed batch; `stop()` turning true ends the run between batches.
+    """
+    batch_size = batch_size or RECOMPUTE_BATCH_SIZE
+    db = SessionLocal()
+    total = changed = 0
+    try:
+        present = set(crud.factor_version_counts(db))
+        while not (stop and stop()):
+            # re-read each batch so a reload mid-run is picked up
+            windows = factors.registry.windows()
+            stale = stale_filter(windows, present, include_legacy)
+            if stale is None:
+                break
+            n, c = _batch(db, windows, stale, batch_size)
+            if not n:
+                break
+            total += n
+            changed += c
+            if progress:
+                progress(total, changed)
+    finally:
+        db.close()
+    return {"rows": total, "changed": changed, "versions": factors.registry.versions()}
+
+
+class RecomputeRunner:
+    """Runs `run` on a background thread at start-up and whenever the factor sets change."""
+
+    def __init__(self, interval=factors.FACTOR_RELOAD_INTERVAL):
+        self.interval = interval
+        self._thread = None
+        self._stopping = threading.Event()
+        self._done_generation = None
+        self.runs = 0
+        self.rows = 0
+        self.changed = 0
+
+    def start(self):
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._loop, name="factor-recompute", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=30):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self):
+        return {"runs": self.runs, "rows": self.rows, "changed": self.changed,
+                "reloads": factors.registry.reloads, "reload_errors": factors.registry.reload_errors}
+
+    def _loop(self):
+        while not self._stopping.is_set():
+            try:
+                # polls the factor directory even when no request does
+                factors.registry.maybe_reload()
+                generation = factors.registry.generation
+                if generation != self._done_generation:
+                    result = run(stop=self._stopping.is_set)
+                    if not self._stopping.is_set():
+                        self._done_generation = generation
+                    self.runs += 1
+                    self.rows += result["rows"]
+                    self.changed += result["changed"]
+                    if result["rows"]:
+                        log.info("re-priced %s entries (%s changed) for %s", result["rows"], result["changed"], result["versions"])
+            except Exception:
+                log.exception("factor recompute failed")
+            self._stopping.wait(self.interval)
+
+
+runner = RecomputeRunner()
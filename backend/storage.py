@@ -1,40 +1,262 @@
 # backend/storage.py
+# File-backed record store for the legacy data/*.json collections.
+#
+# Each collection is an append-only JSONL log (data/<name>.jsonl) of
+# {"op": "put", "rec": {...}} / {"op": "del", "id": ...} lines, replayed into
+# an in-memory index by id and by user. Appends are O(1); the log is
+# compacted into a fresh snapshot (fsync + atomic rename) once it is mostly
+# dead lines. Writers take an advisory file lock, and readers tail lines
+# appended by other processes before answering. Reads hand out copies, so a
+# caller editing a record can't change the index behind the log's back. The
+# first open of a collection seeds the log from the old <name>.json file if
+# there is one.
+import copy
 import json
+import os
+import threading
 from pathlib import Path
-from threading import Lock
+
+try:
+    import fcntl
+except ImportError:  # Windows: process-local locking only
+    fcntl = None
 
 BASE = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE / "data"
 DATA_DIR.mkdir(exist_ok=True, parents=True)
-lock = Lock()
 
-def _path(name):
-    return DATA_DIR / name
+FSYNC = os.environ.get("STORAGE_FSYNC", "1") == "1"
+COMPACT_MIN_LINES = int(os.environ.get("STORAGE_COMPACT_MIN_LINES", "1000"))
+
+lock = threading.RLock()
+
+ID_FIELDS = {"users": "user_id", "entries": "entry_id", "photos": "photo_id", "goals": "goal_id"}
+
+
+def _fsync_dir(path):
+    if not FSYNC or os.name == "nt":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class _FileLock:
+    def __init__(self, path):
+        self.path = path
+
+    def __enter__(self):
+        self._f = open(self.path, "a+")
+        if fcntl is not None:
+            fcntl.flock(self._f, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self._f, fcntl.LOCK_UN)
+        self._f.close()
+
+
+class Collection:
+    def __init__(self, name, data_dir=DATA_DIR):
+        self.name = name
+        self.id_field = ID_FIELDS.get(name, "id")
+        self.log_path = Path(data_dir) / f"{name}.jsonl"
+        self.legacy_path = Path(data_dir) / f"{name}.json"
+        self.lock_path = Path(data_dir) / f".{name}.lock"
+        self.records = {}   # id -> record, insertion ordered
+        self.by_user = {}   # user_id -> set of ids
+        self._inode = None
+        self._offset = 0
+        self._lines = 0
+
+    # -- index ---------------------------------------------------------
+    def _rec_id(self, rec):
+        rid = rec.get(self.id_field, rec.get("id"))
+        if rid is None:
+            raise ValueError(f"{self.name} record has no {self.id_field}")
+        return str(rid)
+
+    def _index_put(self, rec):
+        rid = self._rec_id(rec)
+        self._index_del(rid)
+        self.records[rid] = rec
+        uid = rec.get("user_id")
+        if uid is not None:
+            self.by_user.setdefault(uid, set()).add(rid)
+
+    def _index_del(self, rid):
+        old = self.records.pop(rid, None)
+        if old is not None and old.get("user_id") is not None:
+            ids = self.by_user.get(old["user_id"])
+            if ids is not None:
+                ids.discard(rid)
+
+    def _apply(self, line):
+        op = json.loads(line)
+        if op.get("op") == "del":
+            self._index_del(str(op["id"]))
+        else:
+            self._index_put(op["rec"])
+
+    # -- log -----------------------------------------------------------
+    def _refresh(self):
+        """Catch up with the log on disk (other processes may have written)."""
+        st = os.stat(self.log_path)
+        if st.st_ino != self._inode or st.st_size < self._offset:
+            # first load, or compacted by someone else: replay from scratch
+            self.records, self.by_user = {}, {}
+            self._inode, self._offset, self._lines = st.st_ino, 0, 0
+        if st.st_size == self._offset:
+            return
+        with open(self.log_path, "rb") as f:
+            f.seek(self._offset)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # torn tail from a crashed writer; ignored until completed
+                self._offset += len(raw)
+                line = raw.strip()
+                if not line:
+                    continue
+                try:
+                    self._apply(line)
+                except ValueError:
+                    continue
+                self._lines += 1
+
+    def _ensure_log(self):
+        # called before taking the file lock (flock is not re-entrant across fds)
+        if not self.log_path.exists():
+            self._seed_from_legacy()
+
+    def _seed_from_legacy(self):
+        with _FileLock(self.lock_path):
+            if self.log_path.exists():
+                return
+            recs = []
+            if self.legacy_path.exists():
+                try:
+                    with self.legacy_path.open("r", encoding="utf-8") as f:
+                        recs = json.load(f)
+                except ValueError:
+                    recs = []
+            self._write_snapshot(recs)
+
+    def _write_snapshot(self, recs):
+        tmp = self.log_path.with_suffix(".jsonl.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for rec in recs:
+                f.write(json.dumps({"op": "put", "rec": rec}, ensure_ascii=False) + "\n")
+            f.flush()
+            if FSYNC:
+                os.fsync(f.fileno())
+        os.replace(tmp, self.log_path)
+        _fsync_dir(self.log_path.parent)
+
+    def _append(self, ops):
+        if not ops:
+            return
+        data = "".join(json.dumps(op, ensure_ascii=False) + "\n" for op in ops)
+        if os.path.getsize(self.log_path) > self._offset:
+            data = "\n" + data  # terminate a torn tail so it can't swallow our first line
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write(data)
+            f.flush()
+            if FSYNC:
+                os.fsync(f.fileno())
+
+    def _maybe_compact(self):
+        if self._lines > COMPACT_MIN_LINES and self._lines > 2 * len(self.records):
+            self._write_snapshot(list(self.records.values()))
+            st = os.stat(self.log_path)
+            self._inode, self._offset, self._lines = st.st_ino, st.st_size, len(self.records)
+
+    def _write(self, ops):
+        self._ensure_log()
+        with lock, _FileLock(self.lock_path):
+            self._refresh()
+            self._append(ops)
+            self._refresh()
+            self._maybe_compact()
+
+    # -- API -----------------------------------------------------------
+    def all(self):
+        self._ensure_log()
+        with lock:
+            self._refresh()
+            return copy.deepcopy(list(self.records.values()))
+
+    def get(self, rid):
+        self._ensure_log()
+        with lock:
+            self._refresh()
+            return copy.deepcopy(self.records.get(str(rid)))
+
+    def for_user(self, user_id):
+        self._ensure_log()
+        with lock:
+            self._refresh()
+            return copy.deepcopy([self.records[i] for i in self.by_user.get(user_id, ()) if i in self.records])
+
+    def put(self, rec):
+        self._write([{"op": "put", "rec": rec}])
+        return rec
+
+    def delete(self, rid):
+        self._write([{"op": "del", "id": str(rid)}])
+
+    def replace_all(self, recs):
+        """Make the collection equal to `recs`, logging only what changed."""
+        self._ensure_log()
+        with lock, _FileLock(self.lock_path):
+            self._refresh()
+            new = {self._rec_id(r): r for r in recs}
+            ops = [{"op": "del", "id": rid} for rid in self.records if rid not in new]
+            ops += [{"op": "put", "rec": r} for rid, r in new.items() if self.records.get(rid) != r]
+            self._append(ops)
+            self._refresh()
+            self._maybe_compact()
+
+    def compact(self):
+        self._ensure_log()
+        with lock, _FileLock(self.lock_path):
+            self._refresh()
+            self._write_snapshot(list(self.records.values()))
+            st = os.stat(self.log_path)
+            self._inode, self._offset, self._lines = st.st_ino, st.st_size, len(self.records)
+
+
+_collections = {}
+
+def collection(name):
+    with lock:
+        if name not in _collections:
+            _collections[name] = Collection(name)
+        return _collections[name]
 
 def _read(name):
-    p = _path(name)
-    if not p.exists():
-        return []
-    with p.open("r", encoding="utf-8") as f:
-        try:
-            return json.load(f)
-        except Exception:
-            return []
+    return collection(name).all()
 
 def _write(name, obj):
-    p = _path(name)
-    with lock:
-        with p.open("w", encoding="utf-8") as f:
-            json.dump(obj, f, ensure_ascii=False, indent=2)
+    return collection(name).replace_all(obj)
+
+def read_users(): return _read("users")
+def write_users(v): return _write("users", v)
+
+def read_entries(): return _read("entries")
+def write_entries(v): return _write("entries", v)
 
-def read_users(): return _read("users.json")
-def write_users(v): return _write("users.json", v)
+def read_photos(): return _read("photos")
+def write_photos(v): return _write("photos", v)
 
-def read_entries(): return _read("entries.json")
-def write_entries(v): return _write("entries.json", v)
+def read_goals(): return _read("goals")
+def write_goals(v): return _write("goals", v)
 
-def read_photos(): return _read("photos.json")
-def write_photos(v): return _write("photos.json", v)
+def append_user(rec): return collection("users").put(rec)
+def append_entry(rec): return collection("entries").put(rec)
+def append_photo(rec): return collection("photos").put(rec)
+def append_goal(rec): return collection("goals").put(rec)
 
-def read_goals(): return _read("goals.json")
-def write_goals(v): return _write("goals.json", v)
+def entries_for_user(user_id): return collection("entries").for_user(user_id)
@@ -0,0 +1,66 @@
+# backend/summaries.py
+# Per-user activity summary for the assistant prompt. crud.user_summary reads
+# the incrementally maintained user_totals plus at most 30 days of rollups.
+# Results are cached per user and keyed on the user's data version and the
+# current day. A write anywhere (any worker) therefore invalidates the entry,
+# and a hit costs one primary-key lookup.
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from . import crud
+
+SUMMARY_CACHE_SIZE = int(os.environ.get("SUMMARY_CACHE_SIZE", "10000"))
+
+
+class SummaryCache:
+    def __init__(self, max_size=SUMMARY_CACHE_SIZE):
+        self.max_size = max_size
+        self._data = OrderedDict()  # user_id -> ((version, day), summary)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, db, user_id):
+        version, _ = crud.get_data_version(db, crud.user_scope(user_id))
+        key = (version, datetime.utcnow().date())
+        with self._lock:
+            item = self._data.get(user_id)
+            if item is not None and item[0] == key:
+                self._data.move_to_end(user_id)
+                self.hits += 1
+                return item[1]
+            self.misses += 1
+        summary = crud.user_summary(db, user_id, today=key[1])
+        with self._lock:
+            self._data[user_id] = (key, summary)
+            self._data.move_to_end(user_id)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+        return summary
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+def context_line(user, s):
+    """One compact paragraph the model can ground its advice in."""
+    name = f"{user.first_name} {user.last_name}"
+    if not s["entries"]:
+        return f"User {name} has not logged any activities yet."
+    cats = ", ".join(f"{c} {t}" for c, t in sorted(s["by_category"].items(), key=lambda kv: -kv[1]))
+    parts = [
+        f"User {name} has logged {s['entries']} activities totalling {s['total_kgco2']} kgCO2 ({cats}).",
+        f"Last 7 days: {s['last_7d_kgco2']} kgCO2; previous 7 days: {s['prev_7d_kgco2']} kgCO2",
+    ]
+    if s["trend_pct"] is not None:
+        parts[-1] += f" ({s['trend_pct']:+}%)"
+    parts[-1] += f"; last 30 days: {s['last_30d_kgco2']} kgCO2."
+    if s["last_entry_at"]:
+        parts.append(f"Most recent activity: {s['last_entry_at'][:10]}.")
+    return " ".join(parts)
+
+
+cache = SummaryCache()
@@ -0,0 +1,147 @@
+# backend/vectorized.py
+# Columnar emission engine: same results as the scalar calculators in utils,
+# evaluated over NumPy arrays so millions of activities cost a handful of
+# array operations instead of one Python call each.
+import numpy as np
+from . import factors, utils
+
+# vehicle_type -> (per-km factor key, divide by passengers?)
+VEHICLES = {
+    "car_petrol": ("car_petrol_kgco2_per_km", True),
+    "bus": ("bus_kgco2_per_km", False),
+    "train": ("train_kgco2_per_km", False),
+    "flight_short": ("flight_short_kgco2_per_km", False),
+}
+CATEGORIES = ("transport", "electricity", "waste")
+NUMERIC_FIELDS = ("km", "passengers", "fuel_liters", "kwh", "kg", "estimated_kgco2")
+DETAIL_DEFAULTS = {"km": 0, "passengers": 1, "kwh": 0, "kg": 0, "estimated_kgco2": 0.0}
+
+class FactorIndex:
+    """Factor lookups compiled into arrays indexed by small integer codes."""
+
+    def __init__(self, factors, label_map, table=None):
+        self.factors = dict(factors)
+        self.table = table  # the factors.FactorTable it was compiled from, if any
+        self.vehicle_codes = {v: i + 1 for i, v in enumerate(VEHICLES)}  # 0 = unknown
+        self.vehicle_km = np.zeros(len(VEHICLES) + 1)
+        self.vehicle_shared = np.zeros(len(VEHICLES) + 1, dtype=bool)
+        for v, code in self.vehicle_codes.items():
+            key, shared = VEHICLES[v]
+            self.vehicle_km[code] = factors[key]
+            self.vehicle_shared[code] = shared
+        self.category_codes = {c: i + 1 for i, c in enumerate(CATEGORIES)}
+        self.label_codes = {name: i + 1 for i, name in enumerate(label_map)}
+        self.label_est = np.zeros(len(label_map) + 1)
+        for name, code in self.label_codes.items():
+            mapped = label_map[name]
+            factor = factors.get(mapped["factor_key"], factors["avg_meal_kgco2"])
+            self.label_est[code] = mapped.get("kg", 0.2) * factor
+
+    def encode(self, values, codes):
+        # a single dict probe per value; cheaper than np.unique's string sort
+        return np.fromiter((codes.get(v, 0) for v in values), dtype=np.intp, count=len(values))
+
+_indexes = {}  # factor version -> FactorIndex
+
+def index_for(table):
+    idx = _indexes.get(table.version)
+    if idx is None:
+        if len(_indexes) >= 8:
+            _indexes.clear()
+        idx = _indexes[table.version] = FactorIndex(table.factors, table.matcher().label_map(), table)
+    return idx
+
+def default_index():
+    """Index of the factor set in effect now."""
+    return index_for(factors.current())
+
+def _column(values, n, rows, cast=float, default=0.0):
+    """
+    float64 column of cast(v) over the positions in `rows`, `default` elsewhere.
+    Conversion matches the scalar calculators value for value, so a value they
+    reject raises the same ValueError/TypeError here. Numeric arrays skip the
+    per-value casts.
+    """
+    if values is None:
+        return np.full(n, default)
+    if isinstance(values, np.ndarray) and values.dtype.kind in "fiub":
+        arr = values.astype(np.float64, copy=False)
+        return np.trunc(arr) if cast is int else arr
+    out = np.full(n, default)
+    for i in rows:
+        out[i] = cast(values[i])
+    return out
+
+def _or_zero(v):
+    # the scalar calculators' `float(x or 0)`
+    return float(v or 0)
+
+def calc_emissions(category, vehicle_type=None, km=None, passengers=None, fuel_liters=None,
+                   kwh=None, kg=None, estimated=None, index=None):
+    """
+    Vectorised utils.calc_entry_emissions. Every argument is a sequence of
+    equal length (or None = the field is absent everywhere). Returns a float64
+    array; raises where the scalar path would raise for some row.
+    """
+    idx = index or default_index()
+    n = len(category)
+    cat = idx.encode(category, idx.category_codes)
+    veh = np.zeros(n, dtype=np.intp) if vehicle_type is None else idx.encode(vehicle_type, idx.vehicle_codes)
+    is_transport = cat == idx.category_codes["transport"]
+    is_electricity = cat == idx.category_codes["electricity"]
+    is_waste = cat == idx.category_codes["waste"]
+    shared = idx.vehicle_shared[veh] & is_transport
+
+    # each field is read only for the rows whose calculator reads it
+    est = _column(estimated, n, range(n), _or_zero)
+    transport_rows = np.flatnonzero(is_transport)
+    km = _column(km, n, transport_rows)
+    pax = _column(passengers, n, transport_rows, int, default=1)
+    pax = np.maximum(np.where(pax == 0, 1, pax), 1)
+    kwh = _column(kwh, n, np.flatnonzero(is_electricity), _or_zero)
+    kg = _column(kg, n, np.flatnonzero(is_waste), _or_zero)
+    # car_petrol prices by fuel whenever fuel_liters is truthy (even "0")
+    if fuel_liters is None:
+        fuel, by_fuel = np.zeros(n), np.zeros(n, dtype=bool)
+    elif isinstance(fuel_liters, np.ndarray) and fuel_liters.dtype.kind in "fiub":
+        fuel = fuel_liters.astype(np.float64, copy=False)
+        by_fuel = fuel != 0
+    else:
+        fuel_rows = [i for i in np.flatnonzero(shared) if fuel_liters[i]]
+        fuel = _column(fuel_liters, n, fuel_rows)
+        by_fuel = np.zeros(n, dtype=bool)
+        by_fuel[fuel_rows] = True
+
+    f = idx.factors
+    per_km = km * idx.vehicle_km[veh]
+    transport = np.where(shared, np.where(by_fuel, fuel * f["car_petrol_kgco2_per_liter"], per_km / pax), per_km)
+
+    out = np.select(
+        [is_transport, is_electricity, is_waste],
+        [transport, kwh * f["electricity_kgco2_per_kwh"], kg * f["waste_kgco2_per_kg"]],
+        default=0.0,
+    )
+    return np.where(est != 0, est, out)
+
+def calc_emissions_from_details(categories, details_list, index=None):
+    """Columnar calc over (category, details dict) pairs as stored on entries."""
+    # absent fields take the scalar path's .get() defaults; an explicit None stays None
+    cols = {k: [d.get(k, DETAIL_DEFAULTS.get(k)) for d in details_list] for k in NUMERIC_FIELDS}
+    return calc_emissions(
+        categories,
+        vehicle_type=[d.get("vehicle_type") for d in details_list],
+        km=cols["km"], passengers=cols["passengers"], fuel_liters=cols["fuel_liters"],
+        kwh=cols["kwh"], kg=cols["kg"], estimated=cols["estimated_kgco2"], index=index,
+    )
+
+def estimate_labels(labels, confidences, index=None):
+    """
+    Per-label estimates matching utils.estimate_from_photo_labels: NaN where
+    the label resolves to nothing or confidence <= 0.2.
+    """
+    idx = index or default_index()
+    matcher = utils.label_matcher(idx.table)
+    resolved = [matcher.resolve(l or "") for l in labels]
+    codes = idx.encode([m.label if m else None for m in resolved], idx.label_codes)
+    conf = _column(confidences, len(labels), range(len(labels)), _or_zero)
+    return np.where((codes > 0) & (conf > 0.2), idx.label_est[codes], np.nan)
@@ -0,0 +1,128 @@
+# backend/write_batcher.py
+# Optional group commit for single-row writes. Request threads hand a write
+# operation to one writer thread, which runs everything that arrived within
+# WRITE_BATCH_MAX_DELAY_MS (up to WRITE_BATCH_MAX_ROWS ops) in a single
+# transaction. Each caller is released only after that commit returns.
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from .database import SessionLocal
+
+WRITE_BATCHING = os.environ.get("WRITE_BATCHING", "0") == "1"
+WRITE_BATCH_MAX_ROWS = int(os.environ.get("WRITE_BATCH_MAX_ROWS", "64"))
+WRITE_BATCH_MAX_DELAY_MS = float(os.environ.get("WRITE_BATCH_MAX_DELAY_MS", "5"))
+
+_STOP = object()
+
+
+class WriteBatcher:
+    def __init__(self, max_rows=WRITE_BATCH_MAX_ROWS, max_delay_ms=WRITE_BATCH_MAX_DELAY_MS):
+        self.max_rows = max_rows
+        self.max_delay = max_delay_ms / 1000.0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.ops = 0
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="write-batcher", daemon=True)
+                self._thread.start()
+
+    def submit(self, op):
+        """
+        op(db) adds/updates rows without committing and returns a result.
+        Blocks until the batch containing it is committed, then returns op's
+        result (ORM objects come back detached with their attributes loaded).
+        """
+        self._ensure_started()
+        fut = Future()
+        self._queue.put((op, fut))
+        return fut.result()
+
+    def stop(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                self._queue.put(_STOP)
+                self._thread.join()
+            self._thread = None
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is _STOP:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_rows:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)  # finish this batch first
+                break
+            batch.append(item)
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            self._flush(batch)
+
+    def _flush(self, batch):
+        db = SessionLocal(expire_on_commit=False)
+        try:
+            try:
+                results = [op(db) for op, _ in batch]
+                db.commit()
+            except Exception:
+                # one bad op must not fail its neighbours: redo them one by one
+                db.rollback()
+                self._flush_individually(db, batch)
+                return
+            db.expunge_all()
+            self.batches += 1
+            self.ops += len(batch)
+            for (_, fut), res in zip(batch, results):
+                fut.set_result(res)
+        finally:
+            db.close()
+
+    def _flush_individually(self, db, batch):
+        for op, fut in batch:
+            try:
+                res = op(db)
+                db.commit()
+                db.expunge_all()
+                self.batches += 1
+                self.ops += 1
+                fut.set_result(res)
+            except Exception as e:
+                db.rollback()
+                fut.set_exception(e)
+
+    def stats(self):
+        return {"enabled": WRITE_BATCHING, "batches": self.batches, "ops": self.ops, "queued": self._queue.qsize()}
+
+
+batcher = WriteBatcher()
+
+
+def run(db, op):
+    """Run a write op through the batcher when enabled, else on `db` with its own commit."""
+    if WRITE_BATCHING:
+        return batcher.submit(op)
+    res = op(db)
+    db.commit()
+    db.refresh(res)
+    return res
@@ -0,0 +1,43 @@
+# bench/compare.py
+# Diff two bench/run.py reports:  python -m bench.compare old.json new.json
+import argparse
+import json
+
+METRICS = ["p50_ms", "p95_ms", "p99_ms", "throughput_rps", "sql_per_request"]
+HIGHER_IS_BETTER = {"throughput_rps"}
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="python -m bench.compare")
+    p.add_argument("old")
+    p.add_argument("new")
+    p.add_argument("--threshold", type=float, default=10.0, help="flag changes worse than this many percent")
+    args = p.parse_args(argv)
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    print(f"{old.get('git_rev')} -> {new.get('git_rev')}")
+    regressions = 0
+    for sc, n in new["scenarios"].items():
+        o = old["scenarios"].get(sc)
+        if not o:
+            continue
+        cells = []
+        for m in METRICS:
+            if o.get(m) in (None, 0) or n.get(m) is None:
+                continue
+            pct = (n[m] - o[m]) / o[m] * 100
+            worse = -pct if m in HIGHER_IS_BETTER else pct
+            flag = " !" if worse > args.threshold else ""
+            regressions += bool(flag)
+            cells.append(f"{m}={o[m]}->{n[m]} ({pct:+.1f}%){flag}")
+        print(f"{sc:15s} " + "  ".join(cells))
+    if old.get("peak_rss_kb") and new.get("peak_rss_kb"):
+        print(f"peak_rss_kb    {old['peak_rss_kb']} -> {new['peak_rss_kb']}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
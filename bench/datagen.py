@@ -0,0 +1,112 @@
+# bench/datagen.py
+# Synthetic data for benchmarks. Writes into backend.database.DB_PATH, which
+# is data/carbon.db unless CARBON_DB_PATH is set:
+#
+#   CARBON_DB_PATH=/tmp/bench.db python -m bench.datagen --users 1000 --entries 100000
+#
+# Every generated user has email bench<i>@example.com, password "benchpass"
+# and token "benchtoken<i>", so scenarios can authenticate without logging in.
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+BENCH_PASSWORD = "benchpass"
+VEHICLES = ["car_petrol", "bus", "train", "flight_short"]
+LABELS = ["beef burger", "chicken", "soda can", "salad", "beef"]
+
+
+def user_token(i):
+    return f"benchtoken{i}"
+
+
+def user_email(i):
+    return f"bench{i}@example.com"
+
+
+def _activity(rng):
+    cat = rng.choice(["transport", "transport", "electricity", "waste", "food", "purchase"])
+    if cat == "transport":
+        return cat, {"vehicle_type": rng.choice(VEHICLES), "km": round(rng.uniform(1, 80), 2), "passengers": rng.randint(1, 4)}
+    if cat == "electricity":
+        return cat, {"kwh": round(rng.uniform(0.5, 30), 2)}
+    if cat == "waste":
+        return cat, {"kg": round(rng.uniform(0.1, 5), 2)}
+    if cat == "food":
+        return cat, {"food_desc": "meal", "food_kg": 0.3, "waste_kg": 0.0}
+    return cat, {"desc": "item", "estimated_kgco2": round(rng.uniform(0.5, 20), 2)}
+
+
+def generate(users, entries, photos=0, goals=0, days=365, seed=42, chunk=5000):
+    from backend.database import engine, SessionLocal
+    from backend import migrations, models, crud, utils
+    from backend.passwords import pwd_ctx
+
+    migrations.upgrade(engine)
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    pw_hash = pwd_ctx.hash(BENCH_PASSWORD)  # one hash shared by every bench user
+    db = SessionLocal()
+    try:
+        start = db.query(models.User).filter(models.User.email.like("bench%@example.com")).count()
+        user_ids = []
+        rows = []
+        for i in range(start, start + users):
+            uid = f"user_bench{i}"
+            user_ids.append(uid)
+            rows.append({"id": uid, "first_name": "Bench", "last_name": str(i), "email": user_email(i),
+                         "password_hash": pw_hash, "token": user_token(i), "created_at": now})
+        db.bulk_insert_mappings(models.User, rows)
+        db.commit()
+
+        def spread(total, make, model):
+            for s in range(0, total, chunk):
+                db.bulk_insert_mappings(model, [make(s + k) for k in range(min(chunk, total - s))])
+                db.commit()
+
+        def make_entry(n):
+            cat, det = _activity(rng)
+            return {"id": f"entry_b{start}_{n}", "user_id": rng.choice(user_ids),
+                    "timestamp": now - timedelta(seconds=rng.uniform(0, days * 86400)),
+                    "category": cat, "details": json.dumps(det),
+                    "emissions_kgco2": utils.calc_entry_emissions(cat, det), **models.detail_columns(det)}
+
+        def make_photo(n):
+            det = [{"label": rng.choice(LABELS), "confidence": round(rng.uniform(0.3, 1), 2)}]
+            return {"id": f"photo_b{start}_{n}", "user_id": rng.choice(user_ids), "filename": "bench",
+                    "sha256": f"{n:064x}", "detected_json": json.dumps(det),
+                    "estimated_kgco2": utils.estimate_from_photo_labels(det)[0],
+                    "created_at": now - timedelta(seconds=rng.uniform(0, days * 86400))}
+
+        def make_goal(n):
+            return {"id": f"goal_b{start}_{n}", "user_id": rng.choice(user_ids), "type": "reduce_percent",
+                    "params": json.dumps({"target_percent": rng.randint(5, 50)}), "created_at": now}
+
+        spread(entries, make_entry, models.Entry)
+        spread(photos, make_photo, models.Photo)
+        spread(goals, make_goal, models.Goal)
+        crud.rebuild_daily_rollups(db)
+        crud.rebuild_user_totals(db)
+        return {"first_user": start, "users": users, "entries": entries, "photos": photos, "goals": goals}
+    finally:
+        db.close()
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="python -m bench.datagen")
+    p.add_argument("--users", type=int, default=100)
+    p.add_argument("--entries", type=int, default=10000)
+    p.add_argument("--photos", type=int, default=0)
+    p.add_argument("--goals", type=int, default=0)
+    p.add_argument("--days", type=int, default=365)
+    p.add_argument("--seed", type=int, default=42)
+    args = p.parse_args(argv)
+    t = time.time()
+    out = generate(args.users, args.entries, args.photos, args.goals, args.days, args.seed)
+    out["seconds"] = round(time.time() - t, 2)
+    print(json.dumps(out))
+
+
+if __name__ == "__main__":
+    main()
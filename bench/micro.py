@@ -0,0 +1,92 @@
+# bench/micro.py
+# Micro-benchmarks for hot functions, independent of HTTP.
+#
+#   CARBON_DB_PATH=/tmp/bench.db python -m bench.micro --out micro.json
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+
+
+def timed(fn, repeat=5, number=1):
+    """Best-of-`repeat` seconds per call."""
+    runs = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        for _ in range(number):
+            fn()
+        runs.append((time.perf_counter() - t) / number)
+    return {"best_s": min(runs), "median_s": statistics.median(runs)}
+
+
+def synthetic_vocabulary(size, seed=0):
+    """`size` made-up multi-word labels (plus a synonym each) for sizing the label matcher."""
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = ["".join(rng.choice(letters) for _ in range(rng.randint(4, 9))) for _ in range(size // 4 + 1)]
+    vocab = {}
+    while len(vocab) < size:
+        label = " ".join(rng.sample(words, rng.randint(1, 3)))
+        vocab[label] = {"category": "food", "kg": 0.1, "factor_key": "avg_meal_kgco2", "synonyms": [rng.choice(words)]}
+    return vocab
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="python -m bench.micro")
+    p.add_argument("--rows", type=int, default=100000)
+    p.add_argument("--out", default=None)
+    args = p.parse_args(argv)
+
+    from backend import utils, vectorized, crud, models, labels
+    from backend.database import ReadSessionLocal
+    from bench.datagen import _activity, user_token
+
+    rng = random.Random(0)
+    acts = [_activity(rng) for _ in range(args.rows)]
+    cats = [c for c, _ in acts]
+    dets = [d for _, d in acts]
+    blobs = [json.dumps(d) for d in dets]
+
+    res = {"rows": args.rows}
+    res["calc_scalar"] = timed(lambda: [utils.calc_entry_emissions(c, d) for c, d in acts], repeat=3)
+    res["calc_vectorized"] = timed(lambda: vectorized.calc_emissions_from_details(cats, dets), repeat=3)
+    res["details_json_decode"] = timed(lambda: [json.loads(b) for b in blobs], repeat=3)
+    matcher = utils.label_matcher()
+    queries = [f"{w}s" for w in matcher.label_map()] + ["double beef burger", "cheeseburgers", "laptop"]
+    res["label_match_cold"] = timed(lambda: [matcher.matches(q, 5) for q in queries], repeat=3)
+    res["label_resolve_cached"] = timed(lambda: [matcher.resolve(q) for q in queries], number=10)
+    # the shipped vocabulary is small; size the index on a synthetic 20k one
+    vocab = synthetic_vocabulary(20000)
+    res["label_build_20k"] = timed(lambda: labels.LabelMatcher(vocab), repeat=3)
+    big = labels.LabelMatcher(vocab)
+    big_queries = [f"{w}s" for w in list(vocab)[:1000]] + [w[:-1] + "x" for w in list(vocab)[1000:2000]]
+    res["label_match_cold_20k"] = timed(lambda: [big.matches(q, 5) for q in big_queries], repeat=3)
+
+    db = ReadSessionLocal()
+    try:
+        res["leaderboard"] = timed(lambda: crud.leaderboard_last_7_days(db))
+        # one 1000-row /entries page: details decoded vs the typed columns
+        uid, typed = "user_bench0", ("id", "timestamp", "category", "emissions_kgco2") + tuple(models.DETAIL_COLUMNS)
+        res["entries_page_details"] = timed(lambda: [json.loads(r[3] or "{}") for r in crud.query_entries(db, uid, limit=1000)[0]], number=20)
+        res["entries_page_typed"] = timed(lambda: crud.query_entries(db, uid, limit=1000, fields=typed), number=20)
+        res["token_lookup_cached"] = timed(lambda: crud.get_user_by_token(db, user_token(0)), number=1000)
+        crud.auth_cache.tokens.clear()
+        res["token_lookup_cold"] = timed(lambda: (crud.auth_cache.tokens.clear(), crud.get_user_by_token(db, user_token(0))), number=200)
+    finally:
+        db.close()
+
+    for k, v in res.items():
+        if isinstance(v, dict):
+            print(f"{k:22s} best={v['best_s'] * 1000:.3f}ms", file=sys.stderr)
+    text = json.dumps(res, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
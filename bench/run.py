@@ -0,0 +1,229 @@
+# bench/run.py
+# API load test. Drives the FastAPI app in-process (TestClient) or over HTTP
+# against a local uvicorn, and writes a JSON report that bench/compare.py can
+# diff across commits.
+#
+#   CARBON_DB_PATH=/tmp/bench.db python -m bench.datagen --users 1000 --entries 100000
+#   CARBON_DB_PATH=/tmp/bench.db python -m bench.run --mode inprocess --requests 500
+#
+# The Gemini API is always replaced by bench/stub_gemini.py.
+import argparse
+import json
+import os
+import random
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+RESULTS_DIR = os.path.join(HERE, "results")
+
+SCENARIOS = ["signup", "login", "entries_read", "entries_write", "photos_upload", "leaderboard", "assistant"]
+
+
+def percentile(sorted_vals, q):
+    if not sorted_vals:
+        return None
+    k = min(len(sorted_vals) - 1, max(0, int(round(q / 100.0 * (len(sorted_vals) - 1)))))
+    return sorted_vals[k]
+
+
+class QueryCounter:
+    """Counts SQL statements on both engines (in-process mode only)."""
+
+    def __init__(self):
+        from sqlalchemy import event
+        from backend.database import engine, read_engine
+        self.count = 0
+        self._lock = threading.Lock()
+        for eng in (engine, read_engine):
+            event.listen(eng, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        with self._lock:
+            self.count += 1
+
+
+def make_request(scenario, users, rng, seq):
+    """Returns (method, path, kwargs) for one request of `scenario`."""
+    from bench.datagen import user_token, user_email, BENCH_PASSWORD
+    # the top tenth of bench users is reserved for /login, which rotates tokens
+    n_login = max(1, users["count"] // 10)
+    i = users["first"] + rng.randrange(users["count"] - n_login)
+    token = user_token(i)
+    if scenario == "signup":
+        email = f"signup{os.getpid()}_{seq}_{rng.randrange(10**9)}@example.com"
+        return "POST", "/signup", {"json": {"first_name": "S", "last_name": "U", "email": email, "password": "pw"}}
+    if scenario == "login":
+        j = users["first"] + users["count"] - 1 - rng.randrange(n_login)
+        return "POST", "/login", {"json": {"email": user_email(j), "password": BENCH_PASSWORD}}
+    if scenario == "entries_read":
+        return "GET", "/entries", {"params": {"token": token, "limit": 50}}
+    if scenario == "entries_write":
+        det = {"vehicle_type": "bus", "km": round(rng.uniform(1, 50), 2)}
+        return "POST", "/entries", {"data": {"token": token, "category": "transport", "details": json.dumps(det)}}
+    if scenario == "photos_upload":
+        return "POST", "/photos/upload", {"data": {"token": token}, "files": {"file": ("p.jpg", os.urandom(64 * 1024), "image/jpeg")}}
+    if scenario == "leaderboard":
+        return "GET", "/leaderboard", {}
+    if scenario == "assistant":
+        return "POST", "/gemini_client", {"data": {"token": token, "prompt": f"How do I cut emissions? #{seq}"}}
+    raise ValueError(scenario)
+
+
+def run_scenario(client, scenario, users, n, concurrency, seed):
+    rng = random.Random(seed)
+    reqs = [make_request(scenario, users, rng, k) for k in range(n)]
+    lat, errors = [], 0
+    lock = threading.Lock()
+
+    def one(req):
+        nonlocal errors
+        method, path, kw = req
+        t = time.perf_counter()
+        r = client.request(method, path, **kw)
+        dt = (time.perf_counter() - t) * 1000
+        with lock:
+            lat.append(dt)
+            if r.status_code >= 400:
+                errors += 1
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(one, reqs))
+    wall = time.perf_counter() - t0
+    lat.sort()
+    return {
+        "requests": n,
+        "errors": errors,
+        "concurrency": concurrency,
+        "throughput_rps": round(n / wall, 2) if wall else None,
+        "p50_ms": round(percentile(lat, 50), 3),
+        "p95_ms": round(percentile(lat, 95), 3),
+        "p99_ms": round(percentile(lat, 99), 3),
+        "max_ms": round(lat[-1], 3),
+    }
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _peak_rss_kb(pid=None):
+    if pid is None:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+
+
+def _git_rev():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return None
+
+
+def _bench_users():
+    from backend.database import SessionLocal
+    from backend import models
+    db = SessionLocal()
+    try:
+        emails = [e for (e,) in db.query(models.User.email).filter(models.User.email.like("bench%@example.com"))]
+    finally:
+        db.close()
+    idx = sorted(int(e[len("bench"):-len("@example.com")]) for e in emails)
+    if not idx:
+        sys.exit("no bench users: run python -m bench.datagen first")
+    return {"first": idx[0], "count": len(idx)}
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="python -m bench.run")
+    p.add_argument("--mode", choices=["inprocess", "uvicorn"], default="inprocess")
+    p.add_argument("--scenarios", default=",".join(SCENARIOS))
+    p.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    p.add_argument("--concurrency", type=int, default=8)
+    p.add_argument("--model-delay", type=float, default=0.05, help="stub model latency (s)")
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--out", default=None)
+    args = p.parse_args(argv)
+
+    stub, stub_url = __import__("bench.stub_gemini", fromlist=["start"]).start(delay=args.model_delay)
+    os.environ["GEMINI_BASE_URL"] = stub_url
+    os.environ.setdefault("PROMPT_CACHE_PATH", "")
+    os.environ.setdefault("BCRYPT_ROUNDS", "4")
+    # keep bench photos out of the real upload store
+    os.environ.setdefault("UPLOAD_DIR", os.path.join(tempfile.gettempdir(), "carbon-bench-uploads"))
+
+    users = _bench_users()
+    report = {
+        "git_rev": _git_rev(), "mode": args.mode, "created_at": datetime.utcnow().isoformat() + "Z",
+        "users": users, "requests_per_scenario": args.requests, "scenarios": {},
+    }
+
+    proc = None
+    if args.mode == "inprocess":
+        from fastapi.testclient import TestClient
+        from backend.main import app
+        counter = QueryCounter()
+        client_cm = TestClient(app)
+    else:
+        import httpx
+        port = _free_port()
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=ROOT, env=os.environ.copy(),
+        )
+        base = f"http://127.0.0.1:{port}"
+        for _ in range(100):
+            try:
+                httpx.get(base + "/leaderboard", timeout=1)
+                break
+            except httpx.HTTPError:
+                time.sleep(0.1)
+        counter = None
+        client_cm = httpx.Client(base_url=base, timeout=60, limits=httpx.Limits(max_connections=args.concurrency))
+
+    try:
+        with client_cm as client:
+            for sc in args.scenarios.split(","):
+                before = counter.count if counter else None
+                res = run_scenario(client, sc, users, args.requests, args.concurrency, args.seed)
+                if counter:
+                    res["sql_queries"] = counter.count - before
+                    res["sql_per_request"] = round(res["sql_queries"] / args.requests, 2)
+                report["scenarios"][sc] = res
+                print(f"{sc:15s} p50={res['p50_ms']:.1f}ms p95={res['p95_ms']:.1f}ms p99={res['p99_ms']:.1f}ms "
+                      f"rps={res['throughput_rps']} errors={res['errors']}", file=sys.stderr)
+        report["peak_rss_kb"] = _peak_rss_kb(proc.pid if proc else None)
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait()
+        stub.shutdown()
+
+    out = args.out
+    if out is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        out = os.path.join(RESULTS_DIR, f"{datetime.utcnow():%Y%m%dT%H%M%S}-{report['git_rev'] or 'nogit'}-{args.mode}.json")
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(out)
+
+
+if __name__ == "__main__":
+    main()
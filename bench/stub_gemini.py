@@ -0,0 +1,43 @@
+# bench/stub_gemini.py
+# Minimal local stand-in for the Gemini generateContent API. Text requests
+# echo the prompt tail; requests with an image part return fixed detections.
+# An optional delay simulates model latency.
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DETECTIONS = [{"label": "beef burger", "confidence": 0.9}, {"label": "soda can", "confidence": 0.6}]
+
+
+def make_handler(delay):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            if delay:
+                time.sleep(delay)
+            parts = body.get("contents", [{}])[0].get("parts", [])
+            if any("inline_data" in p for p in parts):
+                text = json.dumps(DETECTIONS)
+            else:
+                text = "stub: " + (parts[0].get("text", "") if parts else "")[-40:]
+            out = json.dumps({"candidates": [{"content": {"parts": [{"text": text}]}}]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(out)))
+            self.end_headers()
+            self.wfile.write(out)
+
+    return Handler
+
+
+def start(port=0, delay=0.0):
+    """Start in a daemon thread; returns (server, base_url)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(delay))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
@@ -0,0 +1,92 @@
+# streamlit_app/api_client.py
+# Backend calls for the Streamlit app. Every rerun reuses one keep-alive
+# requests.Session per process, and GETs are cached per token for a few
+# seconds. A write made through post() invalidates that token's cached reads.
+import os
+import time
+
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+
+API_BASE = os.environ.get("API_BASE", "http://localhost:8000").rstrip("/")
+CACHE_TTL = int(os.environ.get("UI_CACHE_TTL", "30"))  # seconds
+LEADERBOARD_TTL = int(os.environ.get("UI_LEADERBOARD_TTL", "60"))
+PHOTO_POLL_TIMEOUT = float(os.environ.get("UI_PHOTO_POLL_TIMEOUT", "90"))  # seconds
+PHOTO_POLL_INTERVAL = 1.0
+
+# write endpoints -> do they also move the (global) leaderboard?
+WRITE_PATHS = {"/entries": True, "/photos/upload": True, "/goals": False}
+
+
+@st.cache_resource
+def session():
+    s = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    s.mount("http://", adapter)
+    s.mount("https://", adapter)
+    return s
+
+
+@st.cache_resource
+def _generations():
+    # token -> counter, part of every cache key; bumping it orphans old entries
+    return {}
+
+
+def invalidate(token):
+    gens = _generations()
+    gens[token] = gens.get(token, 0) + 1
+
+
+def get_json(path, params=None, timeout=30):
+    resp = session().get(API_BASE + path, params=params or {}, timeout=timeout)
+    resp.raise_for_status()
+    return resp.json()
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def _user_get(path, token, params, generation):
+    return get_json(path, dict(params, token=token))
+
+
+def user_get(path, token, **params):
+    """Cached GET of a per-user resource."""
+    return _user_get(path, token, tuple(sorted(params.items())), _generations().get(token, 0))
+
+
+@st.cache_data(ttl=LEADERBOARD_TTL, show_spinner=False)
+def leaderboard(limit=50):
+    return get_json("/leaderboard", {"limit": limit})
+
+
+def post(path, data=None, files=None):
+    """POST form fields (and optional files); invalidates the caller's cached reads."""
+    resp = session().post(API_BASE + path, data=data or {}, files=files, timeout=60 if files else 30)
+    resp.raise_for_status()
+    token = (data or {}).get("token")
+    if token and path in WRITE_PATHS:
+        invalidate(token)
+        if WRITE_PATHS[path]:
+            leaderboard.clear()
+    return resp
+
+
+def post_json(path, payload, timeout=30):
+    return session().post(API_BASE + path, json=payload, timeout=timeout)
+
+
+def wait_photo_job(job, token, timeout=PHOTO_POLL_TIMEOUT):
+    """
+    Poll GET /photos/jobs/{job_id} until the job is done or failed, or until
+    `timeout`; returns the last status. A finished job has added an entry, so
+    the token's cached reads and the leaderboard are invalidated.
+    """
+    deadline = time.monotonic() + timeout
+    while job.get("status") in ("queued", "running") and time.monotonic() < deadline:
+        time.sleep(PHOTO_POLL_INTERVAL)
+        job = get_json(f"/photos/jobs/{job['job_id']}", {"token": token})
+    if job.get("status") == "done":
+        invalidate(token)
+        leaderboard.clear()
+    return job
@@ -1,12 +1,12 @@
 # streamlit_app/app.py
 import streamlit as st
-import requests, os, json, io, base64
+import json, io, base64
 from PIL import Image
 import matplotlib.pyplot as plt
 import pandas as pd
 from datetime import datetime, timedelta
 
-API_BASE = os.environ.get("API_BASE", "http://localhost:8000")
+import api_client as api
 
 st.set_page_config(page_title="CarbonTracker", layout="wide", initial_sidebar_state="expanded")
 
@@ -15,22 +15,10 @@ st.set_page_config(page_title="CarbonTracker", layout="wide", initial_sidebar_st
 # -------------------------------
 def post_form(path: str, form_data: dict = None, files: dict = None):
     """Send a POST to backend where token and other fields are expected as form fields."""
-    url = API_BASE.rstrip("/") + path
-    try:
-        if files:
-            resp = requests.post(url, data=form_data or {}, files=files, timeout=60)
-        else:
-            resp = requests.post(url, data=form_data or {}, timeout=30)
-        resp.raise_for_status()
-        return resp
-    except Exception as e:
-        raise
+    return api.post(path, data=form_data, files=files)
 
 def get_json(path: str, params: dict = None):
-    url = API_BASE.rstrip("/") + path
-    resp = requests.get(url, params=params or {}, timeout=30)
-    resp.raise_for_status()
-    return resp.json()
+    return api.get_json(path, params)
 
 def display_line_chart(dates, values, title=""):
     fig, ax = plt.subplots(figsize=(8,3))
@@ -61,7 +49,7 @@ if mode == "Signup":
         if submitted:
             try:
                 payload = {"first_name": first, "last_name": last, "email": email, "password": pwd}
-                r = requests.post(f"{API_BASE}/signup", json=payload, timeout=30)
+                r = api.post_json("/signup", payload)
                 if r.ok:
                     data = r.json()
                     st.success("Account created — logged in")
@@ -79,7 +67,7 @@ elif mode == "Login":
         submitted = st.form_submit_button("Login")
         if submitted:
             try:
-                r = requests.post(f"{API_BASE}/login", json={"email": email, "password": pwd}, timeout=30)
+                r = api.post_json("/login", {"email": email, "password": pwd})
                 if r.ok:
                     data = r.json()
                     st.success("Logged in")
@@ -110,41 +98,35 @@ if not st.session_state["token"]:
 
 token = st.session_state["token"]
 
-# top navigation tabs
-tabs = st.tabs(["Dashboard","Survey & Prediction","Add Activity","Photo Upload","History","Goals","Leaderboard","AI Assistant"])
-tab_dashboard, tab_survey, tab_add, tab_photo, tab_history, tab_goals, tab_leader, tab_ai = tabs
+# top navigation; st.tabs would run (and fetch for) every tab on each rerun,
+# so only the selected section is rendered
+view = st.radio("Section", ["Dashboard","Survey & Prediction","Add Activity","Photo Upload","History","Goals","Leaderboard","AI Assistant"],
+                horizontal=True, label_visibility="collapsed")
 
 # -------------------------------
 # Dashboard tab (FIXED)
 # -------------------------------
-with tab_dashboard:
+if view == "Dashboard":
     st.header("Dashboard")
 
-    # fetch entries
+    # aggregates are computed server-side from the daily rollups
     try:
-        entries = requests.get(f"{API_BASE}/entries", params={"token": token}, timeout=30).json()
+        summary = api.user_get("/stats/summary", token)
+        daily = pd.DataFrame(api.user_get("/stats/daily", token, days=30))
+        cat = pd.DataFrame(api.user_get("/stats/by_category", token))
     except Exception as e:
         st.error("Could not fetch data: " + str(e))
-        entries = []
+        summary, daily, cat = {}, pd.DataFrame(), pd.DataFrame()
 
-    df = pd.DataFrame(entries)
-
-    if df.empty:
+    if not summary.get("entries"):
         st.info("No activity yet. Add an activity or upload a photo to start tracking.")
     else:
-        # normalize timestamp
-        df["timestamp"] = pd.to_datetime(df["timestamp"])
-        df["date"] = df["timestamp"].dt.date
-
         # ===========================================
         # DAILY EMISSIONS (LINE CHART) — last 30 days
         # ===========================================
-        daily = df.groupby("date")["emissions_kgco2"].sum().reset_index()
-        daily_sorted = daily.sort_values("date")
-        last30 = daily_sorted.tail(30)
-
         fig1, ax1 = plt.subplots()
-        ax1.plot(last30["date"], last30["emissions_kgco2"], marker="o")
+        if not daily.empty:
+            ax1.plot(pd.to_datetime(daily["date"]).dt.date, daily["emissions_kgco2"], marker="o")
         ax1.set_title("Daily CO2 Emissions (Last 30 Days)")
         ax1.set_xlabel("Date")
         ax1.set_ylabel("kg CO2")
@@ -154,11 +136,6 @@ with tab_dashboard:
         # ===========================================
         # CATEGORY BREAKDOWN (BAR CHART)
         # ===========================================
-        # ensure category column exists
-        if "category" not in df.columns:
-            df["category"] = "unknown"
-        cat = df.groupby("category")["emissions_kgco2"].sum().reset_index()
-
         fig2, ax2 = plt.subplots()
         ax2.bar(cat["category"], cat["emissions_kgco2"])
         ax2.set_title("CO2 by Category")
@@ -180,21 +157,19 @@ with tab_dashboard:
         # ===========================================
         # METRIC: Average last 7 days
         # ===========================================
-        if len(daily_sorted) >= 7:
-            avg7 = daily_sorted.tail(7)["emissions_kgco2"].mean()
-            st.metric("Avg daily (last 7 days)", round(avg7, 3))
-        else:
+        avg = summary.get("avg_daily_recent_kgco2")
+        if summary.get("recent_days", 0) >= 7:
+            st.metric("Avg daily (last 7 days)", round(avg, 3))
+        elif avg is not None:
             # show average of available days if some exist
-            if len(daily_sorted) > 0:
-                avg = daily_sorted["emissions_kgco2"].mean()
-                st.metric("Avg daily (available)", round(avg,3))
-            else:
-                st.metric("Avg daily (last 7 days)", "Not enough data")
+            st.metric("Avg daily (available)", round(avg, 3))
+        else:
+            st.metric("Avg daily (last 7 days)", "Not enough data")
 
 # -------------------------------
 # Survey & Prediction tab
 # -------------------------------
-with tab_survey:
+if view == "Survey & Prediction":
     st.header("Detailed Carbon Survey")
     st.write("Fill in your household and lifestyle details for a personalized prediction + AI suggestions.")
     with st.form("survey_form"):
@@ -248,7 +223,7 @@ with tab_survey:
 # -------------------------------
 # Add Activity tab (multiple sub-tabs)
 # -------------------------------
-with tab_add:
+if view == "Add Activity":
     st.header("Add Activity")
     sub = st.tabs(["Transport","Electricity","Food/Waste","Purchase"])
     with sub[0]:
@@ -308,7 +283,7 @@ with tab_add:
 # -------------------------------
 # Photo Upload tab
 # -------------------------------
-with tab_photo:
+if view == "Photo Upload":
     st.header("Photo Upload & Object Detection")
     uploaded = st.file_uploader("Upload a photo (food, receipt, trash, appliance)", type=["jpg","png","jpeg"])
     if uploaded is not None:
@@ -317,21 +292,25 @@ with tab_photo:
             try:
                 files = {"file": (uploaded.name, uploaded.getvalue())}
                 resp = post_form("/photos/upload", form_data={"token": token}, files=files)
-                res = resp.json() if hasattr(resp, "json") else {}
-                est = res.get("estimated_kgco2") or res.get("estimated_kgco2", 0)
-                det = res.get("detection_details") or res.get("detection_details", [])
-                st.success(f"Estimated {est} kgCO2")
-                st.write("Detected:", det)
+                with st.spinner("Analyzing photo..."):
+                    job = api.wait_photo_job(resp.json(), token)
+                if job.get("status") == "done":
+                    st.success(f"Estimated {job.get('estimated_kgco2', 0)} kgCO2")
+                    st.write("Detected:", job.get("detection_details", []))
+                elif job.get("status") == "failed":
+                    st.error("Photo analysis failed: " + str(job.get("error", "unknown error")))
+                else:
+                    st.info(f"Still analyzing (job {job.get('job_id')}); check History shortly.")
             except Exception as e:
                 st.error("Photo analysis failed: " + str(e))
 
 # -------------------------------
 # History
 # -------------------------------
-with tab_history:
+if view == "History":
     st.header("History")
     try:
-        rows = requests.get(f"{API_BASE}/entries", params={"token": token}, timeout=30).json()
+        rows = api.user_get("/entries", token)
     except Exception as e:
         st.error("Could not fetch history: " + str(e))
         rows = []
@@ -347,7 +326,7 @@ with tab_history:
 # -------------------------------
 # Goals
 # -------------------------------
-with tab_goals:
+if view == "Goals":
     st.header("Goals")
     with st.form("create_goal"):
         gtype = st.selectbox("Goal type", ["reduce_percent","absolute_target"])
@@ -379,10 +358,10 @@ with tab_goals:
 # -------------------------------
 # Leaderboard
 # -------------------------------
-with tab_leader:
-    st.header("Leaderboard (Lowest last 7 days)")
+if view == "Leaderboard":
+    st.header("Leaderboard (Lowest last 7 days, top 50)")
     try:
-        board = requests.get(f"{API_BASE}/leaderboard", timeout=30).json()
+        board = api.leaderboard()
     except Exception as e:
         st.error("Could not fetch leaderboard: " + str(e))
         board = []
@@ -390,11 +369,16 @@ with tab_leader:
         st.table(board)
     else:
         st.info("Leaderboard empty")
+    try:
+        mine = api.user_get("/leaderboard/me", token)
+        st.metric("Your rank", f"{mine['me']['rank']} of {mine['total_users']}")
+    except Exception:
+        st.caption("Log an activity to get a rank.")
 
 # -------------------------------
 # AI Assistant
 # -------------------------------
-with tab_ai:
+if view == "AI Assistant":
     st.header("AI Assistant")
     q = st.text_area("Ask the assistant (get suggestions, analysis, or a plan to reduce CO2)", height=150)
     if st.button("Ask AI"):
@@ -0,0 +1,65 @@
+# tests/conftest.py
+# The backend reads its paths from the environment at import time, so point
+# everything at a throwaway directory before anything imports `backend`.
+import atexit, os, shutil, tempfile, uuid
+import pytest
+
+_TMP = tempfile.mkdtemp(prefix="carbon-tests-")
+atexit.register(shutil.rmtree, _TMP, ignore_errors=True)
+os.environ["CARBON_DB_PATH"] = os.path.join(_TMP, "carbon.db")
+os.environ["IMPORT_DIR"] = os.path.join(_TMP, "imports")
+os.environ["UPLOAD_DIR"] = os.path.join(_TMP, "uploads")
+os.environ["PROMPT_CACHE_PATH"] = ""
+# real bcrypt through the process pool, at the cheapest cost factor
+os.environ["BCRYPT_ROUNDS"] = "4"
+os.environ["PASSWORD_WORKERS"] = "2"
+# a private copy, so tests can add factor sets
+FACTOR_SETS_DIR = os.path.join(_TMP, "factor_sets")
+shutil.copytree(os.path.join(os.path.dirname(__file__), "..", "backend", "factor_sets"), FACTOR_SETS_DIR)
+os.environ["FACTOR_SETS_DIR"] = FACTOR_SETS_DIR
+
+from fastapi.testclient import TestClient
+from sqlalchemy import func
+from backend import crud, models
+from backend.database import SessionLocal
+from backend.main import app
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as c:
+        yield c
+
+@pytest.fixture
+def db():
+    s = SessionLocal()
+    try:
+        yield s
+    finally:
+        s.close()
+
+@pytest.fixture
+def make_user(db):
+    """Create a user straight in the DB (skips the bcrypt pool) and return it with a live token."""
+    def make():
+        user = crud.insert_user(db, "Test", "User", f"{uuid.uuid4().hex}@example.com", "x")
+        return crud.issue_token(db, user)
+    return make
+
+@pytest.fixture
+def assert_aggregates_match(db):
+    """Check daily_rollups and user_totals against what a rebuild from entries would produce."""
+    def check():
+        E, R, T = models.Entry, models.DailyRollup, models.UserTotal
+        db.expire_all()
+        day = func.date(E.timestamp)
+        want = db.query(E.user_id, day, E.category, func.sum(E.emissions_kgco2), func.count(E.id)) \
+            .group_by(E.user_id, day, E.category).all()
+        got = db.query(R.user_id, R.day, R.category, R.total_kgco2, R.entry_count).all()
+        assert {(u, str(d), c): (round(t or 0.0, 6), n) for u, d, c, t, n in got} == \
+               {(u, d, c): (round(t or 0.0, 6), n) for u, d, c, t, n in want}
+        want = db.query(E.user_id, E.category, func.sum(E.emissions_kgco2), func.count(E.id),
+                        func.min(E.timestamp), func.max(E.timestamp)).group_by(E.user_id, E.category).all()
+        got = db.query(T.user_id, T.category, T.total_kgco2, T.entry_count, T.first_at, T.last_at).all()
+        assert {(u, c): (round(t or 0.0, 6), n, lo, hi) for u, c, t, n, lo, hi in got} == \
+               {(u, c): (round(t or 0.0, 6), n, lo, hi) for u, c, t, n, lo, hi in want}
+    return check
@@ -0,0 +1,30 @@
+# tests/test_auth.py
+import uuid
+from backend import auth_cache, crud, models, passwords
+
+def test_new_login_invalidates_the_cached_old_token(client, db, make_user):
+    user = make_user()
+    old = user.token
+    assert client.get("/stats/summary", params={"token": old}).status_code == 200
+    assert auth_cache.tokens.get(old) is not None  # the lookup above cached it
+    user = crud.issue_token(db, db.get(models.User, user.id))
+    assert auth_cache.tokens.get(old) is None
+    assert crud.get_user_by_token(db, old) is None
+    assert client.get("/stats/summary", params={"token": old}).status_code == 401
+    assert client.get("/stats/summary", params={"token": user.token}).status_code == 200
+
+def test_signup_and_login_through_the_password_pool(client):
+    email = f"{uuid.uuid4().hex}@example.com"
+    completed = passwords.pool.completed
+    r = client.post("/signup", json={"first_name": "Ada", "last_name": "L", "email": email, "password": "s3cret"})
+    assert r.status_code == 200 and r.json()["email"] == email
+    assert client.post("/signup", json={"first_name": "Ada", "last_name": "L", "email": email, "password": "x"}).status_code == 400
+    first = client.post("/login", json={"email": email, "password": "s3cret"})
+    assert first.status_code == 200
+    assert client.post("/login", json={"email": email, "password": "wrong"}).status_code == 401
+    second = client.post("/login", json={"email": email, "password": "s3cret"})
+    assert second.status_code == 200
+    # signup hash + three verifies, all in the pool
+    assert passwords.pool.completed == completed + 4
+    assert client.get("/stats/summary", params={"token": first.json()["token"]}).status_code == 401
+    assert client.get("/stats/summary", params={"token": second.json()["token"]}).status_code == 200
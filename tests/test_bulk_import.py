@@ -0,0 +1,56 @@
+# tests/test_bulk_import.py
+import json
+import pytest
+from backend import bulk_import, crud, models
+
+def test_parse_chunk_bad_record_fails_only_that_record():
+    records = [json.dumps(i).encode() for i in (
+        {"category": "transport", "details": {"vehicle_type": "bus", "km": None}},
+        {"category": "electricity", "details": {"kwh": 10}},
+    )]
+    rows, errors = bulk_import.parse_chunk("ndjson", None, records)
+    assert [i for i, _ in errors] == [0]
+    assert len(rows) == 1 and rows[0]["emissions"] > 0
+
+def test_running_import_is_not_run_twice(db, make_user, tmp_path):
+    user = make_user()
+    path = tmp_path / "acts.ndjson"
+    path.write_text(json.dumps({"category": "electricity", "details": {"kwh": 10}}) + "\n")
+    job = crud.create_import_job(db, user.id, str(path), "ndjson")
+    # another worker got there first
+    assert crud.claim_import_job(db, job.id, bulk_import._stale_before())
+    assert job.id not in crud.pending_import_job_ids(db, bulk_import._stale_before())
+    status = bulk_import.run_import(job.id, workers=1)
+    assert status["status"] == "running" and status["accepted"] == 0
+
+def _activity_file(tmp_path, n):
+    path = tmp_path / "acts.ndjson"
+    path.write_text("".join(json.dumps({"category": "electricity", "details": {"kwh": i + 1}}) + "\n" for i in range(n)))
+    return str(path)
+
+def _entry_kwh(db, user):
+    rows = db.query(models.Entry.details).filter(models.Entry.user_id == user.id).all()
+    return sorted(json.loads(d)["kwh"] for (d,) in rows)
+
+def test_stopped_import_resumes_without_duplicates(db, make_user, tmp_path):
+    user = make_user()
+    job = crud.create_import_job(db, user.id, _activity_file(tmp_path, 100), "ndjson", source="cli")
+    status = bulk_import.run_import(job.id, workers=1, chunk_rows=10, stop=lambda: True)
+    assert status["status"] == "queued" and 0 < status["accepted"] < 100
+    status = bulk_import.run_import(job.id, workers=1, chunk_rows=10)
+    assert status["status"] == "done" and status["accepted"] == 100
+    assert _entry_kwh(db, user) == list(range(1, 101))
+
+def test_interrupted_import_is_resumable_at_once(db, make_user, tmp_path):
+    user = make_user()
+    job = crud.create_import_job(db, user.id, _activity_file(tmp_path, 100), "ndjson", source="cli")
+
+    def ctrl_c(job):
+        raise KeyboardInterrupt
+    with pytest.raises(KeyboardInterrupt):
+        bulk_import.run_import(job.id, workers=1, chunk_rows=10, progress=ctrl_c)
+    db.refresh(job)
+    assert job.status == "queued" and job.accepted == 10
+    status = bulk_import.run_import(job.id, workers=1, chunk_rows=10)
+    assert status["status"] == "done" and status["accepted"] == 100
+    assert _entry_kwh(db, user) == list(range(1, 101))
@@ -0,0 +1,58 @@
+# tests/test_conditional.py
+import json
+
+def _add_entry(client, user, kwh=5):
+    r = client.post("/entries", data={"token": user.token, "category": "electricity", "details": json.dumps({"kwh": kwh})})
+    assert r.status_code == 200
+
+def test_entries_etag_roundtrip(client, make_user):
+    user = make_user()
+    _add_entry(client, user)
+    first = client.get("/entries", params={"token": user.token})
+    etag = first.headers["ETag"]
+    assert first.status_code == 200 and etag.startswith('W/"')
+    again = client.get("/entries", params={"token": user.token}, headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.headers["ETag"] == etag and again.content == b""
+    # strong form of the same tag, lists and * match too (weak comparison)
+    for inm in (etag.removeprefix("W/"), f'"nope", {etag}', "*"):
+        assert client.get("/entries", params={"token": user.token}, headers={"If-None-Match": inm}).status_code == 304
+    # another representation of the same data has its own tag
+    page = client.get("/entries", params={"token": user.token, "limit": 1})
+    assert page.headers["ETag"] != etag
+
+def test_write_invalidates_entries_and_goals(client, make_user):
+    user = make_user()
+    _add_entry(client, user)
+    entries_tag = client.get("/entries", params={"token": user.token}).headers["ETag"]
+    goals_tag = client.get("/goals", params={"token": user.token}).headers["ETag"]
+    r = client.post("/goals", data={"token": user.token, "type": "reduce_percent", "params": json.dumps({"target_percent": 10})})
+    assert r.status_code == 200
+    goals = client.get("/goals", params={"token": user.token}, headers={"If-None-Match": goals_tag})
+    assert goals.status_code == 200 and len(goals.json()) == 1
+    _add_entry(client, user, kwh=7)
+    entries = client.get("/entries", params={"token": user.token}, headers={"If-None-Match": entries_tag})
+    assert entries.status_code == 200 and len(entries.json()) == 2
+
+def test_other_users_writes_do_not_invalidate(client, make_user):
+    user, other = make_user(), make_user()
+    _add_entry(client, user)
+    tag = client.get("/entries", params={"token": user.token}).headers["ETag"]
+    _add_entry(client, other)
+    assert client.get("/entries", params={"token": user.token}, headers={"If-None-Match": tag}).status_code == 304
+
+def test_if_modified_since(client, make_user):
+    user = make_user()
+    _add_entry(client, user)
+    last_modified = client.get("/entries", params={"token": user.token}).headers["Last-Modified"]
+    r = client.get("/entries", params={"token": user.token}, headers={"If-Modified-Since": last_modified})
+    assert r.status_code == 304
+    r = client.get("/entries", params={"token": user.token}, headers={"If-Modified-Since": "Thu, 01 Jan 2015 00:00:00 GMT"})
+    assert r.status_code == 200
+
+def test_leaderboard_etag_follows_any_entry(client, make_user):
+    user = make_user()
+    _add_entry(client, user)
+    tag = client.get("/leaderboard").headers["ETag"]
+    assert client.get("/leaderboard", headers={"If-None-Match": tag}).status_code == 304
+    _add_entry(client, make_user())
+    assert client.get("/leaderboard", headers={"If-None-Match": tag}).status_code == 200
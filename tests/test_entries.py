@@ -0,0 +1,49 @@
+# tests/test_entries.py
+from datetime import datetime, timedelta
+from backend import crud
+
+def _seed(db, user, n=53):
+    base = datetime(2026, 1, 1, 12, 0)
+    # every third timestamp is shared, so pages split runs of equal timestamps
+    rows = [{"category": ("waste", "electricity")[i % 2], "details": {"kg": i}, "emissions": float(i),
+             "timestamp": base + timedelta(minutes=i // 3)} for i in range(n)]
+    crud.add_entries_bulk(db, user.id, rows)
+    db.commit()
+
+def _walk(client, user, limit, **params):
+    ids, cursor, pages = [], None, 0
+    while True:
+        q = dict(params, token=user.token, limit=limit, fields="id,timestamp")
+        if cursor:
+            q["cursor"] = cursor
+        r = client.get("/entries", params=q)
+        assert r.status_code == 200
+        ids += [e["id"] for e in r.json()]
+        pages += 1
+        assert pages <= 1000, "cursor never ran out"
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            return ids, pages
+
+def test_cursor_pages_cover_everything_once(client, db, make_user):
+    user = make_user()
+    _seed(db, user)
+    everything = [e["id"] for e in client.get("/entries", params={"token": user.token, "fields": "id"}).json()]
+    assert len(everything) == 53
+    for limit in (1, 7, 53, 100):
+        ids, pages = _walk(client, user, limit)
+        assert ids == everything
+        assert pages == max(1, -(-53 // limit))
+
+def test_cursor_pages_with_filters(client, db, make_user):
+    user = make_user()
+    _seed(db, user)
+    params = {"category": "waste", "since": "2026-01-01T12:03:00", "until": "2026-01-01T12:15:00"}
+    everything = [e["id"] for e in client.get("/entries", params=dict(params, token=user.token, fields="id")).json()]
+    assert everything
+    assert _walk(client, user, 4, **params)[0] == everything
+
+def test_invalid_cursor_is_rejected(client, make_user):
+    user = make_user()
+    r = client.get("/entries", params={"token": user.token, "limit": 5, "cursor": "not-a-cursor"})
+    assert r.status_code == 400
@@ -0,0 +1,58 @@
+# tests/test_export.py
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+from backend import crud, models
+
+N = 1250  # more than one yield_per batch (EXPORT_BATCH_SIZE) and several output chunks
+
+def _seed(db, user, n=N):
+    base = datetime(2025, 1, 1)
+    kinds = [
+        ("transport", lambda i: {"vehicle_type": ("bus", "car_petrol")[i % 2], "km": i / 4, "passengers": i % 3 + 1}),
+        ("electricity", lambda i: {"kwh": i}),
+        ("waste", lambda i: {"kg": "1.5", "note": f"bag {i}"}),
+    ]
+    rows = []
+    for i in range(n):
+        category, details = kinds[i % 3]
+        rows.append({"category": category, "details": details(i), "emissions": i / 10,
+                     "timestamp": base + timedelta(minutes=i // 2)})
+    crud.add_entries_bulk(db, user.id, rows)
+    db.commit()
+
+def _listed(client, user):
+    fields = ",".join(crud.ENTRY_FIELDS + tuple(models.DETAIL_COLUMNS))
+    r = client.get("/entries", params={"token": user.token, "fields": fields})
+    assert r.status_code == 200
+    return r.json()[::-1]  # export is oldest first
+
+def _check(exported, listed):
+    assert len(exported) == len(listed) == N
+    for got, want in zip(exported, listed):
+        assert (got["id"], got["timestamp"], got["category"], got["details"]) == \
+               (want["id"], want["timestamp"], want["category"], want["details"])
+        assert float(got["emissions_kgco2"]) == want["emissions_kgco2"]
+        # the typed columns are derived from details, so they must agree
+        assert models.detail_columns(got["details"]) == {c: want[c] for c in models.DETAIL_COLUMNS}
+
+def test_ndjson_export_matches_entries(client, db, make_user):
+    user, other = make_user(), make_user()
+    _seed(db, user)
+    _seed(db, other, 10)
+    r = client.get("/entries/export", params={"token": user.token, "format": "ndjson"})
+    assert r.status_code == 200 and r.headers["content-type"].startswith("application/x-ndjson")
+    exported = [json.loads(line) for line in r.text.splitlines()]
+    _check(exported, _listed(client, user))
+
+def test_csv_export_matches_entries(client, db, make_user):
+    user, other = make_user(), make_user()
+    _seed(db, user)
+    _seed(db, other, 10)
+    r = client.get("/entries/export", params={"token": user.token, "format": "csv"})
+    assert r.status_code == 200 and r.headers["content-type"].startswith("text/csv")
+    exported = list(csv.DictReader(io.StringIO(r.text)))
+    for row in exported:
+        row["details"] = json.loads(row["details"])
+    _check(exported, _listed(client, user))
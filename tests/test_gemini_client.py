@@ -0,0 +1,87 @@
+# tests/test_gemini_client.py
+import asyncio
+import time
+import httpx
+import pytest
+from backend.gemini_client import GeminiClient, GeminiError
+
+def _ok(text="hi"):
+    return httpx.Response(200, json={"candidates": [{"content": {"parts": [{"text": text}]}}]})
+
+def _client(handler, **kw):
+    kw.setdefault("backoff", 0)
+    return GeminiClient(api_key="k", base_url="http://gemini.test", transport=httpx.MockTransport(handler), **kw)
+
+def _run(client, coro):
+    async def go():
+        try:
+            return await coro
+        finally:
+            await client.aclose()
+    return asyncio.run(go())
+
+def test_retries_5xx_then_succeeds():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(503) if len(calls) == 1 else _ok("second try")
+    c = _client(handler)
+    text, _ = _run(c, c.generate_text("hello"))
+    assert text == "second try" and len(calls) == 2
+
+def test_gives_up_after_retries():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(429, text="slow down")
+    c = _client(handler, retries=2)
+    with pytest.raises(GeminiError, match="slow down"):
+        _run(c, c.generate_text("hello"))
+    assert len(calls) == 3
+
+def test_client_errors_are_not_retried():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(400, text="bad request")
+    c = _client(handler)
+    with pytest.raises(GeminiError, match="bad request"):
+        _run(c, c.generate_text("hello"))
+    assert len(calls) == 1
+
+def test_deadline_raises_instead_of_hanging():
+    async def handler(request):
+        await asyncio.sleep(30)
+        return _ok()
+    c = _client(handler)
+    t = time.perf_counter()
+    with pytest.raises(asyncio.TimeoutError):
+        _run(c, c.generate_text("hello", deadline=0.1))
+    assert time.perf_counter() - t < 5
+
+def test_in_flight_requests_are_capped():
+    active, peak = 0, 0
+
+    async def handler(request):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.02)
+        active -= 1
+        return _ok()
+    c = _client(handler, max_in_flight=2)
+
+    async def many():
+        return await asyncio.gather(*(c.generate_text(str(i)) for i in range(8)))
+    assert [t for t, _ in _run(c, many())] == ["hi"] * 8
+    assert peak == 2
+
+def test_new_event_loop_closes_the_old_pool():
+    c = _client(lambda request: _ok())
+    asyncio.run(c.generate_text("first"))
+    first = c._http
+    _run(c, c.generate_text("second"))
+    assert first.is_closed and c._http is None
@@ -0,0 +1,20 @@
+# tests/test_ingest.py
+import json
+
+def _ndjson(items):
+    return "\n".join(json.dumps(i) for i in items)
+
+def test_bulk_bad_detail_value_fails_only_that_row(client, make_user):
+    user = make_user()
+    body = _ndjson([
+        {"category": "transport", "details": {"vehicle_type": "bus", "km": "abc"}},
+        {"category": "transport", "details": {"vehicle_type": "bus", "km": 3}},
+        {"category": "transport", "details": {"vehicle_type": "car_petrol", "km": 3, "passengers": None}},
+    ])
+    r = client.post("/entries/bulk", params={"token": user.token}, content=body)
+    assert r.status_code == 200
+    out = r.json()
+    assert out["inserted"] == 1 and out["failed"] == 2
+    results = {res["index"]: res for res in out["results"]}
+    assert "error" in results[0] and "error" in results[2]
+    assert results[1]["entry_id"] and results[1]["emissions_kgco2"] > 0
@@ -0,0 +1,34 @@
+# tests/test_jobs.py
+import json
+from datetime import datetime, timedelta
+from backend import crud, jobs, models
+
+def _job(db, make_user):
+    user = make_user()
+    return crud.create_photo_job(db, user.id, "/tmp/photo.jpg", "ab" * 32, "image/jpeg")
+
+def test_only_one_worker_claims_a_job(db, make_user):
+    job = _job(db, make_user)
+    assert crud.claim_photo_job(db, job.id, jobs._stale_before())
+    assert not crud.claim_photo_job(db, job.id, jobs._stale_before())
+    db.refresh(job)
+    assert job.status == "running" and job.attempts == 1
+
+def test_stale_running_job_is_requeued(db, make_user):
+    job = _job(db, make_user)
+    crud.claim_photo_job(db, job.id, jobs._stale_before())
+    assert job.id not in crud.pending_photo_job_ids(db, jobs._stale_before())
+    later = datetime.utcnow() + timedelta(seconds=1)
+    assert job.id in crud.pending_photo_job_ids(db, later)
+    assert crud.claim_photo_job(db, job.id, later)
+
+def test_persist_writes_photo_entry_and_job_together(db, make_user):
+    job = _job(db, make_user)
+    claimed = jobs._claim_job(db, job.id)
+    jobs._persist(db, claimed, [{"label": "apple", "confidence": 0.9}], reused=False)
+    db.expire_all()
+    done = db.get(models.PhotoJob, job.id)
+    assert done.status == "done"
+    assert json.loads(done.result)["photo_id"] == done.photo_id
+    assert db.query(models.Photo).filter(models.Photo.user_id == job.user_id).count() == 1
+    assert db.query(models.Entry).filter(models.Entry.user_id == job.user_id).count() == 1
@@ -0,0 +1,21 @@
+# tests/test_labels.py
+import pytest
+from backend import labels
+
+VOCAB = {name: {"category": "food", "kg": 0.1, "factor_key": "avg_meal_kgco2"}
+         for name in ("cookie", "pie", "smoothie", "brownie", "cake", "berry", "candy")}
+
+@pytest.fixture(scope="module")
+def matcher():
+    return labels.LabelMatcher(VOCAB)
+
+@pytest.mark.parametrize("plural, label", [
+    ("cookies", "cookie"), ("pies", "pie"), ("smoothies", "smoothie"), ("Brownies", "brownie"),
+    ("berries", "berry"), ("candies", "candy"), ("cakes", "cake"),
+])
+def test_plurals_resolve_to_their_singular(matcher, plural, label):
+    match = matcher.resolve(plural)
+    assert match is not None and match.label == label and match.score == 1.0
+
+def test_ies_singular_without_vocabulary_keeps_ie():
+    assert labels.tokens("cookies pies") == ["cookie", "pie"]
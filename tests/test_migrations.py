@@ -0,0 +1,38 @@
+# tests/test_migrations.py
+from datetime import datetime
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import Session
+from backend import migrations, models
+from backend.database import Base
+
+def _engine(tmp_path):
+    return create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+
+def test_upgrade_backfills_new_aggregate_tables(tmp_path):
+    engine = _engine(tmp_path)
+    Base.metadata.create_all(bind=engine)
+    with Session(bind=engine) as db:
+        db.add(models.User(id="u1", first_name="A", last_name="B", email="a@example.com", password_hash="x"))
+        db.add(models.Entry(id="e1", user_id="u1", category="waste", details="{}", emissions_kgco2=2.5, timestamp=datetime.utcnow()))
+        db.commit()
+    # a file from before the rollup tables existed
+    models.DailyRollup.__table__.drop(engine)
+    models.UserTotal.__table__.drop(engine)
+    migrations.upgrade(engine)
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT total_kgco2, entry_count FROM daily_rollups")).all() == [(2.5, 1)]
+        assert conn.execute(text("SELECT total_kgco2, entry_count FROM user_totals")).all() == [(2.5, 1)]
+
+def test_add_missing_columns_tolerates_a_concurrent_upgrade(tmp_path, monkeypatch):
+    engine = _engine(tmp_path)
+    Base.metadata.create_all(bind=engine)
+    real = inspect(engine)
+
+    class Stale:
+        # what a second worker saw just before the first one added the column
+        def get_columns(self, name):
+            return [c for c in real.get_columns(name) if c["name"] != "factor_version"]
+
+    monkeypatch.setattr(migrations, "inspect", lambda _engine: Stale())
+    migrations._add_missing_columns(engine, models.Entry.__table__)
+    assert "factor_version" in {c["name"] for c in inspect(engine).get_columns("entries")}
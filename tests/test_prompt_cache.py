@@ -0,0 +1,38 @@
+# tests/test_prompt_cache.py
+import time
+from backend.prompt_cache import PromptCache, make_key
+
+def test_entries_expire_after_ttl(tmp_path):
+    cache = PromptCache(path=str(tmp_path / "cache.db"), ttl=0.05)
+    cache.set("k", {"content": "old"})
+    assert cache.get("k") == {"content": "old"}
+    time.sleep(0.1)
+    # expired in both tiers, not just memory
+    assert cache.get("k") is None
+    assert cache._db().execute("SELECT COUNT(*) FROM prompt_cache").fetchone() == (0,)
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = PromptCache(path="", max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # a is now the most recent
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.stats()["evictions"] == 1 and cache.stats()["memory_entries"] == 2
+
+def test_disk_tier_serves_after_memory_is_lost(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = PromptCache(path=path)
+    cache.set("k", {"content": "answer"})
+    cache._mem.clear()
+    assert cache.get("k") == {"content": "answer"}
+    assert cache.stats()["hits_disk"] == 1
+    # a fresh process finds it too
+    assert PromptCache(path=path).get("k") == {"content": "answer"}
+
+def test_key_covers_context_not_formatting():
+    assert make_key("How am I doing?", "total: 10 kg") == make_key("  how am I   doing? ", "total: 10 kg")
+    assert make_key("How am I doing?", "total: 10 kg") != make_key("How am I doing?", "total: 11 kg")
+    assert make_key("How am I doing?", "user a") != make_key("How am I doing?", "user b")
+    assert make_key("How am I doing?") != make_key("How am I doing?", "total: 10 kg")
@@ -0,0 +1,58 @@
+# tests/test_ranking.py
+from backend import crud, ranking
+
+def _expected(db):
+    rows = crud.leaderboard_totals(db, crud.leaderboard_cutoff())
+    return sorted((round(t or 0.0, 4), uid) for uid, _, _, t in rows)
+
+def _ranked(board):
+    return [(r["last7_kgco2"], r["user_id"]) for r in board.page()]
+
+def _entry(db, user, kg):
+    crud.create_entry(db, user.id, "waste", {"kg": kg}, kg)
+
+def test_board_follows_writes_through_data_versions(db, make_user):
+    a, b, c = make_user(), make_user(), make_user()
+    for user, kg in ((a, 3.0), (b, 1.0), (c, 2.0)):
+        _entry(db, user, kg)
+    board = ranking.RankedBoard()
+    board.sync(db)
+    assert _ranked(board) == _expected(db)
+    # incremental: only the users whose scope moved are re-read
+    _entry(db, b, 5.0)
+    board.sync(db)
+    assert _ranked(board) == _expected(db)
+    assert board.around(b.id, 0)["me"]["last7_kgco2"] == 6.0
+    # a whole-table rebuild forces a full reload
+    crud.rebuild_daily_rollups(db)
+    _entry(db, a, 0.5)
+    board.sync(db)
+    assert _ranked(board) == _expected(db)
+
+def test_ties_share_a_rank_and_around_has_neighbours(db, make_user):
+    users = [make_user() for _ in range(4)]
+    for user, kg in zip(users, (1000.25, 1000.25, 1000.5, 1000.75)):
+        _entry(db, user, kg)
+    board = ranking.RankedBoard()
+    board.sync(db)
+    first, second = board.around(users[0].id, 0)["me"], board.around(users[1].id, 0)["me"]
+    assert first["rank"] == second["rank"]
+    me = board.around(users[2].id, 1)
+    assert me["me"]["rank"] == first["rank"] + 2
+    assert [r["user_id"] for r in me["below"]] == [users[3].id]
+    assert len(me["above"]) == 1 and me["above"][0]["last7_kgco2"] == 1000.25
+
+def test_leaderboard_pages_and_me(client, db, make_user):
+    user = make_user()
+    assert client.get("/leaderboard/me", params={"token": user.token}).status_code == 404
+    _entry(db, user, 0.125)
+    full = client.get("/leaderboard")
+    total = int(full.headers["X-Total-Count"])
+    assert len(full.json()) == total
+    paged = []
+    for offset in range(0, total, 3):
+        paged += client.get("/leaderboard", params={"limit": 3, "offset": offset}).json()
+    assert paged == full.json()
+    assert client.get("/leaderboard", params={"limit": 2}).json() == full.json()[:2]
+    me = client.get("/leaderboard/me", params={"token": user.token, "neighbours": 1}).json()
+    assert me["me"]["user_id"] == user.id and me["total_users"] == total
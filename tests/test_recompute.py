@@ -0,0 +1,85 @@
+# tests/test_recompute.py
+import json
+import os
+from datetime import datetime
+import pytest
+from backend import crud, factors, ingest, models, recompute, utils
+from conftest import FACTOR_SETS_DIR
+
+BASE_SET = os.path.join(FACTOR_SETS_DIR, "global-2020-01-01.json")
+
+@pytest.fixture
+def add_newer_factor_set():
+    """Installs a global set from 2025 with doubled electricity; removed (and re-priced back) afterwards."""
+    path = os.path.join(FACTOR_SETS_DIR, "global-2025-01-01.json")
+
+    def add():
+        with open(BASE_SET) as f:
+            raw = json.load(f)
+        raw["effective_from"] = "2025-01-01"
+        raw["factors"]["electricity_kgco2_per_kwh"] *= 2
+        with open(path, "w") as f:
+            json.dump(raw, f)
+        factors.registry.reload()
+        return factors.registry.table_for(datetime(2025, 6, 1))
+    yield add
+    if os.path.exists(path):
+        os.unlink(path)
+        factors.registry.reload()
+        recompute.run()
+
+def _seed(db, user):
+    rows = [
+        {"category": "electricity", "details": {"kwh": 10}, "timestamp": datetime(2024, 12, 31, 23)},
+        {"category": "electricity", "details": {"kwh": 10}, "timestamp": datetime(2025, 6, 1)},
+        {"category": "electricity", "details": {"kwh": 4}, "timestamp": datetime(2025, 6, 1, 8)},
+        {"category": "transport", "details": {"vehicle_type": "bus", "km": 10}, "timestamp": datetime(2025, 6, 2)},
+        {"category": "electricity", "details": {"kwh": 10}, "timestamp": datetime(2025, 6, 3), "emissions": 99.0},
+    ]
+    for r in rows:
+        r.setdefault("emissions", None)
+        ingest.price_row(r)
+    crud.add_entries_bulk(db, user.id, rows)
+    db.commit()
+
+def _entries(db, user):
+    E = models.Entry
+    db.expire_all()
+    return db.query(E.timestamp, E.category, E.details, E.emissions_kgco2, E.factor_version) \
+        .filter(E.user_id == user.id).order_by(E.timestamp).all()
+
+def test_new_factor_set_reprices_covered_entries(db, make_user, add_newer_factor_set, assert_aggregates_match):
+    user = make_user()
+    _seed(db, user)
+    old_table = factors.registry.table_for(datetime(2024, 12, 31))
+    version_before, _ = crud.get_data_version(db, crud.user_scope(user.id))
+    newer = add_newer_factor_set()
+    assert newer.version != old_table.version
+    recompute.run()
+    for ts, category, details, emissions, version in _entries(db, user):
+        if emissions == 99.0:
+            assert version == factors.MANUAL_VERSION
+            continue
+        table = newer if ts >= datetime(2025, 1, 1) else old_table
+        assert version == table.version
+        assert emissions == pytest.approx(utils.calc_entry_emissions(category, json.loads(details), table))
+    assert crud.get_data_version(db, crud.user_scope(user.id))[0] > version_before
+    assert_aggregates_match()
+
+def test_reprice_deltas_move_aggregates(db, make_user, assert_aggregates_match):
+    user = make_user()
+    ts = datetime(2025, 3, 1, 10)
+    crud.add_entries_bulk(db, user.id, [{"category": "waste", "details": {}, "emissions": e, "timestamp": ts} for e in (1.0, 2.0)])
+    db.commit()
+    ids = [i for (i,) in db.query(models.Entry.id).filter(models.Entry.user_id == user.id).order_by(models.Entry.emissions_kgco2)]
+    changed = crud.reprice_entries(db, [
+        {"id": ids[0], "user_id": user.id, "timestamp": ts, "category": "waste", "old": 1.0, "new": 1.5, "factor_version": "v2"},
+        {"id": ids[1], "user_id": user.id, "timestamp": ts, "category": "waste", "old": 2.0, "new": 2.0, "factor_version": "v2"},
+    ])
+    db.commit()
+    assert changed == 1
+    rollup = db.get(models.DailyRollup, (user.id, ts.date(), "waste"))
+    assert (rollup.total_kgco2, rollup.entry_count) == (3.5, 2)
+    total = db.get(models.UserTotal, (user.id, "waste"))
+    assert (total.total_kgco2, total.entry_count) == (3.5, 2)
+    assert_aggregates_match()
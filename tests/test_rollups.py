@@ -0,0 +1,46 @@
+# tests/test_rollups.py
+import json
+from datetime import datetime, timedelta
+from backend import crud, models
+
+def _post_entry(client, user, category, details):
+    r = client.post("/entries", data={"token": user.token, "category": category, "details": json.dumps(details)})
+    assert r.status_code == 200
+    return r.json()
+
+def test_single_and_bulk_writes_keep_aggregates_in_step(client, make_user, assert_aggregates_match):
+    user = make_user()
+    _post_entry(client, user, "electricity", {"kwh": 12})
+    _post_entry(client, user, "transport", {"vehicle_type": "bus", "km": 7})
+    now = datetime.utcnow()
+    body = "\n".join(json.dumps(a) for a in [
+        {"category": "waste", "details": {"kg": 3}, "timestamp": (now - timedelta(days=2)).isoformat()},
+        {"category": "waste", "details": {"kg": 1}, "timestamp": (now - timedelta(days=2, hours=1)).isoformat()},
+        {"category": "transport", "details": {"vehicle_type": "train", "km": 40}, "timestamp": (now - timedelta(days=30)).isoformat()},
+        {"category": "purchase", "details": {}, "emissions_kgco2": 4.5},
+    ])
+    assert client.post("/entries/bulk", params={"token": user.token}, content=body).json()["inserted"] == 4
+    assert_aggregates_match()
+
+def test_rebuild_reproduces_maintained_aggregates(client, db, make_user, assert_aggregates_match):
+    user = make_user()
+    _post_entry(client, user, "waste", {"kg": 2})
+    before = sorted(db.query(models.DailyRollup.user_id, models.DailyRollup.day, models.DailyRollup.category,
+                             models.DailyRollup.total_kgco2, models.DailyRollup.entry_count).all())
+    crud.rebuild_daily_rollups(db)
+    crud.rebuild_user_totals(db)
+    after = sorted(db.query(models.DailyRollup.user_id, models.DailyRollup.day, models.DailyRollup.category,
+                            models.DailyRollup.total_kgco2, models.DailyRollup.entry_count).all())
+    assert [r[:3] + (round(r[3], 6), r[4]) for r in before] == [r[:3] + (round(r[3], 6), r[4]) for r in after]
+    assert_aggregates_match()
+
+def test_leaderboard_window_is_seven_calendar_days(db, make_user):
+    user = make_user()
+    now = datetime(2026, 3, 10, 9, 30)
+    assert crud.leaderboard_cutoff(now) == datetime(2026, 3, 4).date()
+    rows = [{"category": "waste", "details": {}, "emissions": e, "timestamp": now - timedelta(days=d)}
+            for d, e in ((0, 1.0), (6, 2.0), (7, 4.0))]
+    crud.add_entries_bulk(db, user.id, rows)
+    db.commit()
+    [(_, _, _, total)] = crud.leaderboard_totals(db, crud.leaderboard_cutoff(now), [user.id])
+    assert total == 3.0
@@ -0,0 +1,103 @@
+# tests/test_stats.py
+from collections import defaultdict
+from datetime import datetime, timedelta
+import pytest
+from backend import crud
+
+def _seed(db, user):
+    now = datetime.utcnow()
+    kinds = [
+        ("transport", lambda i: {"vehicle_type": ("bus", "car_petrol", "train")[i % 3], "km": i + 0.5}),
+        ("electricity", lambda i: {"kwh": i}),
+        ("food", lambda i: {"meal": "avg"}),
+    ]
+    rows = []
+    # 45 days back, several entries on some days and none on others
+    for i in range(120):
+        category, details = kinds[i % 3]
+        rows.append({"category": category, "details": details(i), "emissions": round(0.37 * (i % 17) + 0.1, 4),
+                     "timestamp": now - timedelta(days=(i * 7) % 45, minutes=i)})
+    crud.add_entries_bulk(db, user.id, rows)
+    db.commit()
+
+def _entries(client, user):
+    r = client.get("/entries", params={"token": user.token, "fields": "timestamp,category,emissions_kgco2,vehicle_type,km"})
+    assert r.status_code == 200
+    out = r.json()
+    for e in out:
+        e["day"] = datetime.fromisoformat(e["timestamp"]).date()
+    return out
+
+def _get(client, path, user, **params):
+    r = client.get(path, params=dict(params, token=user.token))
+    assert r.status_code == 200
+    return r.json()
+
+def test_daily_matches_entries(client, db, make_user):
+    user = make_user()
+    _seed(db, user)
+    days = 30
+    cutoff = datetime.utcnow().date() - timedelta(days=days - 1)
+    want = defaultdict(lambda: [0.0, 0])
+    for e in _entries(client, user):
+        if e["day"] >= cutoff:
+            want[e["day"].isoformat()][0] += e["emissions_kgco2"]
+            want[e["day"].isoformat()][1] += 1
+    got = _get(client, "/stats/daily", user, days=days)
+    assert [g["date"] for g in got] == sorted(want)
+    for g in got:
+        assert (g["emissions_kgco2"], g["entries"]) == (pytest.approx(want[g["date"]][0]), want[g["date"]][1])
+
+@pytest.mark.parametrize("since_days", [None, 10])
+def test_by_category_matches_entries(client, db, make_user, since_days):
+    user = make_user()
+    _seed(db, user)
+    params, since = {}, None
+    if since_days:
+        since = datetime.utcnow().date() - timedelta(days=since_days)
+        params["since"] = since.isoformat()
+    want = defaultdict(lambda: [0.0, 0])
+    for e in _entries(client, user):
+        if since is None or e["day"] >= since:
+            want[e["category"]][0] += e["emissions_kgco2"]
+            want[e["category"]][1] += 1
+    got = _get(client, "/stats/by_category", user, **params)
+    assert {g["category"]: (g["emissions_kgco2"], g["entries"]) for g in got} == \
+           {c: (pytest.approx(t), n) for c, (t, n) in want.items()}
+
+def test_by_vehicle_matches_entries(client, db, make_user):
+    user = make_user()
+    _seed(db, user)
+    want = defaultdict(lambda: [0.0, 0.0, 0])
+    for e in _entries(client, user):
+        if e["category"] == "transport":
+            w = want[e["vehicle_type"]]
+            w[0] += e["km"]; w[1] += e["emissions_kgco2"]; w[2] += 1
+    got = _get(client, "/stats/by_vehicle", user)
+    assert {g["vehicle_type"]: (g["km"], g["emissions_kgco2"], g["trips"]) for g in got} == \
+           {v: (pytest.approx(km), pytest.approx(t), n) for v, (km, t, n) in want.items()}
+
+def test_summary_matches_entries(client, db, make_user):
+    user = make_user()
+    _seed(db, user)
+    entries = _entries(client, user)
+    per_day = defaultdict(float)
+    for e in entries:
+        per_day[e["day"]] += e["emissions_kgco2"]
+    recent = [per_day[d] for d in sorted(per_day, reverse=True)[:7]]
+    got = _get(client, "/stats/summary", user)
+    assert got == {
+        "total_kgco2": pytest.approx(sum(e["emissions_kgco2"] for e in entries)),
+        "entries": len(entries),
+        "days_with_data": len(per_day),
+        "avg_daily_recent_kgco2": pytest.approx(sum(recent) / len(recent), abs=1e-4),
+        "recent_days": len(recent),
+    }
+
+def test_stats_of_a_user_without_entries(client, make_user):
+    user = make_user()
+    assert _get(client, "/stats/daily", user) == []
+    assert _get(client, "/stats/by_category", user) == []
+    assert _get(client, "/stats/summary", user) == {
+        "total_kgco2": 0.0, "entries": 0, "days_with_data": 0, "avg_daily_recent_kgco2": None, "recent_days": 0,
+    }
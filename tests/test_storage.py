@@ -0,0 +1,12 @@
+# tests/test_storage.py
+from backend import storage
+
+def test_edited_record_is_logged_and_survives_reopen(tmp_path):
+    entries = storage.Collection("entries", data_dir=tmp_path)
+    entries.put({"entry_id": "e1", "user_id": "u1", "emissions_kgco2": 0.0691})
+    recs = entries.all()
+    recs[0]["emissions_kgco2"] = 1.5
+    entries.replace_all(recs)
+    reopened = storage.Collection("entries", data_dir=tmp_path)
+    assert reopened.get("e1")["emissions_kgco2"] == 1.5
+    assert reopened.for_user("u1")[0]["emissions_kgco2"] == 1.5
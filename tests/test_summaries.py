@@ -0,0 +1,62 @@
+# tests/test_summaries.py
+from collections import defaultdict
+from datetime import datetime, timedelta
+import pytest
+from backend import crud, summaries
+
+def _seed(db, user):
+    now = datetime.utcnow()
+    rows = [{"category": ("transport", "electricity", "waste")[i % 3], "details": {"kg": i},
+             "emissions": round(0.23 * i + 0.05, 4), "timestamp": now - timedelta(days=i % 40, minutes=i)}
+            for i in range(90)]
+    crud.add_entries_bulk(db, user.id, rows)
+    db.commit()
+
+def _expected(client, user):
+    r = client.get("/entries", params={"token": user.token, "fields": "timestamp,category,emissions_kgco2"})
+    assert r.status_code == 200
+    entries = r.json()
+    today = datetime.utcnow().date()
+    by_category = defaultdict(float)
+    windows = defaultdict(float)
+    for e in entries:
+        by_category[e["category"]] += e["emissions_kgco2"]
+        age = (today - datetime.fromisoformat(e["timestamp"]).date()).days
+        for name, lo, hi in (("last_7d_kgco2", 0, 7), ("prev_7d_kgco2", 7, 14), ("last_30d_kgco2", 0, 30)):
+            if lo <= age < hi:
+                windows[name] += e["emissions_kgco2"]
+    stamps = sorted(e["timestamp"] for e in entries)
+    return {
+        "entries": len(entries),
+        "total_kgco2": pytest.approx(sum(by_category.values())),
+        "by_category": {c: pytest.approx(t) for c, t in by_category.items()},
+        **{k: pytest.approx(v) for k, v in windows.items()},
+        "first_entry_at": stamps[0] if stamps else None,
+        "last_entry_at": stamps[-1] if stamps else None,
+    }
+
+def test_summary_matches_entries(client, db, make_user):
+    user = make_user()
+    _seed(db, user)
+    got = summaries.cache.get(db, user.id)
+    want = _expected(client, user)
+    assert {k: got[k] for k in want} == want
+    prev7 = got["prev_7d_kgco2"]
+    assert got["trend_pct"] == pytest.approx(round((got["last_7d_kgco2"] - prev7) / prev7 * 100, 1))
+
+def test_summary_follows_writes(client, db, make_user):
+    user = make_user()
+    _seed(db, user)
+    before = summaries.cache.get(db, user.id)
+    line = summaries.context_line(user, before)
+    hits = summaries.cache.hits
+    assert summaries.cache.get(db, user.id) == before and summaries.cache.hits == hits + 1
+    r = client.post("/entries", data={"token": user.token, "category": "waste", "details": '{"kg": 3}'})
+    assert r.status_code == 200
+    db.expire_all()
+    after = summaries.cache.get(db, user.id)
+    assert after["entries"] == before["entries"] + 1
+    assert after["by_category"]["waste"] == pytest.approx(before["by_category"]["waste"] + r.json()["emissions_kgco2"], abs=1e-4)
+    want = _expected(client, user)
+    assert {k: after[k] for k in want} == want
+    assert summaries.context_line(user, after) != line
@@ -0,0 +1,58 @@
+# tests/test_vectorized.py
+import numpy as np
+import pytest
+from backend import utils, vectorized
+
+CASES = [
+    ("transport", {"vehicle_type": "car_petrol", "km": 12.5, "passengers": 2}),
+    ("transport", {"vehicle_type": "car_petrol", "km": 12.5, "passengers": 0}),
+    ("transport", {"vehicle_type": "car_petrol", "km": 12.5, "passengers": -3}),
+    ("transport", {"vehicle_type": "car_petrol", "km": "8", "passengers": "3"}),
+    ("transport", {"vehicle_type": "car_petrol", "km": 12.5, "passengers": 2.9}),
+    ("transport", {"vehicle_type": "car_petrol", "km": 20, "fuel_liters": 1.5}),
+    ("transport", {"vehicle_type": "car_petrol", "km": 20, "fuel_liters": "0"}),
+    ("transport", {"vehicle_type": "car_petrol", "km": 20, "fuel_liters": 0}),
+    ("transport", {"vehicle_type": "car_petrol", "km": 20, "fuel_liters": ""}),
+    ("transport", {"vehicle_type": "bus", "km": 20, "fuel_liters": 4}),
+    ("transport", {"vehicle_type": "train"}),
+    ("transport", {"vehicle_type": "rocket", "km": 20}),
+    ("transport", {"vehicle_type": "flight_short", "km": 500, "estimated_kgco2": 3.0}),
+    ("electricity", {"kwh": 10}),
+    ("electricity", {"kwh": None, "km": "not read"}),
+    ("electricity", {"kwh": ""}),
+    ("waste", {"kg": "2.5"}),
+    ("waste", {}),
+    ("purchase", {"estimated_kgco2": "4.2"}),
+    ("purchase", {"estimated_kgco2": None}),
+    ("photo-analysis", {"km": None, "passengers": None}),
+]
+
+def test_matches_scalar_path():
+    cats = [c for c, _ in CASES]
+    dets = [d for _, d in CASES]
+    expected = [utils.calc_entry_emissions(c, d) for c, d in CASES]
+    np.testing.assert_allclose(vectorized.calc_emissions_from_details(cats, dets), expected)
+
+@pytest.mark.parametrize("category, details", [
+    ("transport", {"vehicle_type": "bus", "km": None}),
+    ("transport", {"vehicle_type": "bus", "km": "abc"}),
+    ("transport", {"vehicle_type": "car_petrol", "km": 3, "passengers": None}),
+    ("transport", {"vehicle_type": "car_petrol", "km": 3, "passengers": "2.5"}),
+    ("transport", {"vehicle_type": "car_petrol", "km": 3, "fuel_liters": "lots"}),
+    ("electricity", {"kwh": "abc"}),
+    ("waste", {"estimated_kgco2": "abc"}),
+])
+def test_raises_where_scalar_path_raises(category, details):
+    with pytest.raises((ValueError, TypeError)) as scalar:
+        utils.calc_entry_emissions(category, details)
+    with pytest.raises(scalar.type):
+        vectorized.calc_emissions_from_details([category], [details])
+
+def test_numeric_arrays_match_lists():
+    km = np.array([10.0, 0.0, 3.0])
+    pax = np.array([2, 0, 1])
+    fuel = np.array([0.0, 1.5, 0.0])
+    cats, veh = ["transport"] * 3, ["car_petrol", "car_petrol", "bus"]
+    fast = vectorized.calc_emissions(cats, veh, km=km, passengers=pax, fuel_liters=fuel)
+    slow = vectorized.calc_emissions(cats, veh, km=km.tolist(), passengers=pax.tolist(), fuel_liters=fuel.tolist())
+    np.testing.assert_allclose(fast, slow)
@@ -0,0 +1,66 @@
+# tests/test_write_batcher.py
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from backend import crud, models, write_batcher
+
+@pytest.fixture
+def batcher():
+    # a wide window, so writes submitted together share a batch
+    b = write_batcher.WriteBatcher(max_rows=20, max_delay_ms=500)
+    yield b
+    b.stop()
+
+def _entry_op(user, kg):
+    return lambda s: crud.add_entry(s, user.id, "waste", {"kg": kg}, float(kg), "v1")
+
+def _user_rows(db, user):
+    db.expire_all()
+    return sorted(e for (e,) in db.query(models.Entry.emissions_kgco2).filter(models.Entry.user_id == user.id))
+
+def test_concurrent_writes_share_batches(db, make_user, batcher, assert_aggregates_match):
+    users = [make_user() for _ in range(4)]
+    with ThreadPoolExecutor(20) as pool:
+        ents = list(pool.map(lambda i: batcher.submit(_entry_op(users[i % 4], i)), range(60)))
+    assert len({e.id for e in ents}) == 60
+    assert batcher.ops == 60 and batcher.batches < 60
+    for n, user in enumerate(users):
+        assert _user_rows(db, user) == [float(i) for i in range(n, 60, 4)]
+        total = db.get(models.UserTotal, (user.id, "waste"))
+        assert (total.entry_count, total.total_kgco2) == (15, sum(range(n, 60, 4)))
+    assert_aggregates_match()
+
+def test_failing_write_does_not_sink_its_batch(db, make_user, batcher, assert_aggregates_match):
+    user = make_user()
+
+    def bad(s):
+        # stages a row, then fails: the row must not survive either
+        crud.add_entry(s, user.id, "waste", {"kg": 99}, 99.0)
+        raise ValueError("bad write")
+    ops = [_entry_op(user, i) for i in range(5)] + [bad] + [_entry_op(user, i) for i in range(5, 10)]
+    with ThreadPoolExecutor(len(ops)) as pool:
+        futs = [pool.submit(batcher.submit, op) for op in ops]
+        with pytest.raises(ValueError):
+            futs[5].result()
+        assert all(f.result().user_id == user.id for i, f in enumerate(futs) if i != 5)
+    assert _user_rows(db, user) == [float(i) for i in range(10)]
+    assert_aggregates_match()
+
+def test_disabled_batching_commits_directly(client, db, make_user, monkeypatch, assert_aggregates_match):
+    monkeypatch.setattr(write_batcher, "WRITE_BATCHING", False)
+    user = make_user()
+    ops_before = write_batcher.batcher.ops
+    r = client.post("/entries", data={"token": user.token, "category": "waste", "details": '{"kg": 2}'})
+    assert r.status_code == 200
+    assert db.get(models.Entry, r.json()["entry_id"]).emissions_kgco2 == r.json()["emissions_kgco2"]
+    assert write_batcher.batcher.ops == ops_before
+    assert_aggregates_match()
+
+def test_enabled_batching_serves_post_entries(client, db, make_user, monkeypatch, assert_aggregates_match):
+    monkeypatch.setattr(write_batcher, "WRITE_BATCHING", True)
+    user = make_user()
+    ops_before = write_batcher.batcher.ops
+    r = client.post("/entries", data={"token": user.token, "category": "waste", "details": '{"kg": 2}'})
+    assert r.status_code == 200
+    assert db.get(models.Entry, r.json()["entry_id"]) is not None
+    assert write_batcher.batcher.ops == ops_before + 1
+    assert_aggregates_match()